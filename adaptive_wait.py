@@ -0,0 +1,179 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    StaleElementReferenceException,
+    TimeoutException,
+)
+from selenium.webdriver.firefox.webdriver import WebDriver
+from selenium.webdriver.support.ui import WebDriverWait
+from instrumentation import METRICS
+
+
+def attribute_changed(locator: Tuple, attribute: str, old_value: str):
+    """
+    Condição que espera o atributo de um elemento ser diferente de
+    old_value. Ex: o src da imagem do leitor depois de passar a página.
+
+    :param locator: o localizador do elemento, ex: (By.CSS_SELECTOR, "img").
+
+    :param attribute: o nome do atributo.
+
+    :param old_value: o valor do atributo antes da mudança.
+
+    :return:
+        uma função que recebe o navegador e retorna o novo valor do
+        atributo, ou False se ele ainda não mudou.
+    """
+    def _condition(browser: WebDriver):
+        try:
+            value = browser.find_element(*locator).get_attribute(attribute)
+        except (NoSuchElementException, StaleElementReferenceException):
+            return False
+        return value if value and value != old_value else False
+    return _condition
+
+
+def document_ready():
+    """
+    Condição que espera a página terminar de carregar.
+
+    :return:
+        uma função que recebe o navegador e retorna True quando
+        document.readyState for "complete".
+    """
+    def _condition(browser: WebDriver) -> bool:
+        return browser.execute_script(
+            "return document.readyState;"
+        ) == "complete"
+    return _condition
+
+
+class WaitStats:
+    """
+    WaitStats guarda quanto tempo cada espera realmente levou,
+    separado pelo nome da condição.
+    """
+
+    def __init__(self) -> None:
+        self._durations: Dict[str, List[float]] = {}
+        self._timeouts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, duration: float, timed_out: bool) -> None:
+        """
+        Registra uma espera.
+
+        :param name: o nome da condição.
+
+        :param duration: o tempo da espera em segundos.
+
+        :param timed_out: se a espera terminou por tempo esgotado.
+
+        :return:
+            None
+        """
+        with self._lock:
+            self._durations.setdefault(name, []).append(duration)
+            if timed_out:
+                self._timeouts[name] = self._timeouts.get(name, 0) + 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Resume as esperas registradas.
+
+        :return:
+            um dicionário com, para cada condição, o número de esperas,
+            de tempos esgotados e os tempos total, médio e máximo.
+        """
+        with self._lock:
+            return {
+                name: {
+                    "count": len(durations),
+                    "timeouts": self._timeouts.get(name, 0),
+                    "total": sum(durations),
+                    "mean": sum(durations) / len(durations),
+                    "max": max(durations),
+                }
+                for name, durations in self._durations.items()
+            }
+
+
+class AdaptiveWaiter:
+    """
+    AdaptiveWaiter espera condições no navegador em vez de tempos fixos.
+    Cada condição tem um nome, que define o seu tempo máximo de espera,
+    e o tempo que cada espera levou é registrado em stats.
+    """
+
+    def __init__(self,
+                 browser: WebDriver,
+                 timeouts: Dict[str, float] = None,
+                 default_timeout: float = 10,
+                 poll_frequency: float = 0.05,
+                 stats: WaitStats = None) -> None:
+        """
+        :param browser: o navegador onde as condições são verificadas.
+
+        :param timeouts: tempo máximo em segundos de espera para cada
+        nome de condição.
+
+        :param default_timeout: tempo máximo em segundos para as
+        condições que não estão em timeouts.
+
+        :param poll_frequency: intervalo em segundos entre as verificações
+        da condição.
+
+        :param stats: onde registrar o tempo das esperas. Pode ser
+        compartilhado entre vários AdaptiveWaiter.
+
+        :return:
+            None
+        """
+        self._browser: WebDriver = browser
+        self._timeouts: Dict[str, float] = dict(timeouts or {})
+        self._default_timeout: float = default_timeout
+        self._poll_frequency: float = poll_frequency
+        self.stats: WaitStats = stats or WaitStats()
+
+    def until(self,
+              name: str,
+              condition: Callable[[WebDriver], Any],
+              timeout: Optional[float] = None) -> Any:
+        """
+        Espera até que a condição retorne um valor verdadeiro.
+
+        :param name: o nome da condição, usado para escolher o tempo
+        máximo de espera e para registrar a duração.
+
+        :param condition: uma função que recebe o navegador, como as de
+        selenium.webdriver.support.expected_conditions.
+
+        :param timeout: tempo máximo em segundos. Por padrão, usa o
+        tempo definido para o nome da condição.
+
+        :return:
+            o valor retornado pela condição.
+
+        :raises TimeoutException: se o tempo máximo se esgotar.
+        """
+        if timeout is None:
+            timeout = self._timeouts.get(name, self._default_timeout)
+        start = time.perf_counter()
+        timed_out: bool = False
+        try:
+            return WebDriverWait(
+                driver=self._browser,
+                timeout=timeout,
+                poll_frequency=self._poll_frequency,
+            ).until(condition)
+        except TimeoutException:
+            timed_out = True
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            self.stats.record(name, duration, timed_out)
+            METRICS.observe("wait", duration, condition=name)
+            if timed_out:
+                METRICS.count("wait_timeouts", condition=name)
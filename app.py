@@ -1,20 +1,229 @@
+import threading
+from typing import Any, Dict, List, Tuple
 from scraper_mangas_info import ScraperMangasInfo
-from scraper_mangas_chapters import ScraperChapters
-from scraper_mangas_links import get_mangas_links_in_range
+from scraper_mangas_links import get_mangas_links_in_range, use_page_cache
 from json_database import JsonDB
+from storage_backend import JsonFileBackend
+from write_behind import WriteBehindBackend
+from browser_pool import BrowserPool
+from incremental_update import merge_stored_chapters
+from job_journal import JobJournal, MangaCheckpoint
+from manga_model import MangaModel
+from parallel_chapters import ParallelChapterScraper, suggest_workers
+from pipeline import Pipeline, Stage
+from search_index import SearchIndex
+from page_cache import PageCache
+from instrumentation import (
+    METRICS,
+    JsonLogSink,
+    PrometheusFileSink,
+    SummarySink,
+)
 
+# número de navegadores mantidos abertos e reutilizados entre os mangás.
+# Os capítulos de cada mangá são divididos entre eles.
+BROWSER_POOL_SIZE: int = suggest_workers(max_workers=4)
 
+# páginas de listagem percorridas e o tempo em segundos entre cada uma.
+FIRST_LISTING_PAGE: int = 2
+LAST_LISTING_PAGE: int = 2
+LISTING_SLEEP_TIME: int = 1
+
+# o crawl é um pipeline: links -> informações -> capítulos -> gravação.
+# Cada etapa tem as suas threads e uma fila de entrada limitada, então
+# a página de listagem seguinte é buscada enquanto os mangás da atual
+# são obtidos, e a etapa mais lenta define o ritmo das outras.
+INFO_WORKERS: int = 2
+CHAPTER_WORKERS: int = 2
+# número máximo de itens esperando na fila de cada etapa.
+STAGE_QUEUE_SIZE: int = 4
+
+# se True, reaproveita os capítulos já salvos de cada mangá e só obtém
+# os capítulos novos ou incompletos.
+INCREMENTAL: bool = True
+
+# diário dos jobs do crawl. Se o processo morrer, a próxima execução
+# pula os mangás concluídos e retoma os que estavam em andamento. Depois
+# de uma execução completa, a seguinte obtém todos os mangás de novo.
+JOURNAL_PATH: str = "json_db/jobs.sqlite3"
+
+# índice de busca por título, autor, status e categoria, atualizado a
+# cada mangá salvo.
+SEARCH_INDEX_PATH: str = "json_db/search.sqlite3"
+
+# cache das páginas de listagem e dos mangás. Páginas obtidas há menos
+# de PAGE_CACHE_TTL segundos não são baixadas de novo.
+PAGE_CACHE_DIR: str = "json_db/cache"
+PAGE_CACHE_TTL: float = 12 * 60 * 60
+
+# métricas de tempo e contadores das operações dos scrapers: cada
+# medição vai para METRICS_LOG_PATH (uma linha json por medição) e, no
+# fim, o total vai para METRICS_PROM_PATH (formato do Prometheus) e é
+# impresso na tela.
+METRICS_LOG_PATH: str = "json_db/metrics.jsonl"
+METRICS_PROM_PATH: str = "json_db/metrics.prom"
+
+
+# os mangás são gravados em lotes, em segundo plano.
+JsonDB.use_backend(WriteBehindBackend(JsonFileBackend()))
 JsonDB.create_db_dir()
-mangas_links = get_mangas_links_in_range(2, 2, sleep_time=1)
-JsonDB.save_list_titles(mangas_links)
+metrics_log = JsonLogSink(METRICS_LOG_PATH)
+METRICS.add_sink(metrics_log)
+METRICS.add_sink(PrometheusFileSink(METRICS_PROM_PATH))
+METRICS.add_sink(SummarySink())
+search_index = SearchIndex(SEARCH_INDEX_PATH)
+JsonDB.add_listener(search_index.add)
+page_cache = PageCache(PAGE_CACHE_DIR, ttl=PAGE_CACHE_TTL)
+use_page_cache(page_cache)
 
+journal = JobJournal(JOURNAL_PATH)
+# este é o único processo do crawl, então os jobs que ficaram em
+# andamento foram interrompidos na execução anterior.
+journal.requeue_running()
+journal.begin_run("manga")
 
-for manga_link in mangas_links:
-    scraper_info = ScraperMangasInfo()
-    manga = scraper_info.get_manga_info(manga_link)
-    scraper_info.close_browser()
-    JsonDB.save_manga(manga)
-    scraper_chapters = ScraperChapters(timeout=30)
-    scraper_chapters.get_chapter_pages(manga)
+# cada thread das etapas de informações e de capítulos tem o seu scraper.
+_local = threading.local()
+# os scrapers de informações criados pelas threads, fechados no fim.
+_scrapers_info: List[ScraperMangasInfo] = []
+_scrapers_lock = threading.Lock()
+
+# páginas de listagem que não puderam ser obtidas. São tentadas de novo
+# depois que o pipeline termina.
+_failed_listing_pages: List[int] = []
+_failed_listing_lock = threading.Lock()
+
+# um mangá entre as etapas: a url e o mangá, com os capítulos que ainda
+# precisam ser obtidos ou com o MangaCheckpoint deles.
+MangaJob = Tuple[str, MangaModel, Any]
+
+
+def discover_links(page: int) -> List[str]:
+    """Busca os mangás de uma página de listagem e retorna os que ainda
+    não foram obtidos, já emprestados do journal. Se a página não pôde
+    ser obtida, ela vai para _failed_listing_pages."""
+    failed_pages: List[str] = []
+    links = get_mangas_links_in_range(
+        page, page, sleep_time=LISTING_SLEEP_TIME, failed_pages=failed_pages
+    )
+    if failed_pages:
+        with _failed_listing_lock:
+            _failed_listing_pages.append(page)
+        return []
+    JsonDB.update_list_title(links)
+    journal.add("manga", links)
+    # um mangá pode aparecer em duas páginas de listagem. Só a primeira
+    # consegue emprestá-lo, então ele não é obtido duas vezes.
+    return [link for link in links if journal.claim("manga", link)]
+
+
+def fetch_manga_info(manga_link: str) -> MangaJob:
+    """Obtém as informações do mangá e salva a lista de capítulos."""
+    if not hasattr(_local, "scraper_info"):
+        # o navegador só é emprestado do pool quando a página baixada
+        # sem ele não tem as informações do mangá.
+        _local.scraper_info = ScraperMangasInfo(
+            browser_pool=browser_pool, page_cache=page_cache
+        )
+        with _scrapers_lock:
+            _scrapers_info.append(_local.scraper_info)
+    manga = _local.scraper_info.get_manga_info(manga_link)
+    stored_manga = JsonDB.load_manga(manga.title) if INCREMENTAL else None
+    pending_chapters = merge_stored_chapters(manga, stored_manga)
     JsonDB.save_manga(manga)
-    scraper_chapters.close_browser()
+    return manga_link, manga, pending_chapters
+
+
+def fetch_chapters(job: MangaJob) -> MangaJob:
+    """Obtém as páginas dos capítulos pendentes do mangá."""
+    manga_link, manga, pending_chapters = job
+    if not hasattr(_local, "scraper_chapters"):
+        _local.scraper_chapters = ParallelChapterScraper(
+            browser_pool,
+            workers=max(1, BROWSER_POOL_SIZE // CHAPTER_WORKERS),
+            timeout=30,
+        )
+    checkpoint = MangaCheckpoint(
+        journal, manga, JsonDB.save_manga, flush=JsonDB.flush,
+        renew=lambda: journal.renew("manga", [manga_link]),
+    )
+    checkpoint.start(pending_chapters)
+    _local.scraper_chapters.get_chapter_pages(
+        manga,
+        pending_chapters,
+        on_chapter_done=checkpoint.chapter_done,
+        on_chapter_failed=checkpoint.chapter_failed,
+    )
+    return manga_link, manga, checkpoint
+
+
+def persist_manga(job: MangaJob) -> None:
+    """Salva o mangá e o marca como concluído, ou como falho se algum
+    capítulo não foi obtido."""
+    manga_link, _, checkpoint = job
+    checkpoint.flush()
+    failed_chapters = checkpoint.failed_chapters
+    if failed_chapters:
+        journal.fail(
+            "manga", manga_link,
+            f"{len(failed_chapters)} capítulos não foram obtidos",
+        )
+        return
+    journal.complete("manga", [manga_link])
+
+
+def report_error(stage: str, item: Any, error: Exception) -> None:
+    if stage == "links":
+        print(f"Erro ao buscar a página de mangás! {item}: {error!r}")
+        return
+    manga_link = item if isinstance(item, str) else item[0]
+    print(f"Erro ao obter o mangá! {manga_link}: {error!r}")
+    journal.fail("manga", manga_link, repr(error))
+
+
+with BrowserPool(size=BROWSER_POOL_SIZE) as browser_pool:
+    pipeline = Pipeline(
+        [
+            Stage("links", discover_links, fan_out=True),
+            Stage("info", fetch_manga_info, workers=INFO_WORKERS,
+                  queue_size=STAGE_QUEUE_SIZE),
+            Stage("chapters", fetch_chapters, workers=CHAPTER_WORKERS,
+                  queue_size=STAGE_QUEUE_SIZE),
+            Stage("persist", persist_manga, queue_size=STAGE_QUEUE_SIZE),
+        ],
+        on_error=report_error,
+    )
+    stages: Dict[str, Dict[str, Any]] = pipeline.run(
+        range(FIRST_LISTING_PAGE, LAST_LISTING_PAGE + 1)
+    )
+    print(f"Etapas: {stages}")
+    # mais uma tentativa para as páginas de listagem que falharam.
+    if _failed_listing_pages:
+        retry_pages = sorted(_failed_listing_pages)
+        _failed_listing_pages.clear()
+        print(f"Tentando de novo as páginas de listagem: {retry_pages}")
+        stages = pipeline.run(retry_pages)
+        print(f"Etapas: {stages}")
+    print(f"Navegadores: {browser_pool.stats}")
+    print(f"Mangás: {journal.counts('manga')}")
+
+for scraper_info in _scrapers_info:
+    scraper_info.close()
+if _failed_listing_pages:
+    # os mangás dessas páginas nem entraram no journal. A execução fica
+    # em aberto, então a próxima pula os mangás já obtidos e busca
+    # essas páginas de novo.
+    print(
+        f"Páginas de listagem não obtidas: {sorted(_failed_listing_pages)}"
+    )
+else:
+    journal.finish_run("manga")
+journal.close()
+search_index.close()
+print(f"Cache: {page_cache.stats}")
+page_cache.close()
+storage = JsonDB.get_backend()
+JsonDB.close()
+print(f"Gravação: {storage.stats}")
+METRICS.flush()
+metrics_log.close()
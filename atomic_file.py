@@ -0,0 +1,53 @@
+import os
+import tempfile
+
+
+def fsync_dir(directory: str) -> None:
+    """Garante que a criação ou a troca de arquivos no diretório foi
+    gravada no disco. Não faz nada em sistemas sem suporte (ex: Windows)."""
+    try:
+        fd = os.open(directory or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(file_dir: str, data: bytes) -> int:
+    """
+    Escreve um arquivo de forma atômica: os dados vão para um arquivo
+    temporário no mesmo diretório, que é gravado no disco (fsync) e só
+    então renomeado para o nome final. Se o processo morrer no meio,
+    o arquivo antigo continua intacto.
+
+    :param file_dir: o path do arquivo.
+
+    :param data: o conteúdo do arquivo.
+
+    :return:
+        o número de bytes escritos.
+    """
+    directory = os.path.dirname(file_dir)
+    fd, tmp_dir = tempfile.mkstemp(
+        dir=directory or ".",
+        prefix="." + os.path.basename(file_dir) + ".",
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_dir, file_dir)
+    except BaseException:
+        try:
+            os.remove(tmp_dir)
+        except OSError:
+            pass
+        raise
+    fsync_dir(directory)
+    return len(data)
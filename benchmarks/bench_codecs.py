@@ -0,0 +1,124 @@
+"""
+Compara os codecs de manga_codec em um mangá sintético grande.
+
+Uso, a partir da raiz do projeto:
+
+    python -m benchmarks.bench_codecs --chapters 2000 --pages 40
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict
+from manga_codec import available_codecs, get_codec
+from manga_model import MangaModel
+
+
+def make_synthetic_manga(chapters: int = 2000, pages: int = 40) -> MangaModel:
+    """
+    Cria um mangá com o formato dos mangás do site, mas com dados falsos.
+
+    :param chapters: número de capítulos.
+
+    :param pages: número de páginas de cada capítulo.
+
+    :return:
+        MangaModel
+    """
+    return MangaModel(
+        title="Mangá Sintético",
+        alternative_titles=["Synthetic Manga", "合成漫画"],
+        url="https://mangalivre.net/manga/manga-sintetico/1",
+        status="em lançamento",
+        cover="https://static.mangalivre.net/capas/sintetico.jpg",
+        author="Autor Sintético",
+        categories=["Ação", "Aventura", "Comédia"],
+        description="Um mangá gerado para benchmarks. " * 10,
+        chapters=[
+            {
+                "pages": [
+                    f"https://cdn.mangalivre.net/firefox/{c:06d}/{p}.jpg"
+                    for p in range(pages)
+                ],
+                "number_of_pages": pages,
+                "number_of_chapter": f"Capítulo {c}",
+                "url": (
+                    "https://mangalivre.net/ler/manga-sintetico/online/"
+                    f"{c}/capitulo-{c}"
+                ),
+            }
+            for c in range(chapters)
+        ],
+    )
+
+
+def _best_of(function: Callable[[], Any], repeat: int) -> float:
+    """Retorna o menor tempo, em segundos, de repeat execuções."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(chapters: int, pages: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    """
+    Mede, para cada codec disponível, o tempo de conversão do mangá em
+    bytes, o tempo de leitura e o tamanho do json.
+
+    :return:
+        um dicionário com os resultados de cada codec.
+    """
+    manga = make_synthetic_manga(chapters, pages)
+    results: Dict[str, Dict[str, float]] = {}
+
+    # referência: o caminho antigo, to_json() seguido de encode().
+    data = manga.to_json().encode("utf-8")
+    results["to_json+encode"] = {
+        "encode_s": _best_of(lambda: manga.to_json().encode("utf-8"), repeat),
+        "decode_s": _best_of(
+            lambda: MangaModel.from_json(json.loads(data)), repeat
+        ),
+        "size_bytes": len(data),
+    }
+
+    for name in available_codecs():
+        codec = get_codec(name)
+        data = manga.to_bytes(codec)
+        results[name] = {
+            "encode_s": _best_of(lambda: manga.to_bytes(codec), repeat),
+            "decode_s": _best_of(
+                lambda: MangaModel.from_bytes(data, codec), repeat
+            ),
+            "size_bytes": len(data),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--chapters", type=int, default=2000)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--json", action="store_true",
+        help="imprime os resultados em json em vez de uma tabela."
+    )
+    args = parser.parse_args()
+
+    results = run(args.chapters, args.pages, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=4))
+        return
+    print(f"{'codec':<16}{'encode (ms)':>14}{'decode (ms)':>14}{'MB':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<16}"
+            f"{result['encode_s'] * 1000:>14.1f}"
+            f"{result['decode_s'] * 1000:>14.1f}"
+            f"{result['size_bytes'] / 1e6:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Mede a vazão dos scrapers contra o servidor local de benchmarks.
+
+Uso, a partir da raiz do projeto:
+
+    python -m benchmarks.bench_scraper --mangas 60 --chapters 10 --pages 20
+    python -m benchmarks.bench_scraper --output resultado.json
+
+Para cada etapa (listagem, informações dos mangás e páginas dos
+capítulos) informa o número de itens por segundo, a latência de cada
+item, o pico de memória alocada pelo Python e o número de requisições
+feitas ao servidor, em json, para comparar execuções diferentes. As
+etapas que precisam do Firefox são puladas se ele não puder ser aberto.
+"""
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from benchmarks.standin_server import StandinServer, StandinSite
+from chapter_list_loader import ChapterListLoader
+from http_client import HttpClient
+from manga_info_extractor import extract_manga_info
+from manga_model import MangaModel
+from scraper_mangas_links import (
+    get_mangas_links_in_range,
+    get_mangas_links_in_range_concurrent,
+)
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class StageResult:
+    """Resultado de uma etapa do benchmark."""
+
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+        self.latencies: List[float] = []
+        self.seconds: float = 0.0
+        self.peak_python_mb: Optional[float] = None
+        self.requests: int = 0
+        self.skipped: Optional[str] = None
+        # outras quantidades processadas na etapa, ex: {"chapters": 600}.
+        self.counts: Dict[str, int] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.skipped is not None:
+            return {"skipped": self.skipped}
+        items = len(self.latencies)
+        result: Dict[str, Any] = {
+            "items": items,
+            "seconds": round(self.seconds, 4),
+            "items_per_s": (
+                round(items / self.seconds, 2) if self.seconds else None
+            ),
+            "requests": self.requests,
+            "peak_python_mb": self.peak_python_mb,
+        }
+        for unit, count in self.counts.items():
+            result[unit] = count
+            result[f"{unit}_per_s"] = (
+                round(count / self.seconds, 2) if self.seconds else None
+            )
+        if items:
+            result["latency_ms"] = {
+                "mean": round(sum(self.latencies) / items * 1000, 2),
+                "p50": round(_percentile(self.latencies, 0.5) * 1000, 2),
+                "p95": round(_percentile(self.latencies, 0.95) * 1000, 2),
+                "max": round(max(self.latencies) * 1000, 2),
+            }
+        return result
+
+
+def _run_stage(
+        name: str,
+        server: StandinServer,
+        items: Iterable[Any],
+        function: Callable[[Any], None],
+        trace_memory: bool) -> StageResult:
+    """Chama function para cada item, medindo o tempo de cada chamada."""
+    result = StageResult(name)
+    requests_before = server.stats["requests"]
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    for item in items:
+        item_start = time.perf_counter()
+        function(item)
+        result.latencies.append(time.perf_counter() - item_start)
+    result.seconds = time.perf_counter() - start
+    if trace_memory:
+        result.peak_python_mb = round(
+            tracemalloc.get_traced_memory()[1] / 1e6, 2
+        )
+        tracemalloc.stop()
+    result.requests = server.stats["requests"] - requests_before
+    return result
+
+
+def _open_firefox() -> Any:
+    """Abre o Firefox em modo headless, ou retorna o motivo da falha."""
+    try:
+        from browser_pool import create_firefox
+        return create_firefox(headless_mode=True)
+    except Exception as error:  # noqa: BLE001
+        return f"Firefox indisponível: {error!r}"
+
+
+def run(site: StandinSite,
+        workers: int = 2,
+        latency: float = 0.0,
+        trace_memory: bool = True,
+        browser: bool = True) -> Dict[str, Any]:
+    """
+    Executa todas as etapas do benchmark.
+
+    :param site: os dados sintéticos servidos.
+
+    :param workers: número de navegadores na etapa das páginas dos
+    capítulos e de requisições simultâneas na listagem concorrente.
+
+    :param latency: atraso em segundos de cada resposta do servidor.
+
+    :param trace_memory: se True, mede o pico de memória de cada etapa
+    com tracemalloc (o que deixa as etapas mais lentas).
+
+    :param browser: se False, pula as etapas que precisam do Firefox.
+
+    :return:
+        um dicionário com a configuração e o resultado de cada etapa.
+    """
+    stages: Dict[str, StageResult] = {}
+    with StandinServer(site, latency=latency) as server:
+        pages = range(1, site.listing_pages + 1)
+        links: List[str] = []
+
+        stages["links"] = _run_stage(
+            "links", server, pages,
+            lambda page: links.extend(get_mangas_links_in_range(
+                page, page, base_url=server.listing_url
+            )),
+            trace_memory,
+        )
+        stages["links_concurrent"] = _run_stage(
+            "links_concurrent", server, [None],
+            lambda _: get_mangas_links_in_range_concurrent(
+                1, site.listing_pages, max_workers=workers,
+                requests_per_second=0,
+                client=HttpClient(pool_size=workers),
+                base_url=server.listing_url,
+            ),
+            trace_memory,
+        )
+
+        # as informações dos mangás só com requisições HTTP, sem o
+        # navegador: a página do mangá e o endpoint da lista de capítulos.
+        client = HttpClient()
+        loader = ChapterListLoader(client=client)
+        mangas: List[MangaModel] = []
+
+        def get_manga_info_static(url: str) -> None:
+            manga = extract_manga_info(client.get(url).text, url)
+            manga.chapters = loader.load(url).chapters
+            mangas.append(manga)
+
+        stages["manga_info_static"] = _run_stage(
+            "manga_info_static", server, links, get_manga_info_static,
+            trace_memory,
+        )
+        stages["manga_info_static"].counts = {
+            "chapters": sum(len(manga.chapters) for manga in mangas),
+        }
+
+        firefox = _open_firefox() if browser else "desativado (--no-browser)"
+        if isinstance(firefox, str):
+            for name in ("manga_info", "chapter_pages"):
+                stages[name] = StageResult(name)
+                stages[name].skipped = firefox
+        else:
+            stages.update(_run_browser_stages(
+                server, firefox, links, mangas, workers, trace_memory
+            ))
+
+        served = server.stats
+
+    return {
+        "config": {
+            "mangas": site.mangas,
+            "mangas_per_page": site.mangas_per_page,
+            "chapters": site.chapters,
+            "pages": site.pages,
+            "adult_every": site.adult_every,
+            "reader_json": site.reader_json,
+            "workers": workers,
+            "latency": latency,
+        },
+        "environment": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+        },
+        "stages": {name: stage.to_dict() for name, stage in stages.items()},
+        "server": served,
+        # pico de memória do processo inteiro (em MB no Linux), sem os
+        # processos do Firefox.
+        "max_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2
+        ),
+    }
+
+
+def _run_browser_stages(
+        server: StandinServer,
+        firefox: Any,
+        links: List[str],
+        mangas: List[MangaModel],
+        workers: int,
+        trace_memory: bool) -> Dict[str, StageResult]:
+    """As etapas que usam o Firefox: get_manga_info e get_chapter_pages."""
+    from browser_pool import BrowserPool
+    from parallel_chapters import ParallelChapterScraper
+    from scraper_mangas_chapters import ScraperChapters
+    from scraper_mangas_info import ScraperMangasInfo
+
+    stages: Dict[str, StageResult] = {}
+    try:
+        # esta etapa mede o navegador, não o caminho sem ele.
+        scraper_info = ScraperMangasInfo(browser=firefox, static_fetch=False)
+        try:
+            stages["manga_info"] = _run_stage(
+                "manga_info", server, links, scraper_info.get_manga_info,
+                trace_memory,
+            )
+        finally:
+            scraper_info.close()
+    finally:
+        firefox.quit()
+
+    # o leitor do servidor local não está em "https://mangalivre.net".
+    url_base_reader = ScraperChapters._URL_BASE_READER
+    ScraperChapters._URL_BASE_READER = server.base_url + "/ler/"
+    try:
+        with BrowserPool(size=workers, headless_mode=True) as browser_pool:
+            scraper = ParallelChapterScraper(browser_pool, workers=workers)
+            # cada item é um mangá inteiro, então a latência é por mangá.
+            stages["chapter_pages"] = _run_stage(
+                "chapter_pages", server, mangas, scraper.get_chapter_pages,
+                trace_memory,
+            )
+    finally:
+        ScraperChapters._URL_BASE_READER = url_base_reader
+    stages["chapter_pages"].counts = {
+        "chapters": sum(len(manga.chapters) for manga in mangas),
+        "pages": sum(
+            len(chapter["pages"])
+            for manga in mangas for chapter in manga.chapters
+        ),
+    }
+    return stages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--mangas", type=int, default=60)
+    parser.add_argument("--mangas-per-page", type=int, default=30)
+    parser.add_argument("--chapters", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--adult-every", type=int, default=0)
+    parser.add_argument(
+        "--no-reader-json", action="store_true",
+        help="o leitor não expõe o json das páginas."
+    )
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument(
+        "--no-memory", action="store_true",
+        help="não mede o pico de memória de cada etapa (mais rápido)."
+    )
+    parser.add_argument(
+        "--no-browser", action="store_true",
+        help="pula as etapas que precisam do Firefox."
+    )
+    parser.add_argument(
+        "--output", help="salva os resultados em um arquivo json."
+    )
+    args = parser.parse_args()
+
+    site = StandinSite(
+        mangas=args.mangas,
+        mangas_per_page=args.mangas_per_page,
+        chapters=args.chapters,
+        pages=args.pages,
+        adult_every=args.adult_every,
+        reader_json=not args.no_reader_json,
+    )
+    results = run(
+        site,
+        workers=args.workers,
+        latency=args.latency,
+        trace_memory=not args.no_memory,
+        browser=not args.no_browser,
+    )
+    output = json.dumps(results, indent=4, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""
+Servidor HTTP local que imita o site "https://mangalivre.net" com dados
+sintéticos, para medir os scrapers sem acessar o site de verdade.
+
+As páginas têm só os elementos que os seletores dos scrapers procuram:
+as páginas de listagem (a.link-block), as páginas dos mangás
+(#series-data e #chapter-list), o endpoint da lista de capítulos, o
+leitor (navegação das páginas e aviso +18) e o json das páginas do
+leitor.
+
+Uso, a partir da raiz do projeto:
+
+    python -m benchmarks.standin_server --mangas 100 --port 8000
+"""
+import argparse
+import json
+import threading
+import time
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# imagem gif 1x1 servida como página dos capítulos.
+_GIF: bytes = (
+    b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04"
+    b"\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D"
+    b"\x01\x00;"
+)
+
+# número de capítulos em cada página do endpoint da lista de capítulos.
+_CHAPTERS_PER_LIST_PAGE: int = 30
+
+_LISTING_PATH: str = "/series/index/nome/todos"
+
+_CATEGORIES: Tuple[str, ...] = (
+    "Ação", "Aventura", "Comédia", "Drama", "Fantasia", "Romance",
+)
+
+_READER_TOKEN: str = "standin"
+
+
+def _slug(manga_id: int) -> str:
+    return f"manga-sintetico-{manga_id}"
+
+
+class StandinSite:
+    """
+    Os dados sintéticos do site e o html de cada página.
+
+    Os mangás são numerados de 1 a mangas. Cada mangá tem chapters
+    capítulos com pages páginas cada.
+    """
+
+    def __init__(self,
+                 mangas: int = 60,
+                 mangas_per_page: int = 30,
+                 chapters: int = 10,
+                 pages: int = 20,
+                 adult_every: int = 0,
+                 reader_json: bool = True) -> None:
+        """
+        :param mangas: número de mangás do site.
+
+        :param mangas_per_page: número de mangás em cada página de
+        listagem.
+
+        :param chapters: número de capítulos de cada mangá.
+
+        :param pages: número de páginas de cada capítulo.
+
+        :param adult_every: se maior que 0, um a cada adult_every mangás
+        mostra o aviso +18 no leitor.
+
+        :param reader_json: se False, o leitor não expõe o json das
+        páginas, forçando os scrapers a passar as páginas uma a uma.
+
+        :return:
+            None
+        """
+        self.mangas: int = mangas
+        self.mangas_per_page: int = mangas_per_page
+        self.chapters: int = chapters
+        self.pages: int = pages
+        self.adult_every: int = adult_every
+        self.reader_json: bool = reader_json
+
+    @property
+    def listing_pages(self) -> int:
+        """Número de páginas de listagem."""
+        return max(1, -(-self.mangas // self.mangas_per_page))
+
+    def manga_path(self, manga_id: int) -> str:
+        return f"/manga/{_slug(manga_id)}/{manga_id}"
+
+    def chapter_path(self, manga_id: int, chapter: int) -> str:
+        return (
+            f"/ler/{_slug(manga_id)}/online/"
+            f"{manga_id * 100000 + chapter}/capitulo-{chapter}"
+        )
+
+    def page_urls(self, manga_id: int, chapter: int) -> List[str]:
+        return [
+            f"/img/{manga_id}/{chapter}/{page}.gif"
+            for page in range(1, self.pages + 1)
+        ]
+
+    def _valid_manga(self, manga_id: int) -> bool:
+        return 1 <= manga_id <= self.mangas
+
+    def listing(self, page: int) -> Optional[str]:
+        if not 1 <= page <= self.listing_pages:
+            return None
+        first = (page - 1) * self.mangas_per_page + 1
+        last = min(self.mangas, first + self.mangas_per_page - 1)
+        items = "".join(
+            f'<div class="seriesList"><a class="link-block" '
+            f'href="{self.manga_path(i)}"><span class="series-title">'
+            f"Mangá Sintético {i}</span></a></div>"
+            for i in range(first, last + 1)
+        )
+        return f"<html><body><div id=\"series-list\">{items}</div></body></html>"
+
+    def manga(self, manga_id: int) -> Optional[str]:
+        if not self._valid_manga(manga_id):
+            return None
+        categories = "\n".join(
+            f"<li><a><span>{escape(c)}</span></a></li>"
+            for c in _CATEGORIES[manga_id % 3:manga_id % 3 + 3]
+        )
+        complete = (
+            '<i class="complete-series">Completo</i>'
+            if manga_id % 2 == 0 else ""
+        )
+        chapters = "".join(
+            f'<li><a class="link-dark" '
+            f'href="{self.chapter_path(manga_id, c)}">'
+            f'<span class="cap-text">Capítulo {c}</span></a></li>'
+            for c in range(self.chapters, 0, -1)
+        )
+        return f"""<html><body>
+            <div id="series-data">
+                <img class="cover" src="/img/capas/{manga_id}.gif">
+                <span class="series-title"><h1>Mangá Sintético {manga_id}</h1></span>
+                <ol class="series-synom"><li>Synthetic Manga {manga_id}</li></ol>
+                <span class="series-author">
+                    <i></i> Autor Sintético {manga_id % 7}
+                </span>
+                {complete}
+                <div class="carousel"><ul>
+{categories}
+                </ul></div>
+                <span class="series-desc"><span>Um mangá sintético.</span></span>
+            </div>
+            <div id="chapter-list"><ul class="full-chapters-list">{chapters}</ul></div>
+            <footer id="social-media"></footer>
+        </body></html>"""
+
+    def chapters_list(self, manga_id: int, page: int) -> Optional[Dict]:
+        if not self._valid_manga(manga_id):
+            return None
+        numbers = list(range(self.chapters, 0, -1))
+        start = (page - 1) * _CHAPTERS_PER_LIST_PAGE
+        chunk = numbers[start:start + _CHAPTERS_PER_LIST_PAGE]
+        if not chunk:
+            return {"chapters": False}
+        return {"chapters": [
+            {
+                "number": str(c),
+                "releases": {
+                    "1": {"link": self.chapter_path(manga_id, c)},
+                },
+            }
+            for c in chunk
+        ]}
+
+    def reader(self, manga_id: int, chapter: int) -> Optional[str]:
+        if not self._valid_manga(manga_id) or not 1 <= chapter <= self.chapters:
+            return None
+        pages = self.page_urls(manga_id, chapter)
+        adult = self.adult_every > 0 and manga_id % self.adult_every == 0
+        # a caixa de aviso sempre existe e fica vazia nos mangás que não
+        # são +18, como no site.
+        warning = (
+            '<div><div><p>Conteúdo +18</p><a href="#" '
+            'onclick="this.closest(\'.adult-warning-wrapper\')'
+            '.style.display=\'none\'; return false;">Sim</a></div></div>'
+            if adult else ""
+        )
+        globals_script = (
+            f"window.READER_ID_RELEASE = {manga_id * 100000 + chapter};"
+            f"window.READER_TOKEN = {json.dumps(_READER_TOKEN)};"
+            if self.reader_json else ""
+        )
+        fillers = "".join(f"<div class=\"filler-{i}\"></div>" for i in range(7))
+        return f"""<html><body>
+            <div id="reader-wrapper">
+                <div class="reader-navigation clear-fix">
+                    <div class="chapter-selection-container">
+                        <div class="chapter-selection">
+                            <span class="current-chapter"><em>{chapter}</em></span>
+                        </div>
+                    </div>
+                </div>
+                <div class="reader-content fit horizontal">
+                    <div class="adult-warning-wrapper" style="min-height: 1px">{warning}</div>
+                    <div class="manga-page"><div><img src="{pages[0]}"></div></div>
+                </div>
+                {fillers}
+                <div>
+                    <div class="page-navigation-wrapper"><div>
+                        <div class="page-navigation">
+                            <span><em id="current-page">1</em> / <em>{len(pages)}</em></span>
+                        </div>
+                        <div class="page-next" onclick="nextPage()">&gt;</div>
+                    </div></div>
+                </div>
+            </div>
+            <script>
+                {globals_script}
+                var pages = {json.dumps(pages)};
+                var current = 0;
+                function nextPage() {{
+                    if (current + 1 >= pages.length) return;
+                    current += 1;
+                    document.querySelector(".manga-page img").src = pages[current];
+                    document.getElementById("current-page").textContent = current + 1;
+                }}
+            </script>
+        </body></html>"""
+
+    def reader_pages(self, release_id: int, key: str) -> Optional[Dict]:
+        if not self.reader_json or key != _READER_TOKEN:
+            return None
+        manga_id, chapter = divmod(release_id, 100000)
+        if not self._valid_manga(manga_id) or not 1 <= chapter <= self.chapters:
+            return None
+        return {"images": [
+            {"legacy": url} for url in self.page_urls(manga_id, chapter)
+        ]}
+
+
+def _int(value: str, default: int = 0) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class _Handler(BaseHTTPRequestHandler):
+    site: StandinSite
+    latency: float = 0.0
+    stats: Dict[str, int]
+    stats_lock: threading.Lock
+
+    def log_message(self, *_) -> None:
+        pass
+
+    def _route(self) -> Tuple[int, str, bytes]:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        parts = [part for part in url.path.split("/") if part]
+        body: Optional[object] = None
+        content_type = "text/html; charset=utf-8"
+
+        if url.path == _LISTING_PATH:
+            body = self.site.listing(_int(query.get("page", [""])[0]))
+        elif len(parts) == 3 and parts[0] == "manga":
+            body = self.site.manga(_int(parts[2]))
+        elif url.path == "/series/chapters_list.json":
+            body = self.site.chapters_list(
+                _int(query.get("id_serie", [""])[0]),
+                _int(query.get("page", [""])[0]),
+            )
+        elif len(parts) == 5 and parts[0] == "ler":
+            release_id = _int(parts[3])
+            body = self.site.reader(*divmod(release_id, 100000))
+        elif len(parts) == 3 and parts[:2] == ["leitor", "pages"]:
+            body = self.site.reader_pages(
+                _int(parts[2].split(".")[0]), query.get("key", [""])[0]
+            )
+        elif parts[:1] == ["img"]:
+            return 200, "image/gif", _GIF
+
+        if body is None:
+            return 404, "text/plain", b"not found"
+        if isinstance(body, dict):
+            return 200, "application/json", json.dumps(body).encode("utf-8")
+        return 200, content_type, body.encode("utf-8")
+
+    def do_GET(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        status, content_type, body = self._route()
+        with self.stats_lock:
+            self.stats["requests"] += 1
+            self.stats["bytes"] += len(body)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandinServer:
+    """
+    Servidor local que serve um StandinSite em uma thread separada.
+
+        with StandinServer(StandinSite(mangas=100)) as server:
+            get_mangas_links_in_range(1, 4, base_url=server.listing_url)
+    """
+
+    def __init__(self,
+                 site: StandinSite = None,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 latency: float = 0.0) -> None:
+        """
+        :param site: os dados do site. Por padrão, StandinSite().
+
+        :param host: o endereço do servidor.
+
+        :param port: a porta do servidor. 0 escolhe uma porta livre.
+
+        :param latency: atraso em segundos de cada resposta, para
+        simular a rede.
+
+        :return:
+            None
+        """
+        self.site: StandinSite = site or StandinSite()
+        handler = type("Handler", (_Handler,), {
+            "site": self.site,
+            "latency": latency,
+            "stats": {"requests": 0, "bytes": 0},
+            "stats_lock": threading.Lock(),
+        })
+        self._handler = handler
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def listing_url(self) -> str:
+        """A url das páginas de listagem, sem o número da página."""
+        return f"{self.base_url}{_LISTING_PATH}?page="
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Número de requisições atendidas e de bytes enviados."""
+        with self._handler.stats_lock:
+            return dict(self._handler.stats)
+
+    def manga_urls(self) -> List[str]:
+        return [
+            self.base_url + self.site.manga_path(i)
+            for i in range(1, self.site.mangas + 1)
+        ]
+
+    def start(self) -> "StandinServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="standin-server",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "StandinServer":
+        return self.start()
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--mangas", type=int, default=60)
+    parser.add_argument("--mangas-per-page", type=int, default=30)
+    parser.add_argument("--chapters", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--adult-every", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    site = StandinSite(args.mangas, args.mangas_per_page, args.chapters,
+                       args.pages, args.adult_every)
+    server = StandinServer(site, port=args.port, latency=args.latency)
+    print(f"Servindo em {server.listing_url}1")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
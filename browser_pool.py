@@ -0,0 +1,232 @@
+import threading
+from contextlib import contextmanager
+from queue import Empty, LifoQueue
+from typing import Callable, Dict, Iterator, Optional
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.firefox.webdriver import WebDriver
+from browser_profile import LEAN_PROFILE, BrowserProfile
+from instrumentation import METRICS
+
+
+def create_firefox(headless_mode: bool = True,
+                   profile: BrowserProfile = None) -> WebDriver:
+    """
+    Inicia uma nova instância do Firefox.
+
+    :param headless_mode: define se o navegador será ou não renderizado.
+    Por padrão, não é.
+
+    :param profile: o que o navegador baixa e quanto cache ele usa. Por
+    padrão, LEAN_PROFILE, que não baixa imagens, fontes nem anúncios.
+
+    :return:
+        WebDriver
+    """
+    profile = profile or LEAN_PROFILE
+    return webdriver.Firefox(options=profile.to_options(headless_mode))
+
+
+class BrowserPool:
+    """
+    BrowserPool mantém um conjunto de navegadores abertos que podem ser
+    emprestados pelos scrapers, evitando iniciar um novo Firefox para
+    cada mangá.
+
+    Antes de voltar ao pool, cada navegador tem os cookies e o storage
+    apagados (o que também desfaz a confirmação de conteúdo +18), e
+    antes de ser emprestado é verificado se ele ainda responde.
+    """
+
+    def __init__(self,
+                 size: int = 1,
+                 headless_mode: bool = True,
+                 driver_factory: Callable[[], WebDriver] = None,
+                 profile: BrowserProfile = None) -> None:
+        """
+        :param size: número máximo de navegadores abertos ao mesmo tempo.
+
+        :param headless_mode: define se os navegadores serão ou não
+        renderizados. Por padrão, não são. Ignorado se driver_factory
+        for passado.
+
+        :param driver_factory: função que cria um novo navegador.
+        Por padrão, usa create_firefox.
+
+        :param profile: o perfil dos navegadores criados por
+        create_firefox. Ignorado se driver_factory for passado.
+
+        :return:
+            None
+        """
+        if size <= 0:
+            raise ValueError("O tamanho do pool deve ser maior que 0.")
+
+        self._size: int = size
+        self._driver_factory: Callable[[], WebDriver] = (
+            driver_factory or (lambda: create_firefox(headless_mode, profile))
+        )
+        # navegadores ociosos, prontos para serem emprestados.
+        self._idle: LifoQueue = LifoQueue()
+        # limita o número de navegadores emprestados ao mesmo tempo.
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._closed: bool = False
+        self._created: int = 0
+        self._reused: int = 0
+        self._discarded: int = 0
+
+    @property
+    def size(self) -> int:
+        """Número máximo de navegadores do pool."""
+        return self._size
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Estatísticas de uso do pool.
+
+        :return:
+            um dicionário com o número de navegadores criados,
+            reutilizados e descartados por falha.
+        """
+        with self._lock:
+            return {
+                "created": self._created,
+                "reused": self._reused,
+                "discarded": self._discarded,
+            }
+
+    @staticmethod
+    def _is_alive(browser: WebDriver) -> bool:
+        """Verifica se o navegador ainda responde a comandos."""
+        try:
+            return browser.execute_script("return 1;") == 1
+        except WebDriverException:
+            return False
+
+    @staticmethod
+    def _reset(browser: WebDriver) -> None:
+        """
+        Apaga o estado deixado pelo último uso do navegador: cookies,
+        localStorage, sessionStorage e a página aberta.
+        """
+        if browser.current_url.startswith("http"):
+            browser.execute_script(
+                "window.localStorage.clear(); window.sessionStorage.clear();"
+            )
+        browser.delete_all_cookies()
+        browser.get("about:blank")
+
+    def _discard(self, browser: WebDriver) -> None:
+        """Fecha um navegador que não será mais usado pelo pool."""
+        with self._lock:
+            self._discarded += 1
+        METRICS.count("browser_discarded")
+        try:
+            browser.quit()
+        except WebDriverException:
+            pass
+
+    def acquire(self) -> WebDriver:
+        """
+        Empresta um navegador do pool. Bloqueia caso todos os
+        navegadores estejam em uso.
+
+        :return:
+            WebDriver
+        """
+        if self._closed:
+            raise RuntimeError("O pool de navegadores já foi fechado.")
+        # o tempo esperando um navegador livre.
+        with METRICS.timer("pool_wait"):
+            self._slots.acquire()
+        try:
+            while True:
+                try:
+                    browser: WebDriver = self._idle.get_nowait()
+                except Empty:
+                    break
+                if self._is_alive(browser):
+                    with self._lock:
+                        self._reused += 1
+                    return browser
+                self._discard(browser)
+
+            with METRICS.timer("browser_start"):
+                browser = self._driver_factory()
+            with self._lock:
+                self._created += 1
+            return browser
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, browser: WebDriver, discard: bool = False) -> None:
+        """
+        Devolve um navegador ao pool.
+
+        :param browser: o navegador emprestado por acquire().
+
+        :param discard: se True, o navegador é fechado em vez de
+        voltar ao pool.
+
+        :return:
+            None
+        """
+        try:
+            if discard or self._closed:
+                self._discard(browser)
+                return
+            try:
+                self._reset(browser)
+            except WebDriverException:
+                self._discard(browser)
+                return
+            self._idle.put(browser)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def browser(self) -> Iterator[WebDriver]:
+        """
+        Empresta um navegador enquanto durar o bloco with. Se o bloco
+        lançar um WebDriverException, o navegador é descartado.
+
+        :return:
+            Iterator[WebDriver]
+        """
+        browser = self.acquire()
+        failed: bool = False
+        try:
+            yield browser
+        except WebDriverException:
+            failed = True
+            raise
+        finally:
+            self.release(browser, discard=failed)
+
+    def close(self) -> None:
+        """
+        Fecha todos os navegadores ociosos. Navegadores ainda emprestados
+        são fechados quando forem devolvidos.
+
+        :return:
+            None
+        """
+        self._closed = True
+        while True:
+            try:
+                browser: Optional[WebDriver] = self._idle.get_nowait()
+            except Empty:
+                return
+            try:
+                browser.quit()
+            except WebDriverException:
+                pass
+
+    def __enter__(self) -> "BrowserPool":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
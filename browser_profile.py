@@ -0,0 +1,396 @@
+"""
+Perfis do Firefox usados pelos scrapers.
+
+O perfil enxuto (LEAN_PROFILE) não baixa imagens, vídeos, fontes nem
+nada de fora do site (SITE_HOSTS), como anúncios e rastreamento, já que
+os scrapers só leem o texto e os atributos src das páginas. Para comparar o perfil enxuto com o
+padrão do Firefox, a partir da raiz do projeto:
+
+    python browser_profile.py https://mangalivre.net/manga/... --output r.json
+"""
+import argparse
+import base64
+import json
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from selenium import webdriver
+from selenium.webdriver.firefox import options
+from selenium.webdriver.firefox.webdriver import WebDriver
+
+# hosts de anúncios e rastreamento bloqueados pelo perfil enxuto. Os
+# subdomínios de cada host também são bloqueados.
+DEFAULT_BLOCKED_HOSTS: Tuple[str, ...] = (
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "adservice.google.com",
+    "facebook.net",
+    "facebook.com",
+    "connect.facebook.net",
+    "adnxs.com",
+    "amazon-adsystem.com",
+    "criteo.com",
+    "criteo.net",
+    "taboola.com",
+    "outbrain.com",
+    "popads.net",
+    "propellerads.com",
+    "exoclick.com",
+    "juicyads.com",
+    "hotjar.com",
+    "scorecardresearch.com",
+    "quantserve.com",
+    "disqus.com",
+    "disquscdn.com",
+)
+
+# hosts do site, os únicos acessados pelo perfil enxuto. Os subdomínios
+# também são acessados, então o CDN das capas e das páginas dos
+# capítulos (static.mangalivre.net, cdn.mangalivre.net) fica liberado.
+SITE_HOSTS: Tuple[str, ...] = ("mangalivre.net",)
+
+# proxy inexistente para onde o PAC manda os hosts bloqueados: a conexão
+# é recusada na hora, sem sair da máquina.
+_BLACKHOLE_PROXY: str = "PROXY 127.0.0.1:9"
+
+# script PAC, preenchido com as listas de hosts em json.
+_PAC_TEMPLATE: str = """
+function matches(host, domains) {
+    for (var i = 0; i < domains.length; i++) {
+        if (host === domains[i] || dnsDomainIs(host, "." + domains[i])) {
+            return true;
+        }
+    }
+    return false;
+}
+
+function FindProxyForURL(url, host) {
+    var blocked = %(blocked)s;
+    var firstParty = %(first_party)s;
+    if (matches(host, blocked)) {
+        return "%(blackhole)s";
+    }
+    if (firstParty.length && !matches(host, firstParty)) {
+        return "%(blackhole)s";
+    }
+    return "DIRECT";
+}
+"""
+
+# preferências que evitam tráfego e processos que os scrapers não usam:
+# pré-carregamento de links, telemetria e atualizações.
+_BACKGROUND_PREFERENCES: Dict[str, Any] = {
+    "network.prefetch-next": False,
+    "network.dns.disablePrefetch": True,
+    "network.http.speculative-parallel-limit": 0,
+    "network.predictor.enabled": False,
+    "browser.safebrowsing.malware.enabled": False,
+    "browser.safebrowsing.phishing.enabled": False,
+    "datareporting.healthreport.uploadEnabled": False,
+    "datareporting.policy.dataSubmissionEnabled": False,
+    "toolkit.telemetry.enabled": False,
+    "app.update.auto": False,
+    "extensions.update.enabled": False,
+    "browser.shell.checkDefaultBrowser": False,
+}
+
+# script que lê da Performance API quantas requisições a página fez e
+# quantos bytes foram transferidos. O transferSize de outros domínios é
+# 0 sem o cabeçalho Timing-Allow-Origin, então o total é uma estimativa
+# por baixo.
+_PERFORMANCE_SCRIPT: str = """
+    var nav = performance.getEntriesByType("navigation")[0];
+    var resources = performance.getEntriesByType("resource");
+    var transferred = nav ? nav.transferSize : 0;
+    for (var i = 0; i < resources.length; i++) {
+        transferred += resources[i].transferSize || 0;
+    }
+    return {
+        requests: resources.length + 1,
+        transferred: transferred,
+        dom_content_loaded: nav ? nav.domContentLoadedEventEnd : null,
+        load: nav ? nav.loadEventEnd : null
+    };
+"""
+
+
+class BrowserProfile:
+    """
+    BrowserProfile descreve o que o Firefox baixa e quanto cache e
+    memória ele pode usar, e cria as opções do navegador.
+
+    As imagens, vídeos e fontes são bloqueados por preferências do
+    Firefox. Os hosts de anúncios (e, com first_party_hosts, todos os
+    hosts de outros sites) são bloqueados por um script PAC que manda as
+    conexões para um proxy inexistente.
+    """
+
+    def __init__(self,
+                 block_images: bool = True,
+                 block_media: bool = True,
+                 block_fonts: bool = True,
+                 block_css: bool = False,
+                 blocked_hosts: Sequence[str] = DEFAULT_BLOCKED_HOSTS,
+                 first_party_hosts: Sequence[str] = (),
+                 page_load_strategy: str = "eager",
+                 memory_cache_mb: Optional[int] = 32,
+                 content_processes: Optional[int] = 1) -> None:
+        """
+        :param block_images: se True, as imagens não são baixadas. As
+        urls continuam nos atributos src das tags img.
+
+        :param block_media: se True, vídeos e áudios não tocam sozinhos
+        e não são baixados.
+
+        :param block_fonts: se True, as fontes das páginas não são
+        baixadas.
+
+        :param block_css: se True, pede ao Firefox para não carregar as
+        folhas de estilo. Nem toda versão do Firefox respeita essa
+        preferência, e as esperas por visibilidade do leitor dependem do
+        CSS, por isso fica desligado por padrão.
+
+        :param blocked_hosts: hosts bloqueados, junto com os subdomínios.
+
+        :param first_party_hosts: se não for vazio, só esses hosts (e os
+        subdomínios) são acessados e todos os outros são bloqueados.
+
+        :param page_load_strategy: "normal" espera o evento load,
+        "eager" só o DOMContentLoaded e "none" não espera.
+
+        :param memory_cache_mb: tamanho máximo do cache em memória. O
+        cache em disco fica desligado. Se None, usa o padrão do Firefox.
+
+        :param content_processes: número máximo de processos de conteúdo
+        do Firefox. Se None, usa o padrão do Firefox.
+
+        :return:
+            None
+        """
+        if page_load_strategy not in ("normal", "eager", "none"):
+            raise ValueError(
+                f"Estratégia de carregamento inválida: {page_load_strategy}"
+            )
+        self.block_images: bool = block_images
+        self.block_media: bool = block_media
+        self.block_fonts: bool = block_fonts
+        self.block_css: bool = block_css
+        self.blocked_hosts: Tuple[str, ...] = tuple(blocked_hosts)
+        self.first_party_hosts: Tuple[str, ...] = tuple(first_party_hosts)
+        self.page_load_strategy: str = page_load_strategy
+        self.memory_cache_mb: Optional[int] = memory_cache_mb
+        self.content_processes: Optional[int] = content_processes
+
+    def pac_script(self) -> Optional[str]:
+        """
+        O script PAC que bloqueia os hosts.
+
+        :return:
+            o script, ou None se nenhum host é bloqueado.
+        """
+        if not self.blocked_hosts and not self.first_party_hosts:
+            return None
+        return _PAC_TEMPLATE % {
+            "blocked": json.dumps(list(self.blocked_hosts)),
+            "first_party": json.dumps(list(self.first_party_hosts)),
+            "blackhole": _BLACKHOLE_PROXY,
+        }
+
+    def preferences(self) -> Dict[str, Any]:
+        """
+        As preferências do Firefox (about:config) deste perfil.
+
+        :return:
+            Dict[str, Any]
+        """
+        prefs: Dict[str, Any] = {}
+        if self.block_images:
+            # 2: bloqueia as imagens de todos os sites.
+            prefs["permissions.default.image"] = 2
+        if self.block_media:
+            # 5: bloqueia a reprodução automática de áudio e vídeo.
+            prefs["media.autoplay.default"] = 5
+            prefs["media.autoplay.blocking_policy"] = 2
+            prefs["media.preload.default"] = 0
+            prefs["media.preload.auto"] = 0
+        if self.block_fonts:
+            prefs["gfx.downloadable_fonts.enabled"] = False
+            prefs["browser.display.use_document_fonts"] = 0
+        if self.block_css:
+            prefs["permissions.default.stylesheet"] = 2
+
+        pac = self.pac_script()
+        if pac is not None:
+            encoded = base64.b64encode(pac.encode("utf-8")).decode("ascii")
+            # 2: configuração automática do proxy por um script PAC.
+            prefs["network.proxy.type"] = 2
+            prefs["network.proxy.autoconfig_url"] = (
+                f"data:application/x-ns-proxy-autoconfig;base64,{encoded}"
+            )
+            # os endereços locais não passam pelo PAC.
+            prefs["network.proxy.allow_hijacking_localhost"] = False
+
+        if self.memory_cache_mb is not None:
+            prefs["browser.cache.disk.enable"] = False
+            prefs["browser.cache.memory.enable"] = True
+            # em KB.
+            prefs["browser.cache.memory.capacity"] = self.memory_cache_mb * 1024
+            prefs["browser.cache.offline.enable"] = False
+            # páginas anteriores não ficam guardadas para o botão voltar.
+            prefs["browser.sessionhistory.max_total_viewers"] = 0
+            prefs["browser.sessionhistory.max_entries"] = 5
+            prefs["browser.sessionstore.max_tabs_undo"] = 0
+        if self.content_processes is not None:
+            prefs["dom.ipc.processCount"] = self.content_processes
+            prefs["dom.ipc.processCount.webIsolated"] = self.content_processes
+            prefs["fission.autostart"] = False
+
+        prefs.update(_BACKGROUND_PREFERENCES)
+        return prefs
+
+    def to_options(self, headless_mode: bool = True) -> options.Options:
+        """
+        Cria as opções do Firefox deste perfil.
+
+        :param headless_mode: define se o navegador será ou não
+        renderizado. Por padrão, não é.
+
+        :return:
+            options.Options
+        """
+        firefox_options: options.Options = options.Options()
+        if headless_mode:
+            firefox_options.add_argument("-headless")
+        firefox_options.page_load_strategy = self.page_load_strategy
+        for name, value in self.preferences().items():
+            firefox_options.set_preference(name, value)
+        return firefox_options
+
+
+# o perfil usado pelos scrapers. Os endereços locais (localhost,
+# 127.0.0.1) não passam pelo PAC, então o servidor dos benchmarks
+# continua acessível.
+LEAN_PROFILE: BrowserProfile = BrowserProfile(first_party_hosts=SITE_HOSTS)
+
+# o Firefox sem nenhuma das restrições, para comparação.
+FULL_PROFILE: BrowserProfile = BrowserProfile(
+    block_images=False,
+    block_media=False,
+    block_fonts=False,
+    blocked_hosts=(),
+    page_load_strategy="normal",
+    memory_cache_mb=None,
+    content_processes=None,
+)
+
+
+class PageLoadStats(NamedTuple):
+    """O custo de carregar uma página no navegador."""
+    url: str
+    # tempo em segundos até browser.get() retornar.
+    seconds: float
+    requests: int
+    # bytes transferidos pela rede, segundo a Performance API.
+    transferred_bytes: int
+    # instantes em milissegundos desde o início da navegação.
+    dom_content_loaded_ms: Optional[float]
+    load_ms: Optional[float]
+
+
+def measure_page_load(browser: WebDriver, url: str) -> PageLoadStats:
+    """
+    Carrega uma página e mede o tempo, o número de requisições e os
+    bytes transferidos.
+
+    :param browser: o navegador.
+
+    :param url: a url da página.
+
+    :return:
+        PageLoadStats
+    """
+    start = time.perf_counter()
+    browser.get(url)
+    seconds = time.perf_counter() - start
+    performance = browser.execute_script(_PERFORMANCE_SCRIPT) or {}
+    return PageLoadStats(
+        url=url,
+        seconds=seconds,
+        requests=int(performance.get("requests") or 0),
+        transferred_bytes=int(performance.get("transferred") or 0),
+        dom_content_loaded_ms=performance.get("dom_content_loaded"),
+        load_ms=performance.get("load"),
+    )
+
+
+def compare_profiles(
+        urls: Sequence[str],
+        profiles: Dict[str, BrowserProfile] = None,
+        headless_mode: bool = True) -> Dict[str, Dict[str, Any]]:
+    """
+    Carrega as mesmas páginas com cada perfil, um navegador novo por
+    perfil, e soma o custo delas.
+
+    :param urls: as urls das páginas.
+
+    :param profiles: os perfis, pelo nome. Por padrão, o enxuto e o
+    padrão do Firefox.
+
+    :param headless_mode: define se os navegadores serão ou não
+    renderizados.
+
+    :return:
+        para cada perfil, o total e a média por página do tempo, das
+        requisições e dos bytes transferidos.
+    """
+    profiles = profiles or {"lean": LEAN_PROFILE, "full": FULL_PROFILE}
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, profile in profiles.items():
+        browser = webdriver.Firefox(options=profile.to_options(headless_mode))
+        try:
+            pages: List[PageLoadStats] = [
+                measure_page_load(browser, url) for url in urls
+            ]
+        finally:
+            browser.quit()
+        seconds = sum(page.seconds for page in pages)
+        requests = sum(page.requests for page in pages)
+        transferred = sum(page.transferred_bytes for page in pages)
+        results[name] = {
+            "pages": len(pages),
+            "seconds": round(seconds, 3),
+            "seconds_per_page": round(seconds / len(pages), 3),
+            "requests": requests,
+            "requests_per_page": round(requests / len(pages), 1),
+            "transferred_bytes": transferred,
+            "transferred_bytes_per_page": transferred // len(pages),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compara o perfil enxuto do Firefox com o padrão."
+    )
+    parser.add_argument("urls", nargs="+", help="as páginas carregadas.")
+    parser.add_argument(
+        "--show", action="store_true", help="renderiza os navegadores."
+    )
+    parser.add_argument(
+        "--output", help="salva os resultados em um arquivo json."
+    )
+    args = parser.parse_args()
+
+    results = compare_profiles(args.urls, headless_mode=not args.show)
+    output = json.dumps(results, indent=4, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Exporta o catálogo inteiro do JsonDB, um mangá de cada vez, para
+JSON Lines ou para uma tabela de capítulos/páginas em CSV ou Parquet.
+
+Uso, a partir da raiz do projeto:
+
+    python catalog_export.py jsonl catalogo.jsonl --fields title url author
+    python catalog_export.py table paginas.csv
+    python catalog_export.py table capitulos.parquet --skip-pages
+"""
+import argparse
+import csv
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+from json_database import JsonDB
+from manga_codec import MangaCodec, fastest_codec
+from manga_model import Chapter, MangaModel
+
+# o pyarrow é uma dependência opcional, usada só para exportar em Parquet.
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# os campos de um mangá, na ordem do json.
+MANGA_FIELDS = (
+    "title", "url", "author", "alternative_titles", "cover", "status",
+    "categories", "description", "chapters",
+)
+
+# as colunas da tabela de páginas. Com include_pages=False, as colunas
+# page_index e page_url ficam de fora e há uma linha por capítulo.
+PAGE_COLUMNS = (
+    "manga_url", "manga_title", "chapter_url", "number_of_chapter",
+    "number_of_pages", "page_index", "page_url",
+)
+
+
+def _chapter_dict(chapter: Chapter, include_pages: bool) -> Dict[str, Any]:
+    """O dicionário de um capítulo, sem montar a lista das páginas se
+    elas não forem exportadas."""
+    if include_pages:
+        return chapter.to_dict()
+    return {key: chapter[key] for key in chapter.keys() if key != "pages"}
+
+
+def _select_fields(
+        manga: MangaModel,
+        fields: Sequence[str],
+        include_pages: bool) -> Dict[str, Any]:
+    """Monta o dicionário de um mangá só com os campos escolhidos, sem
+    passar por manga.to_dict()."""
+    data: Dict[str, Any] = {}
+    for field in fields:
+        if field != "chapters":
+            data[field] = getattr(manga, field)
+        elif manga.chapters is None:
+            data[field] = None
+        else:
+            data[field] = [
+                _chapter_dict(chapter, include_pages)
+                for chapter in manga.chapters
+            ]
+    return data
+
+
+def export_jsonl(
+        file_dir: str,
+        mangas: Iterable[MangaModel] = None,
+        fields: Sequence[str] = None,
+        include_pages: bool = True,
+        codec: MangaCodec = None) -> int:
+    """
+    Escreve um mangá por linha em um arquivo JSON Lines. Os mangás são
+    lidos e escritos um de cada vez, então a memória usada não depende
+    do tamanho do catálogo.
+
+    :param file_dir: o path do arquivo de saída.
+
+    :param mangas: os mangás exportados. Por padrão, todos do JsonDB.
+
+    :param fields: os campos de cada mangá (ver MANGA_FIELDS). Por
+    padrão, todos.
+
+    :param include_pages: se False, as páginas dos capítulos não são
+    exportadas.
+
+    :param codec: o codec usado em cada linha. Deve gerar json compacto,
+    sem quebras de linha. Por padrão, fastest_codec().
+
+    :return:
+        o número de mangás exportados.
+
+    :raises ValueError: se algum campo não está em MANGA_FIELDS.
+    """
+    if fields is None:
+        fields = MANGA_FIELDS
+    unknown = set(fields) - set(MANGA_FIELDS)
+    if unknown:
+        raise ValueError(f"Campos desconhecidos: {sorted(unknown)}")
+    codec = codec or fastest_codec()
+    count: int = 0
+    with open(file_dir, "wb") as file:
+        for manga in JsonDB.iter_mangas() if mangas is None else mangas:
+            file.write(codec.encode(
+                _select_fields(manga, fields, include_pages)
+            ))
+            file.write(b"\n")
+            count += 1
+    return count
+
+
+def iter_page_rows(
+        mangas: Iterable[MangaModel],
+        include_pages: bool = True) -> Iterator[List[Any]]:
+    """
+    Percorre as linhas da tabela de páginas (ver PAGE_COLUMNS).
+
+    :param mangas: os mangás exportados.
+
+    :param include_pages: se False, gera uma linha por capítulo, sem as
+    colunas das páginas.
+
+    :return:
+        Iterator[List[Any]]
+    """
+    for manga in mangas:
+        for chapter in manga.chapters or []:
+            row = [
+                manga.url, manga.title, chapter["url"],
+                chapter["number_of_chapter"], chapter["number_of_pages"],
+            ]
+            if not include_pages:
+                yield row
+                continue
+            for index, page in enumerate(chapter["pages"]):
+                yield row + [index, page]
+
+
+def _batches(
+        rows: Iterator[List[Any]],
+        size: int) -> Iterator[List[List[Any]]]:
+    batch: List[List[Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_pages_table(
+        file_dir: str,
+        mangas: Iterable[MangaModel] = None,
+        file_format: str = "csv",
+        include_pages: bool = True,
+        batch_size: int = 50000) -> int:
+    """
+    Escreve uma tabela com uma linha por página (ou por capítulo) de
+    todos os mangás, lidos um de cada vez.
+
+    :param file_dir: o path do arquivo de saída.
+
+    :param mangas: os mangás exportados. Por padrão, todos do JsonDB.
+
+    :param file_format: "csv" ou "parquet". Parquet precisa do pyarrow.
+
+    :param include_pages: se False, gera uma linha por capítulo.
+
+    :param batch_size: número de linhas por lote escrito no Parquet.
+
+    :return:
+        o número de linhas exportadas.
+    """
+    columns = list(PAGE_COLUMNS if include_pages else PAGE_COLUMNS[:5])
+    rows = iter_page_rows(
+        JsonDB.iter_mangas() if mangas is None else mangas, include_pages
+    )
+    count: int = 0
+
+    if file_format == "csv":
+        with open(file_dir, "w", encoding="utf-8", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        return count
+
+    if file_format != "parquet":
+        raise ValueError(f"Formato desconhecido: {file_format}")
+    if pyarrow is None:
+        raise ImportError("exportar em Parquet precisa do pacote pyarrow.")
+
+    schema = pyarrow.schema([
+        (column, pyarrow.int64() if column in ("number_of_pages", "page_index")
+         else pyarrow.string())
+        for column in columns
+    ])
+    with pyarrow.parquet.ParquetWriter(file_dir, schema) as writer:
+        for batch in _batches(rows, batch_size):
+            writer.write_table(pyarrow.Table.from_pylist(
+                [dict(zip(columns, row)) for row in batch], schema=schema
+            ))
+            count += len(batch)
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Exporta o catálogo do JsonDB."
+    )
+    parser.add_argument("kind", choices=("jsonl", "table"))
+    parser.add_argument("output")
+    parser.add_argument(
+        "--fields", nargs="+", choices=MANGA_FIELDS,
+        help="campos de cada mangá no JSON Lines. Por padrão, todos."
+    )
+    parser.add_argument(
+        "--skip-pages", action="store_true",
+        help="não exporta as urls das páginas."
+    )
+    args = parser.parse_args()
+
+    if args.kind == "jsonl":
+        count = export_jsonl(
+            args.output, fields=args.fields,
+            include_pages=not args.skip_pages,
+        )
+        print(f"{count} mangás exportados em {args.output}")
+        return
+    file_format = "parquet" if args.output.endswith(".parquet") else "csv"
+    count = export_pages_table(
+        args.output, file_format=file_format,
+        include_pages=not args.skip_pages,
+    )
+    print(f"{count} linhas exportadas em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+from urllib.parse import urljoin, urlsplit
+from http_client import FetchError, HttpClient
+from instrumentation import METRICS
+
+# endpoint paginado de onde a página do mangá carrega a lista de capítulos
+# enquanto o usuário desce a página.
+_CHAPTERS_LIST_PATH: str = (
+    "/series/chapters_list.json?page={page}&id_serie={id_serie}"
+)
+
+# o endpoint só responde a requisições feitas via javascript.
+_HEADERS: Dict[str, str] = {
+    "User-Agent": "Mozilla/5.0",
+    "X-Requested-With": "XMLHttpRequest",
+}
+
+# id da série no final da url do mangá.
+# ex: "https://mangalivre.net/manga/one-piece/13" -> "13"
+_SERIE_ID_REGEX = re.compile(r"/manga/[^/]+/(\d+)")
+
+
+class ChapterListResult(NamedTuple):
+    """Resultado do carregamento da lista de capítulos de um mangá."""
+    # os capítulos no mesmo formato de MangaModel.chapters.
+    chapters: List[Dict[str, Any]]
+    # False se a lista pode estar incompleta, por exemplo se alguma
+    # página do endpoint falhou.
+    complete: bool
+
+
+def get_serie_id(manga_url: str) -> Optional[str]:
+    """Obtém o id da série a partir da url do mangá.
+
+    :param manga_url: a url da página do mangá.
+
+    :return:
+        o id da série ou None se a url não tiver o formato esperado.
+    """
+    match = _SERIE_ID_REGEX.search(urlsplit(manga_url).path)
+    return match.group(1) if match else None
+
+
+def extract_chapters_from_payload(
+        payload: Any,
+        page_url: str) -> Optional[List[Dict[str, Any]]]:
+    """Obtém os capítulos de uma página do endpoint da lista de capítulos.
+
+    :param payload: o json da página, já convertido em dicionário.
+
+    :param page_url: url usada para montar as urls absolutas dos capítulos.
+
+    :return:
+        uma lista de capítulos, vazia quando a página está depois da
+        última, ou None se o json não tiver o formato esperado (ex: sem
+        a chave "chapters" ou com uma mensagem de erro).
+    """
+    if not isinstance(payload, dict):
+        return None
+    chapters = payload.get("chapters")
+    # depois da última página, o endpoint responde "chapters": false.
+    # Qualquer outra coisa que não seja uma lista (chave ausente, null)
+    # não é o fim da lista.
+    if chapters is False:
+        return []
+    if not isinstance(chapters, list):
+        return None
+    if not all(isinstance(chapter, dict) for chapter in chapters):
+        return None
+
+    all_chapters: List[Dict[str, Any]] = []
+    for chapter in chapters:
+        releases = chapter.get("releases") or {}
+        # os releases costumam vir pelo id ({"7": {...}}), mas também
+        # podem vir em uma lista ([{...}]). Outro formato é um erro.
+        if isinstance(releases, dict):
+            releases = list(releases.values())
+        if not isinstance(releases, list):
+            return None
+        # cada scan que traduziu o capítulo é um release, todos com o
+        # mesmo capítulo. Usa o primeiro.
+        link = next(
+            (r.get("link") for r in releases
+             if isinstance(r, dict) and r.get("link")),
+            None,
+        )
+        if link is None:
+            continue
+        all_chapters.append({
+            "pages": [],
+            "number_of_pages": 0,
+            "number_of_chapter": f"Capítulo {chapter.get('number', '')}",
+            "url": urljoin(page_url, link),
+        })
+    return all_chapters
+
+
+class ChapterListLoader:
+    """
+    ChapterListLoader busca a lista de capítulos de um mangá diretamente
+    no endpoint paginado do site, várias páginas ao mesmo tempo, sem
+    precisar descer a página do mangá no navegador.
+    """
+
+    def __init__(self,
+                 client: HttpClient = None,
+                 max_workers: int = 4,
+                 max_pages: int = 1000) -> None:
+        """
+        :param client: o cliente HTTP usado nas requisições. Por padrão,
+        cria um cliente próprio.
+
+        :param max_workers: número de páginas requisitadas ao mesmo tempo.
+
+        :param max_pages: número máximo de páginas buscadas por mangá.
+
+        :return:
+            None
+        """
+        self._client: HttpClient = (
+            client or HttpClient(pool_size=max_workers)
+        )
+        self._max_workers: int = max_workers
+        self._max_pages: int = max_pages
+
+    def _get_page(self, url: str) -> Optional[List[Dict[str, Any]]]:
+        """Busca uma página do endpoint. Retorna None em caso de falha."""
+        try:
+            res = self._client.get(url, headers=_HEADERS)
+            return extract_chapters_from_payload(res.json(), url)
+        except (FetchError, ValueError) as error:
+            print(f"Erro ao buscar a lista de capítulos! {error}")
+            return None
+
+    def _iter_pages(
+            self,
+            executor: ThreadPoolExecutor,
+            urls: List[str]) -> Iterator[Optional[List[Dict[str, Any]]]]:
+        """Busca as páginas em lotes de max_workers, na ordem. O próximo
+        lote só é requisitado depois que o anterior foi consumido."""
+        for i in range(0, len(urls), self._max_workers):
+            yield from executor.map(
+                self._get_page, urls[i:i + self._max_workers]
+            )
+
+    def load(self, manga_url: str) -> ChapterListResult:
+        """
+        Busca todos os capítulos do mangá.
+
+        As páginas do endpoint são buscadas em lotes de max_workers,
+        até encontrar uma página vazia, que indica o fim da lista.
+
+        :param manga_url: a url da página do mangá.
+
+        :return:
+            ChapterListResult
+        """
+        serie_id = get_serie_id(manga_url)
+        if serie_id is None:
+            return ChapterListResult([], False)
+
+        # dict mantém a ordem e descarta capítulos repetidos entre páginas.
+        all_chapters: Dict[str, Dict[str, Any]] = {}
+        urls: List[str] = [
+            urljoin(manga_url, _CHAPTERS_LIST_PATH.format(
+                page=page, id_serie=serie_id
+            ))
+            for page in range(1, self._max_pages + 1)
+        ]
+        complete: bool = False
+        with METRICS.timer("chapter_list_load"), \
+                ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            for page_chapters in self._iter_pages(executor, urls):
+                # uma página falhou, então a lista está incompleta.
+                if page_chapters is None:
+                    break
+                # chegou ao fim da lista.
+                if not page_chapters:
+                    complete = True
+                    break
+                for chapter in page_chapters:
+                    all_chapters.setdefault(chapter["url"], chapter)
+
+        return ChapterListResult(list(all_chapters.values()), complete)
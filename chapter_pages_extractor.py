@@ -0,0 +1,79 @@
+from typing import Any, Dict, List, Optional
+from instrumentation import METRICS
+from manga_info_extractor import make_soup
+
+# script executado no leitor do capítulo (com execute_async_script) que
+# pede ao próprio site, com os cookies da sessão, o json com as urls de
+# todas as páginas do capítulo. O leitor guarda o id do capítulo e o
+# token de acesso em variáveis globais.
+READER_PAGES_SCRIPT: str = """
+    var done = arguments[arguments.length - 1];
+    var idRelease = window.READER_ID_RELEASE;
+    var token = window.READER_TOKEN;
+    if (!idRelease || !token) {
+        done(null);
+        return;
+    }
+    fetch("/leitor/pages/" + idRelease + ".json?key=" + token, {
+        credentials: "same-origin",
+        headers: {"X-Requested-With": "XMLHttpRequest"}
+    }).then(function (res) {
+        return res.ok ? res.json() : null;
+    }).then(done, function () {
+        done(null);
+    });
+"""
+
+# seletor css para as imagens das páginas já renderizadas no leitor.
+CSS_SELECTOR_READER_IMAGES: str = (
+    "#reader-wrapper div.manga-image img, "
+    "#reader-wrapper div.manga-page img"
+)
+
+
+def _image_url(image: Any) -> Optional[str]:
+    """Retorna a url de uma imagem do json do leitor, que pode ser
+    uma string ou um dicionário com uma url para cada formato."""
+    if isinstance(image, str):
+        return image
+    if isinstance(image, dict):
+        return image.get("legacy") or image.get("avif") or image.get("url")
+    return None
+
+
+def extract_pages_from_payload(payload: Optional[Dict[str, Any]]) -> List[str]:
+    """Obtém as urls das páginas de um capítulo a partir do json
+    retornado pelo leitor.
+
+    :param payload: o json do leitor, já convertido em dicionário.
+
+    :return:
+        uma lista com as urls das páginas, na ordem do capítulo. A lista
+        é vazia se o json não tiver o formato esperado.
+    """
+    if not isinstance(payload, dict):
+        return []
+    images = payload.get("images")
+    if not isinstance(images, list):
+        return []
+    urls = [_image_url(image) for image in images]
+    return [url for url in urls if url]
+
+
+def extract_pages_from_html(html: str) -> List[str]:
+    """Obtém as urls das páginas que já estão no html do leitor.
+
+    :param html: o código fonte da página do capítulo já renderizada.
+
+    :return:
+        uma lista com as urls das páginas, na ordem em que aparecem,
+        sem repetições.
+    """
+    with METRICS.timer("parse", page="reader"):
+        soup = make_soup(html)
+        pages: Dict[str, None] = {}
+        for img in soup.select(CSS_SELECTOR_READER_IMAGES):
+            src = img.get("src") or img.get("data-src")
+            if src:
+                pages[src] = None
+    return list(pages)
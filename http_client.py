@@ -0,0 +1,265 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from requests import RequestException, Response, Session
+from requests.adapters import HTTPAdapter
+from requests.utils import get_encoding_from_headers
+from instrumentation import METRICS
+from page_cache import CachedPage, PageCache
+from rate_limiter import HostRateLimiter
+
+
+class FetchError(Exception):
+    """Erro lançado quando uma url não pôde ser obtida, mesmo após
+    todas as tentativas."""
+
+    def __init__(self, url: str, reason: str, status_code: int = 0) -> None:
+        """
+        :param url: a url que falhou.
+
+        :param reason: descrição do erro.
+
+        :param status_code: o último status HTTP recebido, ou 0 se
+        nenhuma resposta foi recebida.
+
+        :return:
+            None
+        """
+        super().__init__(f"{url}: {reason}")
+        self.url: str = url
+        self.reason: str = reason
+        self.status_code: int = status_code
+
+
+class HttpClient:
+    """
+    HttpClient é um cliente HTTP com conexões persistentes (keep-alive)
+    reaproveitadas entre as requisições e com novas tentativas em caso
+    de falhas temporárias.
+
+    Entre as tentativas espera um tempo que cresce exponencialmente,
+    com uma variação aleatória (jitter), ou o tempo pedido pelo servidor
+    no cabeçalho Retry-After.
+
+    Com um PageCache, as respostas são salvas em disco e revalidadas
+    com If-None-Match/If-Modified-Since (ver PageCache).
+    """
+
+    # status HTTP que indicam uma falha temporária do servidor.
+    RETRY_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+    def __init__(self,
+                 pool_size: int = 10,
+                 max_retries: int = 4,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 30.0,
+                 timeout: float = 30.0,
+                 headers: Dict[str, str] = None,
+                 cache: PageCache = None) -> None:
+        """
+        :param pool_size: número máximo de conexões mantidas abertas
+        para cada host.
+
+        :param max_retries: número de novas tentativas após a primeira
+        falha.
+
+        :param backoff_base: tempo em segundos da primeira espera entre
+        tentativas. Dobra a cada nova tentativa.
+
+        :param backoff_max: tempo máximo em segundos de cada espera.
+
+        :param timeout: tempo máximo em segundos de cada requisição.
+
+        :param headers: cabeçalhos enviados em todas as requisições.
+
+        :param cache: o cache das páginas obtidas. Por padrão, sem cache.
+
+        :return:
+            None
+        """
+        self._max_retries: int = max_retries
+        self._backoff_base: float = backoff_base
+        self._backoff_max: float = backoff_max
+        self._timeout: float = timeout
+        self._cache: Optional[PageCache] = cache
+        self._session: Session = Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        if headers:
+            self._session.headers.update(headers)
+
+    def _backoff(self, attempt: int) -> float:
+        """Tempo de espera antes da tentativa seguinte (full jitter)."""
+        ceiling = min(self._backoff_max, self._backoff_base * 2 ** attempt)
+        return random.uniform(0, ceiling)
+
+    @staticmethod
+    def _retry_after(response: Response) -> Optional[float]:
+        """
+        Lê o cabeçalho Retry-After, que pode ser um número de segundos
+        ou uma data HTTP.
+
+        :return:
+            o tempo em segundos pedido pelo servidor ou None.
+        """
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, retry_date.timestamp() - time.time())
+
+    @property
+    def cache(self) -> Optional[PageCache]:
+        """O cache das páginas obtidas, ou None."""
+        return self._cache
+
+    @staticmethod
+    def _cached_response(page: CachedPage) -> Response:
+        """Monta uma resposta 200 a partir de uma página do cache."""
+        response = Response()
+        response.status_code = 200
+        response.url = page.final_url
+        response._content = page.body
+        if page.content_type:
+            response.headers["Content-Type"] = page.content_type
+        if page.etag:
+            response.headers["ETag"] = page.etag
+        if page.last_modified:
+            response.headers["Last-Modified"] = page.last_modified
+        response.encoding = get_encoding_from_headers(response.headers)
+        return response
+
+    def get(self,
+            url: str,
+            use_cache: bool = True,
+            rate_limiter: HostRateLimiter = None,
+            **kwargs) -> Response:
+        """
+        Faz uma requisição GET, tentando novamente em caso de falhas
+        temporárias.
+
+        Se o cliente tem um cache, uma página ainda válida no cache é
+        retornada sem acessar o site, e uma página vencida é revalidada:
+        se o servidor responder 304, a cópia do cache é retornada.
+
+        :param url: a url requisitada.
+
+        :param use_cache: se False, ignora o cache nesta requisição.
+
+        :param rate_limiter: se passado, cada tentativa, inclusive as
+        novas tentativas depois de uma falha, espera a vez do host nele.
+        Páginas ainda válidas no cache não esperam.
+
+        :param kwargs: argumentos extras repassados para Session.get.
+
+        :return:
+            a resposta com status 2xx ou 304.
+
+        :raises FetchError: se a url não pôde ser obtida, ou se não
+        está no cache em modo replay.
+        """
+        if self._cache is None or not use_cache or "params" in kwargs:
+            return self._get(url, rate_limiter, **kwargs)
+
+        page = self._cache.get(url)
+        if page is not None and self._cache.is_fresh(page):
+            METRICS.count("page_cache", result="hit", page="http")
+            return self._cached_response(page)
+        if self._cache.replay:
+            METRICS.count("page_cache", result="miss", page="http")
+            raise FetchError(url, "não está no cache (modo replay)")
+
+        if page is not None:
+            headers = dict(kwargs.get("headers") or {})
+            if page.etag:
+                headers["If-None-Match"] = page.etag
+            if page.last_modified:
+                headers["If-Modified-Since"] = page.last_modified
+            kwargs["headers"] = headers
+        response = self._get(url, rate_limiter, **kwargs)
+
+        if response.status_code == 304 and page is not None:
+            METRICS.count("page_cache", result="not_modified", page="http")
+            response.close()
+            self._cache.touch(
+                url,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+            )
+            return self._cached_response(page)
+        if response.status_code == 200:
+            self._cache.put(
+                url,
+                response.content,
+                final_url=response.url,
+                content_type=response.headers.get("Content-Type", ""),
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        return response
+
+    def _get(self,
+             url: str,
+             rate_limiter: Optional[HostRateLimiter] = None,
+             **kwargs) -> Response:
+        """Faz a requisição GET de fato, com as novas tentativas."""
+        kwargs.setdefault("timeout", self._timeout)
+        attempt: int = 0
+        while True:
+            delay: Optional[float] = None
+            if rate_limiter is not None:
+                rate_limiter.wait(url)
+            try:
+                with METRICS.timer("http_request"):
+                    response = self._session.get(url, **kwargs)
+            except RequestException as error:
+                if attempt >= self._max_retries:
+                    METRICS.count("http_failures")
+                    raise FetchError(url, str(error)) from error
+            else:
+                if response.ok or response.status_code == 304:
+                    return response
+                if (response.status_code not in self.RETRY_STATUS
+                        or attempt >= self._max_retries):
+                    METRICS.count("http_failures")
+                    raise FetchError(
+                        url,
+                        f"status {response.status_code}",
+                        response.status_code,
+                    )
+                delay = self._retry_after(response)
+                response.close()
+
+            if delay is None:
+                delay = self._backoff(attempt)
+            METRICS.count("http_retries")
+            with METRICS.timer("http_backoff"):
+                time.sleep(delay)
+            attempt += 1
+
+    def close(self) -> None:
+        """
+        Fecha todas as conexões abertas.
+
+        :return:
+            None
+        """
+        self._session.close()
+
+    def __enter__(self) -> "HttpClient":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
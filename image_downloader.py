@@ -0,0 +1,480 @@
+"""
+Baixa as imagens das páginas dos capítulos salvos no JsonDB.
+
+Uso, a partir da raiz do projeto:
+
+    python image_downloader.py --dir json_db/images --workers 8
+    python image_downloader.py --titles "Nome do Mangá" --per-host 2
+
+Cada imagem é salva uma única vez, com o nome igual ao sha256 do
+conteúdo (objects/ab/abcdef....jpg), e o capítulo recebe a chave
+"images", com a url, o sha256, o tamanho e o arquivo de cada página.
+"""
+import argparse
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+from requests import RequestException, Response
+from atomic_file import fsync_dir
+from http_client import FetchError, HttpClient
+from instrumentation import METRICS
+from json_database import JsonDB
+from manga_model import MangaModel
+from rate_limiter import HostRateLimiter
+
+# os servidores de imagens recusam requisições sem user-agent e sem
+# referer do site (STATUS - 403).
+_HEADERS: Dict[str, str] = {
+    "User-Agent": "Mozilla/5.0",
+    "Referer": "https://mangalivre.net/",
+}
+
+# tamanho em bytes de cada pedaço lido da resposta e escrito no disco.
+_CHUNK_SIZE: int = 64 * 1024
+
+# extensões aceitas, pelo Content-Type, quando a url não tem extensão.
+_EXTENSIONS: Dict[str, str] = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/avif": ".avif",
+}
+
+# funções chamadas quando as imagens de um capítulo terminam de baixar.
+ChapterCallback = Callable[[Dict[str, Any]], None]
+
+
+def _extension(url: str, content_type: str) -> str:
+    """A extensão do arquivo da imagem, ex: ".jpg"."""
+    content_type = content_type.split(";")[0].strip().lower()
+    if content_type in _EXTENSIONS:
+        return _EXTENSIONS[content_type]
+    extension = os.path.splitext(urlsplit(url).path)[1].lower()
+    if extension in _EXTENSIONS.values() or extension == ".jpeg":
+        return extension
+    return mimetypes.guess_extension(content_type) or ".bin"
+
+
+class ImageDownloader:
+    """
+    ImageDownloader baixa as imagens das páginas dos capítulos com
+    várias threads, reaproveitando as conexões de um HttpClient.
+
+    O número de downloads simultâneos para um mesmo host é limitado por
+    per_host. Cada download é escrito aos poucos em um arquivo .part e,
+    se for interrompido, continua de onde parou com o cabeçalho Range.
+    No fim, o arquivo é renomeado para o sha256 do conteúdo, então
+    imagens iguais (ex: páginas de créditos repetidas em todos os
+    capítulos) ocupam o espaço de uma.
+    """
+
+    def __init__(self,
+                 directory: str = "json_db/images",
+                 workers: int = 8,
+                 per_host: int = 4,
+                 requests_per_second: float = 0,
+                 max_attempts: int = 3,
+                 client: HttpClient = None) -> None:
+        """
+        :param directory: o diretório das imagens.
+
+        :param workers: número máximo de downloads simultâneos.
+
+        :param per_host: número máximo de downloads simultâneos para
+        um mesmo host.
+
+        :param requests_per_second: número máximo de downloads
+        iniciados por segundo para cada host. Se for 0, não há limite.
+
+        :param max_attempts: número de vezes que um download
+        interrompido no meio é continuado antes de desistir.
+
+        :param client: o cliente HTTP dos downloads. Por padrão, cria
+        um com uma conexão por worker.
+
+        :return:
+            None
+        """
+        if workers <= 0 or per_host <= 0:
+            raise ValueError("workers e per_host devem ser maiores que 0.")
+        self._directory: str = directory
+        self._objects_dir: str = os.path.join(directory, "objects")
+        self._parts_dir: str = os.path.join(directory, "parts")
+        self._workers: int = workers
+        self._per_host: int = per_host
+        self._max_attempts: int = max_attempts
+        self._client: HttpClient = client or HttpClient(
+            pool_size=workers, headers=_HEADERS
+        )
+        self._rate_limiter = HostRateLimiter(requests_per_second)
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        # url -> download em andamento, para baixar cada url uma vez só.
+        self._in_flight: Dict[str, Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {
+            "downloaded": 0,
+            "reused": 0,
+            "duplicates": 0,
+            "resumed": 0,
+            "failed": 0,
+            "bytes": 0,
+        }
+        os.makedirs(self._objects_dir, exist_ok=True)
+        os.makedirs(self._parts_dir, exist_ok=True)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Estatísticas dos downloads.
+
+        :return:
+            um dicionário com o número de imagens baixadas, já salvas
+            antes (reused), com conteúdo igual a outra já salva
+            (duplicates), continuadas de um .part (resumed), que falharam
+            e o total de bytes baixados.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(
+                    self._per_host
+                )
+            return slot
+
+    def path_of(self, image: Dict[str, Any]) -> str:
+        """
+        O path de uma imagem já baixada.
+
+        :param image: um item de chapter["images"].
+
+        :return:
+            str
+        """
+        return os.path.join(self._directory, image["file"])
+
+    def _is_stored(self, image: Optional[Dict[str, Any]]) -> bool:
+        """Verifica se uma imagem registrada ainda está no disco, com o
+        tamanho registrado."""
+        if not image or not image.get("file"):
+            return False
+        try:
+            return os.path.getsize(self.path_of(image)) == image["size"]
+        except OSError:
+            return False
+
+    def _part_path(self, url: str) -> str:
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self._parts_dir, name + ".part")
+
+    @staticmethod
+    def _hash_file(file_dir: str) -> Any:
+        """O sha256 do que já foi baixado em um .part."""
+        sha256 = hashlib.sha256()
+        with open(file_dir, "rb") as file:
+            for chunk in iter(lambda: file.read(_CHUNK_SIZE), b""):
+                sha256.update(chunk)
+        return sha256
+
+    @staticmethod
+    def _range_start(response: Response) -> Optional[int]:
+        """O primeiro byte de uma resposta 206, do cabeçalho
+        Content-Range (ex: "bytes 1000-4999/5000")."""
+        value = response.headers.get("Content-Range", "")
+        try:
+            return int(value.split()[1].split("-")[0])
+        except (IndexError, ValueError):
+            return None
+
+    def _request(self, url: str, offset: int) -> Response:
+        """Pede a imagem a partir do byte offset."""
+        headers: Dict[str, str] = {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+        # as novas tentativas do HttpClient também esperam o limite.
+        return self._client.get(
+            url, use_cache=False, rate_limiter=self._rate_limiter,
+            stream=True, headers=headers,
+        )
+
+    def _fetch(self, url: str) -> Dict[str, Any]:
+        """
+        Baixa uma imagem para um .part, continuando o .part de uma
+        tentativa anterior se existir, e o move para objects/.
+
+        :raises FetchError: se a imagem não pôde ser baixada.
+        """
+        part_path = self._part_path(url)
+        for attempt in range(1, self._max_attempts + 1):
+            offset = (
+                os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            )
+            try:
+                response = self._request(url, offset)
+            except FetchError as error:
+                # o .part já tem a imagem inteira ou mais que ela.
+                if error.status_code != 416 or attempt >= self._max_attempts:
+                    raise
+                os.remove(part_path)
+                continue
+            if (offset and response.status_code == 206
+                    and self._range_start(response) != offset):
+                # o servidor respondeu outro trecho da imagem. Gravá-lo
+                # no .part corromperia a imagem, então ela é pedida de
+                # novo inteira, sem o Range, na próxima tentativa.
+                response.close()
+                os.remove(part_path)
+                if attempt >= self._max_attempts:
+                    raise FetchError(url, "trecho inesperado da imagem")
+                continue
+            try:
+                if (offset and response.status_code == 206
+                        and self._range_start(response) == offset):
+                    self._count("resumed")
+                    METRICS.count("image_resumed")
+                    sha256 = self._hash_file(part_path)
+                    mode = "ab"
+                else:
+                    # o servidor ignorou o Range: começa do zero.
+                    offset = 0
+                    sha256 = hashlib.sha256()
+                    mode = "wb"
+                received: int = 0
+                with open(part_path, mode) as file:
+                    for chunk in response.iter_content(_CHUNK_SIZE):
+                        file.write(chunk)
+                        sha256.update(chunk)
+                        received += len(chunk)
+                    file.flush()
+                    os.fsync(file.fileno())
+            except (RequestException, OSError) as error:
+                METRICS.count("image_interrupted")
+                if attempt >= self._max_attempts:
+                    raise FetchError(url, f"download interrompido: {error}")
+                continue
+            finally:
+                response.close()
+            self._count("bytes", received)
+            METRICS.count("image_bytes", received)
+
+            digest = sha256.hexdigest()
+            relative = os.path.join(
+                "objects",
+                digest[:2],
+                digest + _extension(url, response.headers.get(
+                    "Content-Type", ""
+                )),
+            )
+            object_path = os.path.join(self._directory, relative)
+            size = os.path.getsize(part_path)
+            if os.path.exists(object_path):
+                self._count("duplicates")
+                METRICS.count("image_duplicates")
+                os.remove(part_path)
+            else:
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                os.replace(part_path, object_path)
+                fsync_dir(os.path.dirname(object_path))
+            return {"url": url, "sha256": digest, "size": size,
+                    "file": relative}
+        raise FetchError(url, "download interrompido")
+
+    def download(self, url: str) -> Dict[str, Any]:
+        """
+        Baixa uma imagem, esperando o limite de downloads do host.
+
+        :param url: a url da imagem.
+
+        :return:
+            um dicionário com a url, o sha256, o tamanho em bytes e o
+            path do arquivo relativo ao diretório das imagens.
+
+        :raises FetchError: se a imagem não pôde ser baixada.
+        """
+        with self._host_slot(url):
+            try:
+                with METRICS.timer("image_download"):
+                    image = self._fetch(url)
+            except FetchError:
+                self._count("failed")
+                raise
+        self._count("downloaded")
+        return image
+
+    def _submit(self, url: str) -> Future:
+        """Agenda o download de uma url, ou retorna o download dela que
+        já está em andamento."""
+        with self._lock:
+            future = self._in_flight.get(url)
+            if future is None:
+                future = self._executor.submit(self.download, url)
+                self._in_flight[url] = future
+                future.add_done_callback(lambda _: self._forget(url))
+            return future
+
+    def _forget(self, url: str) -> None:
+        with self._lock:
+            self._in_flight.pop(url, None)
+
+    def download_manga(
+            self,
+            manga: MangaModel,
+            chapters: List[Dict[str, Any]] = None,
+            on_chapter_done: ChapterCallback = None) -> Dict[str, str]:
+        """
+        Baixa as imagens de todas as páginas dos capítulos e registra
+        em chapter["images"] a url, o sha256, o tamanho e o arquivo de
+        cada página, na ordem de chapter["pages"]. Páginas que falharam
+        ficam como None.
+
+        Páginas já registradas em chapter["images"] cujo arquivo ainda
+        está no disco não são baixadas de novo.
+
+        :param manga: um mangá com as páginas dos capítulos já obtidas.
+
+        :param chapters: os capítulos de manga.chapters que devem ser
+        baixados. Por padrão, todos os capítulos do mangá.
+
+        :param on_chapter_done: chamada com cada capítulo depois que
+        as imagens dele terminam de baixar.
+
+        :return:
+            um dicionário com a url e o erro de cada imagem que falhou.
+        """
+        if chapters is None:
+            chapters = manga.chapters or []
+        failed: Dict[str, str] = {}
+        owns_executor: bool = self._executor is None
+        if owns_executor:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers)
+        try:
+            # agenda os downloads de todos os capítulos antes de esperar
+            # pelo primeiro, para que as threads não fiquem paradas.
+            scheduled = []
+            for chapter in chapters:
+                stored: Dict[str, Dict[str, Any]] = {
+                    image["url"]: image
+                    for image in chapter.get("images") or [] if image
+                }
+                items: List[Any] = []
+                for url in chapter.get("pages") or []:
+                    if self._is_stored(stored.get(url)):
+                        self._count("reused")
+                        items.append(stored[url])
+                    else:
+                        items.append(self._submit(url))
+                scheduled.append((chapter, items))
+
+            for chapter, items in scheduled:
+                images: List[Optional[Dict[str, Any]]] = []
+                for item in items:
+                    if not isinstance(item, Future):
+                        images.append(item)
+                        continue
+                    try:
+                        images.append(item.result())
+                    except FetchError as error:
+                        print(f"Erro ao baixar a imagem! {error}")
+                        failed[error.url] = error.reason
+                        images.append(None)
+                chapter["images"] = images
+                if on_chapter_done is not None:
+                    on_chapter_done(chapter)
+        finally:
+            if owns_executor:
+                self._executor.shutdown()
+                self._executor = None
+        return failed
+
+    def download_catalog(
+            self,
+            mangas: Iterable[MangaModel] = None,
+            save: Callable[[MangaModel], None] = None) -> Dict[str, int]:
+        """
+        Baixa as imagens de vários mangás, um de cada vez, salvando
+        cada mangá depois de baixado.
+
+        :param mangas: os mangás. Por padrão, todos os do JsonDB.
+
+        :param save: função que salva o mangá com as imagens
+        registradas. Por padrão, JsonDB.save_manga.
+
+        :return:
+            as estatísticas dos downloads (ver stats).
+        """
+        mangas = JsonDB.iter_mangas() if mangas is None else mangas
+        save = save or JsonDB.save_manga
+        for manga in mangas:
+            if not manga.chapters:
+                continue
+            failed = self.download_manga(manga)
+            save(manga)
+            if failed:
+                print(
+                    f"{len(failed)} imagens falharam! {manga.url}"
+                )
+        return self.stats
+
+    def close(self) -> None:
+        """
+        Fecha as conexões abertas.
+
+        :return:
+            None
+        """
+        self._client.close()
+
+    def __enter__(self) -> "ImageDownloader":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Baixa as imagens das páginas dos mangás salvos."
+    )
+    parser.add_argument("--dir", default="json_db/images")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--requests-per-second", type=float, default=0)
+    parser.add_argument(
+        "--titles", nargs="+",
+        help="só os mangás com esses títulos. Por padrão, todos."
+    )
+    args = parser.parse_args()
+
+    mangas: Optional[Iterable[MangaModel]] = None
+    if args.titles:
+        mangas = [
+            manga for manga in map(JsonDB.load_manga, args.titles) if manga
+        ]
+    with ImageDownloader(
+        directory=args.dir,
+        workers=args.workers,
+        per_host=args.per_host,
+        requests_per_second=args.requests_per_second,
+    ) as downloader:
+        stats = downloader.download_catalog(mangas)
+    JsonDB.close()
+    print(json.dumps(stats, indent=4))
+
+
+if __name__ == "__main__":
+    main()
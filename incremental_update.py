@@ -0,0 +1,57 @@
+from typing import Any, Dict, List, Optional
+from manga_model import MangaModel
+
+
+def is_chapter_complete(chapter: Dict[str, Any]) -> bool:
+    """Verifica se as páginas de um capítulo já foram obtidas.
+
+    :param chapter: um capítulo de MangaModel.chapters.
+
+    :return:
+        True se o capítulo tem páginas e o número de páginas bate
+        com a lista de páginas.
+    """
+    number_of_pages = chapter.get("number_of_pages", 0)
+    pages = chapter.get("pages", [])
+    return number_of_pages > 0 and number_of_pages == len(pages)
+
+
+def merge_stored_chapters(
+        manga: MangaModel,
+        stored: Optional[MangaModel]) -> List[Dict[str, Any]]:
+    """Copia para os capítulos recém listados de um mangá as páginas já
+    salvas de uma versão anterior dele, comparando os capítulos pela url.
+
+    Capítulos salvos que não aparecem mais na nova lista são mantidos
+    no fim de manga.chapters, para não perder dados caso a nova lista
+    esteja incompleta.
+
+    :param manga: o mangá recém obtido por get_manga_info().
+
+    :param stored: o mesmo mangá salvo anteriormente, ou None.
+
+    :return:
+        os capítulos de manga.chapters que ainda precisam ser obtidos:
+        os novos e os que estavam incompletos.
+    """
+    if stored is None or not stored.chapters:
+        return list(manga.chapters)
+
+    stored_chapters: Dict[str, Dict[str, Any]] = {
+        chapter["url"]: chapter for chapter in stored.chapters
+    }
+    pending: List[Dict[str, Any]] = []
+    for chapter in manga.chapters:
+        stored_chapter = stored_chapters.pop(chapter["url"], None)
+        if stored_chapter is not None and is_chapter_complete(stored_chapter):
+            chapter["pages"] = stored_chapter["pages"]
+            chapter["number_of_pages"] = stored_chapter["number_of_pages"]
+            # as imagens já baixadas por ImageDownloader.
+            if "images" in stored_chapter:
+                chapter["images"] = stored_chapter["images"]
+        else:
+            pending.append(chapter)
+
+    # os que sobraram não estão mais na lista do site.
+    manga.chapters.extend(stored_chapters.values())
+    return pending
@@ -0,0 +1,382 @@
+import json
+import sys
+import threading
+import time
+from abc import ABC
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+from atomic_file import atomic_write
+
+# limites em segundos dos baldes dos histogramas de latência.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60,
+)
+
+# prefixo dos nomes das métricas no formato do Prometheus.
+_PROMETHEUS_PREFIX: str = "mangalivre_scraper_"
+
+# uma métrica é identificada pelo nome e pelos rótulos, ex:
+# ("wait", (("condition", "page_turn"),)).
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, Any]) -> _Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_key(key: _Key) -> str:
+    name, labels = key
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+
+def _prometheus_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    """Formata os rótulos como no Prometheus, ex: {page="manga"}."""
+    if not labels:
+        return ""
+    parts = []
+    for name, value in labels:
+        value = value.replace("\\", "\\\\").replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Histogram:
+    """
+    Histograma de durações em baldes fixos, como os do Prometheus.
+    Guarda também o total, o mínimo e o máximo.
+    """
+
+    __slots__ = ("buckets", "bucket_counts", "count", "sum", "min", "max")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets: Tuple[float, ...] = buckets
+        # o último balde conta os valores maiores que todos os limites.
+        self.bucket_counts: List[int] = [0] * (len(buckets) + 1)
+        self.count: int = 0
+        self.sum: float = 0.0
+        self.min: float = float("inf")
+        self.max: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, fraction: float) -> float:
+        """
+        Estima um quantil pelo limite superior do balde onde ele cai.
+
+        :param fraction: o quantil, ex: 0.95.
+
+        :return:
+            o valor estimado, nunca maior que o máximo observado.
+        """
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen: int = 0
+        for limit, bucket_count in zip(self.buckets, self.bucket_counts):
+            seen += bucket_count
+            if seen >= target:
+                return min(limit, self.max)
+        return self.max
+
+
+class MetricsSink(ABC):
+    """
+    Destino das métricas. on_event() recebe cada medição assim que ela
+    acontece e flush() recebe todas as métricas acumuladas, ex: no fim
+    do crawl. As duas não fazem nada por padrão.
+    """
+
+    def on_event(self, event: Dict[str, Any]) -> None:
+        """Recebe uma medição: {"ts", "type", "name", "labels", "value"}."""
+
+    def flush(self, metrics: "Metrics") -> None:
+        """Recebe todas as métricas acumuladas."""
+
+
+class JsonLogSink(MetricsSink):
+    """Escreve cada medição como uma linha json em um arquivo."""
+
+    def __init__(self, file: Any = None) -> None:
+        """
+        :param file: o path do arquivo, aberto em modo append, ou um
+        arquivo já aberto. Por padrão, sys.stderr.
+
+        :return:
+            None
+        """
+        self._owns_file: bool = isinstance(file, str)
+        self._file: IO[str] = (
+            open(file, "a", encoding="utf-8") if isinstance(file, str)
+            else file or sys.stderr
+        )
+        self._lock = threading.Lock()
+
+    def on_event(self, event: Dict[str, Any]) -> None:
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def flush(self, metrics: "Metrics") -> None:
+        with self._lock:
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._owns_file:
+                self._file.close()
+
+
+class PrometheusFileSink(MetricsSink):
+    """
+    Escreve as métricas no formato de texto do Prometheus, para serem
+    lidas pelo textfile collector do node_exporter. O arquivo é trocado
+    de forma atômica a cada flush().
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param path: o path do arquivo, ex: "json_db/metrics.prom".
+
+        :return:
+            None
+        """
+        self._path: str = path
+
+    def flush(self, metrics: "Metrics") -> None:
+        atomic_write(self._path, metrics.to_prometheus().encode("utf-8"))
+
+
+class SummarySink(MetricsSink):
+    """Imprime um resumo das métricas a cada flush()."""
+
+    def __init__(self, file: IO[str] = None) -> None:
+        """
+        :param file: onde o resumo é impresso. Por padrão, sys.stdout.
+
+        :return:
+            None
+        """
+        self._file: Optional[IO[str]] = file
+
+    def flush(self, metrics: "Metrics") -> None:
+        print(metrics.summary_text(), file=self._file or sys.stdout)
+
+
+class Metrics:
+    """
+    Metrics acumula contadores e histogramas de latência das operações
+    dos scrapers e os repassa para os MetricsSink registrados.
+
+        with METRICS.timer("browser_get", page="manga"):
+            browser.get(url)
+        METRICS.count("wait_timeouts", condition="page_turn")
+    """
+
+    def __init__(self,
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+                 sinks: List[MetricsSink] = None) -> None:
+        """
+        :param buckets: limites em segundos dos baldes dos histogramas.
+
+        :param sinks: os destinos das métricas.
+
+        :return:
+            None
+        """
+        self._buckets: Tuple[float, ...] = buckets
+        self._sinks: List[MetricsSink] = list(sinks or [])
+        self._counters: Dict[_Key, float] = {}
+        self._histograms: Dict[_Key, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink: MetricsSink) -> None:
+        self._sinks.append(sink)
+
+    def _emit(self, kind: str, key: _Key, value: float) -> None:
+        if not self._sinks:
+            return
+        event = {
+            "ts": round(time.time(), 3),
+            "type": kind,
+            "name": key[0],
+            "labels": dict(key[1]),
+            "value": value,
+        }
+        for sink in self._sinks:
+            sink.on_event(event)
+
+    def count(self, name: str, amount: float = 1, **labels: Any) -> None:
+        """
+        Soma amount a um contador.
+
+        :param name: o nome do contador, ex: "http_retries".
+
+        :param amount: o valor somado.
+
+        :param labels: os rótulos do contador, ex: condition="page_turn".
+
+        :return:
+            None
+        """
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+        self._emit("counter", key, amount)
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        """
+        Registra a duração de uma operação no histograma dela.
+
+        :param name: o nome da operação, ex: "browser_get".
+
+        :param seconds: a duração em segundos.
+
+        :param labels: os rótulos da operação, ex: page="manga".
+
+        :return:
+            None
+        """
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self._buckets)
+            histogram.observe(seconds)
+        self._emit("timer", key, round(seconds, 6))
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        """
+        Mede a duração do bloco with. Se o bloco lançar uma exceção, a
+        duração é registrada mesmo assim e o contador "<name>_errors" é
+        incrementado.
+
+        :param name: o nome da operação.
+
+        :param labels: os rótulos da operação.
+
+        :return:
+            Iterator[None]
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.count(name + "_errors", **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Resume as métricas acumuladas.
+
+        :return:
+            um dicionário com os contadores e, para cada operação, o
+            número de medições e os tempos total, médio, p50, p95 e
+            máximo em segundos.
+        """
+        with self._lock:
+            return {
+                "counters": {
+                    _format_key(key): value
+                    for key, value in sorted(self._counters.items())
+                },
+                "timers": {
+                    _format_key(key): {
+                        "count": h.count,
+                        "total": h.sum,
+                        "mean": h.sum / h.count,
+                        "p50": h.quantile(0.5),
+                        "p95": h.quantile(0.95),
+                        "max": h.max,
+                    }
+                    for key, h in sorted(self._histograms.items())
+                },
+            }
+
+    def summary_text(self) -> str:
+        """Resumo das métricas em forma de tabela."""
+        summary = self.summary()
+        lines = [
+            f"{'operação':<40}{'n':>8}{'total (s)':>12}{'média (ms)':>12}"
+            f"{'p95 (ms)':>12}{'máx (ms)':>12}"
+        ]
+        for name, timer in summary["timers"].items():
+            lines.append(
+                f"{name:<40}{timer['count']:>8}{timer['total']:>12.2f}"
+                f"{timer['mean'] * 1000:>12.1f}{timer['p95'] * 1000:>12.1f}"
+                f"{timer['max'] * 1000:>12.1f}"
+            )
+        if summary["counters"]:
+            lines.append("")
+            lines.append(f"{'contador':<40}{'valor':>8}")
+            for name, value in summary["counters"].items():
+                lines.append(f"{name:<40}{value:>8g}")
+        return "\n".join(lines)
+
+    def to_prometheus(self) -> str:
+        """
+        As métricas no formato de texto do Prometheus. Os contadores
+        terminam em "_total" e os histogramas em "_seconds".
+
+        :return:
+            str
+        """
+        lines: List[str] = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+            declared = set()
+            for (name, labels), value in counters:
+                metric = f"{_PROMETHEUS_PREFIX}{name}_total"
+                if metric not in declared:
+                    declared.add(metric)
+                    lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{_prometheus_labels(labels)} {value:g}")
+            for (name, labels), h in histograms:
+                metric = f"{_PROMETHEUS_PREFIX}{name}_seconds"
+                if metric not in declared:
+                    declared.add(metric)
+                    lines.append(f"# TYPE {metric} histogram")
+                cumulative: int = 0
+                limits = [f"{limit:g}" for limit in h.buckets] + ["+Inf"]
+                for limit, bucket_count in zip(limits, h.bucket_counts):
+                    cumulative += bucket_count
+                    bucket_labels = labels + (("le", limit),)
+                    lines.append(
+                        f"{metric}_bucket{_prometheus_labels(bucket_labels)} "
+                        f"{cumulative}"
+                    )
+                text = _prometheus_labels(labels)
+                lines.append(f"{metric}_sum{text} {h.sum:.6f}")
+                lines.append(f"{metric}_count{text} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self) -> None:
+        """
+        Repassa as métricas acumuladas para todos os destinos.
+
+        :return:
+            None
+        """
+        for sink in self._sinks:
+            sink.flush(self)
+
+    def reset(self) -> None:
+        """Apaga todas as métricas acumuladas."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+# as métricas do processo, usadas pelos scrapers.
+METRICS: Metrics = Metrics()
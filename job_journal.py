@@ -0,0 +1,567 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from manga_model import MangaModel
+
+# estados de um job.
+PENDING: str = "pending"
+RUNNING: str = "running"
+DONE: str = "done"
+FAILED: str = "failed"
+
+# tipo dos jobs que registram as execuções de cada tipo de job (ver
+# begin_run).
+_RUN_KIND: str = "run"
+
+_SCHEMA: str = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        kind TEXT NOT NULL,
+        key TEXT NOT NULL,
+        state TEXT NOT NULL DEFAULT 'pending',
+        owner TEXT,
+        lease_until REAL NOT NULL DEFAULT 0,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (kind, key)
+    );
+    CREATE INDEX IF NOT EXISTS jobs_state ON jobs (kind, state, lease_until);
+"""
+
+
+def default_owner() -> str:
+    """Identificador deste processo, usado como dono dos jobs."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobJournal:
+    """
+    JobJournal é um diário de jobs salvo em SQLite, que registra o
+    estado de cada mangá e de cada capítulo do crawl. Um job é
+    identificado pelo seu tipo (ex: "manga", "chapter") e por uma
+    chave (ex: a url).
+
+    Os jobs são emprestados (lease) por um tempo limitado. Se o processo
+    morrer com um job em andamento, o empréstimo expira e o job volta a
+    ficar disponível, então vários processos podem dividir os mesmos
+    jobs com segurança.
+    """
+
+    def __init__(self,
+                 path: str = "json_db/jobs.sqlite3",
+                 lease_seconds: float = 600,
+                 max_attempts: int = 3,
+                 wal: bool = True) -> None:
+        """
+        :param path: o path do arquivo do banco de dados.
+
+        :param lease_seconds: tempo em segundos que um job emprestado
+        fica reservado para o seu dono.
+
+        :param max_attempts: número de tentativas de um job antes de
+        ele ser marcado como FAILED.
+
+        :param wal: se True, usa o journal_mode WAL, mais rápido. O WAL
+        precisa de memória compartilhada entre os processos, então deve
+        ser False quando o arquivo está em um disco de rede (ex: NFS)
+        usado por várias máquinas.
+
+        :return:
+            None
+        """
+        self._lease_seconds: float = lease_seconds
+        self._max_attempts: int = max_attempts
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path,
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        with self._lock:
+            self._connection.execute(
+                f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}"
+            )
+            self._connection.executescript(_SCHEMA)
+
+    def _transaction(self, function: Callable[[sqlite3.Cursor], Any]) -> Any:
+        """Executa function dentro de uma transação exclusiva para
+        escrita, para que dois processos não emprestem o mesmo job."""
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                result = function(cursor)
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+            return result
+
+    def add(self, kind: str, keys: Iterable[str]) -> None:
+        """
+        Adiciona jobs pendentes. Jobs que já existem não são alterados.
+
+        :param kind: o tipo dos jobs.
+
+        :param keys: as chaves dos jobs.
+
+        :return:
+            None
+        """
+        now = time.time()
+        rows = [(kind, key, now) for key in keys]
+        self._transaction(lambda cursor: cursor.executemany(
+            "INSERT OR IGNORE INTO jobs (kind, key, updated_at) "
+            "VALUES (?, ?, ?)",
+            rows,
+        ))
+
+    def lease(self,
+              kind: str,
+              owner: str = None,
+              limit: int = 1) -> List[str]:
+        """
+        Empresta jobs pendentes, ou em andamento com o empréstimo
+        expirado, na ordem em que foram adicionados.
+
+        :param kind: o tipo dos jobs.
+
+        :param owner: quem está pegando os jobs. Por padrão, este processo.
+
+        :param limit: número máximo de jobs emprestados.
+
+        :return:
+            as chaves dos jobs emprestados. Vazia se não houver jobs.
+        """
+        owner = owner or default_owner()
+
+        def _lease(cursor: sqlite3.Cursor) -> List[str]:
+            now = time.time()
+            keys = [row[0] for row in cursor.execute(
+                "SELECT key FROM jobs WHERE kind = ? AND "
+                "(state = ? OR (state = ? AND lease_until < ?)) "
+                "ORDER BY rowid LIMIT ?",
+                (kind, PENDING, RUNNING, now, limit),
+            )]
+            cursor.executemany(
+                "UPDATE jobs SET state = ?, owner = ?, lease_until = ?, "
+                "attempts = attempts + 1, updated_at = ? "
+                "WHERE kind = ? AND key = ?",
+                [
+                    (RUNNING, owner, now + self._lease_seconds, now, kind, key)
+                    for key in keys
+                ],
+            )
+            return keys
+
+        return self._transaction(_lease)
+
+    def claim(self, kind: str, key: str, owner: str = None) -> bool:
+        """
+        Empresta um job específico se ele estiver pendente, ou em
+        andamento com o empréstimo expirado. A verificação e o
+        empréstimo são uma operação só, então duas threads (ou dois
+        processos) nunca pegam o mesmo job.
+
+        :param kind: o tipo do job.
+
+        :param key: a chave do job.
+
+        :param owner: quem está pegando o job. Por padrão, este processo.
+
+        :return:
+            True se o job foi emprestado para owner.
+        """
+        owner = owner or default_owner()
+        now = time.time()
+        return self._transaction(lambda cursor: cursor.execute(
+            "UPDATE jobs SET state = ?, owner = ?, lease_until = ?, "
+            "attempts = attempts + 1, updated_at = ? "
+            "WHERE kind = ? AND key = ? "
+            "AND (state = ? OR (state = ? AND lease_until < ?))",
+            (RUNNING, owner, now + self._lease_seconds, now, kind, key,
+             PENDING, RUNNING, now),
+        ).rowcount == 1)
+
+    def start(self,
+              kind: str,
+              keys: Iterable[str],
+              owner: str = None) -> None:
+        """
+        Marca jobs como em andamento sem passar por lease(), criando-os
+        se não existirem. Útil para registrar jobs que já foram
+        escolhidos por outro meio.
+
+        :param kind: o tipo dos jobs.
+
+        :param keys: as chaves dos jobs.
+
+        :param owner: quem está executando os jobs. Por padrão, este
+        processo.
+
+        :return:
+            None
+        """
+        owner = owner or default_owner()
+        now = time.time()
+        rows = [
+            (kind, key, RUNNING, owner, now + self._lease_seconds, now)
+            for key in keys
+        ]
+        self._transaction(lambda cursor: cursor.executemany(
+            "INSERT INTO jobs (kind, key, state, owner, lease_until, "
+            "attempts, updated_at) VALUES (?, ?, ?, ?, ?, 1, ?) "
+            "ON CONFLICT (kind, key) DO UPDATE SET state = excluded.state, "
+            "owner = excluded.owner, lease_until = excluded.lease_until, "
+            "attempts = attempts + 1, updated_at = excluded.updated_at",
+            rows,
+        ))
+
+    def renew(self,
+              kind: str,
+              keys: Iterable[str],
+              owner: str = None) -> int:
+        """
+        Renova o empréstimo de jobs em andamento de owner por mais
+        lease_seconds, para que um job demorado não seja emprestado
+        para outro dono enquanto ainda está sendo executado.
+
+        :param kind: o tipo dos jobs.
+
+        :param keys: as chaves dos jobs.
+
+        :param owner: o dono dos jobs. Por padrão, este processo.
+
+        :return:
+            o número de jobs renovados. Um job que não é mais de owner
+            (ex: o empréstimo expirou e outro dono o pegou) não é
+            renovado.
+        """
+        owner = owner or default_owner()
+        now = time.time()
+        rows = [
+            (now + self._lease_seconds, now, kind, key, RUNNING, owner)
+            for key in keys
+        ]
+
+        def _renew(cursor: sqlite3.Cursor) -> int:
+            renewed = 0
+            for row in rows:
+                renewed += cursor.execute(
+                    "UPDATE jobs SET lease_until = ?, updated_at = ? "
+                    "WHERE kind = ? AND key = ? AND state = ? AND owner = ?",
+                    row,
+                ).rowcount
+            return renewed
+
+        return self._transaction(_renew)
+
+    def complete(self,
+                 kind: str,
+                 keys: Iterable[str],
+                 owner: str = None) -> None:
+        """
+        Marca jobs como concluídos.
+
+        :param kind: o tipo dos jobs.
+
+        :param keys: as chaves dos jobs.
+
+        :param owner: se informado, só os jobs que ainda são de owner
+        são alterados, então um dono cujo empréstimo expirou não
+        sobrescreve o estado do dono atual.
+
+        :return:
+            None
+        """
+        now = time.time()
+        query = (
+            "UPDATE jobs SET state = ?, owner = NULL, lease_until = 0, "
+            "error = NULL, updated_at = ? WHERE kind = ? AND key = ?"
+        )
+        rows = [(DONE, now, kind, key) for key in keys]
+        if owner is not None:
+            query += " AND owner = ?"
+            rows = [row + (owner,) for row in rows]
+        self._transaction(lambda cursor: cursor.executemany(query, rows))
+
+    def fail(self,
+             kind: str,
+             key: str,
+             error: str,
+             owner: str = None) -> None:
+        """
+        Registra a falha de um job. Ele volta a ficar pendente até
+        atingir max_attempts tentativas, quando é marcado como FAILED.
+
+        :param kind: o tipo do job.
+
+        :param key: a chave do job.
+
+        :param error: a descrição do erro.
+
+        :param owner: se informado, o job só é alterado se ainda for de
+        owner (ver complete).
+
+        :return:
+            None
+        """
+        query = (
+            "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN ? ELSE ? "
+            "END, owner = NULL, lease_until = 0, error = ?, updated_at = ? "
+            "WHERE kind = ? AND key = ?"
+        )
+        params: tuple = (self._max_attempts, FAILED, PENDING, error,
+                         time.time(), kind, key)
+        if owner is not None:
+            query += " AND owner = ?"
+            params += (owner,)
+        self._transaction(lambda cursor: cursor.execute(query, params))
+
+    def reset(self, kind: str) -> int:
+        """
+        Devolve para pendentes os jobs concluídos e os que falharam,
+        zerando as tentativas, para que sejam executados de novo.
+
+        :param kind: o tipo dos jobs.
+
+        :return:
+            o número de jobs devolvidos.
+        """
+        return self._transaction(lambda cursor: cursor.execute(
+            "UPDATE jobs SET state = ?, owner = NULL, lease_until = 0, "
+            "attempts = 0, error = NULL, updated_at = ? "
+            "WHERE kind = ? AND state IN (?, ?)",
+            (PENDING, time.time(), kind, DONE, FAILED),
+        ).rowcount)
+
+    def begin_run(self, kind: str) -> bool:
+        """
+        Começa uma execução dos jobs de um tipo. Se a execução anterior
+        terminou (ver finish_run), os jobs concluídos e os que falharam
+        voltam a ser pendentes, então cada execução obtém tudo de novo
+        (ex: os capítulos novos de um mangá já obtido). Se ela foi
+        interrompida, é retomada: os jobs concluídos são pulados.
+
+        :param kind: o tipo dos jobs.
+
+        :return:
+            True se a execução anterior foi retomada.
+        """
+        resumed = self.state(_RUN_KIND, kind) == RUNNING
+        if not resumed:
+            self.reset(kind)
+        self.start(_RUN_KIND, [kind])
+        return resumed
+
+    def finish_run(self, kind: str) -> None:
+        """
+        Marca a execução atual dos jobs de um tipo como terminada. A
+        próxima begin_run começa uma execução nova.
+
+        :param kind: o tipo dos jobs.
+
+        :return:
+            None
+        """
+        self.complete(_RUN_KIND, [kind])
+
+    def requeue_running(self, kind: str = None) -> int:
+        """
+        Devolve para pendentes todos os jobs em andamento, mesmo os com
+        empréstimo válido. Só deve ser usado quando nenhum outro processo
+        está trabalhando, ex: ao reiniciar um crawl de um processo só.
+
+        :param kind: o tipo dos jobs. Por padrão, todos os tipos.
+
+        :return:
+            o número de jobs devolvidos.
+        """
+        query = (
+            "UPDATE jobs SET state = ?, owner = NULL, lease_until = 0 "
+            "WHERE state = ? AND kind != ?"
+        )
+        params: tuple = (PENDING, RUNNING, _RUN_KIND)
+        if kind is not None:
+            query += " AND kind = ?"
+            params += (kind,)
+        return self._transaction(
+            lambda cursor: cursor.execute(query, params).rowcount
+        )
+
+    def state(self, kind: str, key: str) -> Optional[str]:
+        """
+        Retorna o estado de um job, ou None se ele não existir.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT state FROM jobs WHERE kind = ? AND key = ?",
+                (kind, key),
+            ).fetchone()
+        return row[0] if row else None
+
+    def counts(self, kind: str) -> Dict[str, int]:
+        """
+        Conta os jobs de um tipo por estado.
+
+        :param kind: o tipo dos jobs.
+
+        :return:
+            um dicionário com o número de jobs em cada estado.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT state, COUNT(*) FROM jobs WHERE kind = ? "
+                "GROUP BY state",
+                (kind,),
+            ).fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        """
+        Fecha a conexão com o banco de dados.
+
+        :return:
+            None
+        """
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self) -> "JobJournal":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+class MangaCheckpoint:
+    """
+    MangaCheckpoint salva um mangá a cada poucos capítulos obtidos e só
+    depois marca esses capítulos como concluídos no JobJournal. Assim,
+    um capítulo só fica DONE depois de estar salvo no disco.
+
+    Os métodos podem ser chamados por várias threads ao mesmo tempo.
+    """
+
+    # tipo dos jobs dos capítulos no JobJournal.
+    KIND: str = "chapter"
+
+    def __init__(self,
+                 journal: JobJournal,
+                 manga: MangaModel,
+                 save_manga: Callable[[MangaModel], None],
+                 every: int = 10,
+                 flush: Callable[[], None] = None,
+                 owner: str = None,
+                 renew: Callable[[], Any] = None) -> None:
+        """
+        :param journal: o diário onde os capítulos são registrados.
+
+        :param manga: o mangá cujos capítulos estão sendo obtidos.
+
+        :param save_manga: função que salva o mangá, ex: JsonDB.save_manga.
+
+        :param every: número de capítulos obtidos entre cada salvamento.
+
+        :param flush: função chamada depois de save_manga para garantir
+        que o mangá está no disco, ex: JsonDB.flush quando o banco de
+        dados grava em segundo plano.
+
+        :param owner: o dono dos jobs dos capítulos. Por padrão, este
+        processo.
+
+        :param renew: função chamada a cada capítulo obtido ou que
+        falhou, ex: para renovar o empréstimo do job do mangá enquanto
+        os capítulos são obtidos.
+
+        :return:
+            None
+        """
+        self._journal: JobJournal = journal
+        self._manga: MangaModel = manga
+        self._save_manga: Callable[[MangaModel], None] = save_manga
+        self._every: int = every
+        self._flush_storage: Optional[Callable[[], None]] = flush
+        self._owner: Optional[str] = owner
+        self._renew: Optional[Callable[[], Any]] = renew
+        # capítulos obtidos desde o último salvamento.
+        self._unsaved: List[str] = []
+        # urls dos capítulos que falharam.
+        self._failed: List[str] = []
+        self._lock = threading.Lock()
+
+    def start(self, chapters: List[Dict[str, Any]]) -> None:
+        """
+        Registra os capítulos que serão obtidos como em andamento, em
+        uma única transação.
+
+        :param chapters: os capítulos que serão obtidos.
+
+        :return:
+            None
+        """
+        self._journal.start(
+            self.KIND, [chapter["url"] for chapter in chapters], self._owner
+        )
+
+    def chapter_done(self, chapter: Dict[str, Any]) -> None:
+        """
+        Registra um capítulo obtido, salvando o mangá se necessário.
+
+        :param chapter: o capítulo obtido.
+
+        :return:
+            None
+        """
+        if self._renew is not None:
+            self._renew()
+        with self._lock:
+            self._unsaved.append(chapter["url"])
+            if len(self._unsaved) >= self._every:
+                self._flush()
+
+    def chapter_failed(self, chapter: Dict[str, Any], error: str) -> None:
+        """
+        Registra a falha de um capítulo.
+
+        :param chapter: o capítulo que falhou.
+
+        :param error: a descrição do erro.
+
+        :return:
+            None
+        """
+        if self._renew is not None:
+            self._renew()
+        with self._lock:
+            self._failed.append(chapter["url"])
+        self._journal.fail(self.KIND, chapter["url"], error, self._owner)
+
+    @property
+    def failed_chapters(self) -> List[str]:
+        """As urls dos capítulos que falharam. Enquanto houver algum, o
+        mangá não deve ser marcado como concluído."""
+        with self._lock:
+            return list(self._failed)
+
+    def _flush(self) -> None:
+        self._save_manga(self._manga)
+        if self._flush_storage is not None:
+            self._flush_storage()
+        self._journal.complete(self.KIND, self._unsaved, self._owner)
+        self._unsaved = []
+
+    def flush(self) -> None:
+        """
+        Salva o mangá e marca como concluídos os capítulos ainda não
+        salvos.
+
+        :return:
+            None
+        """
+        with self._lock:
+            self._flush()
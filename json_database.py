@@ -1,20 +1,71 @@
-import os
-from json import dumps, loads
-from typing import List
+from typing import Callable, Iterator, List, Optional
 from manga_model import MangaModel
+from storage_backend import JsonFileBackend, StorageBackend
 
 
 class JsonDB:
     """
     JsonDB é um banco de dados simples, onde usa somente arquivos
     json para salvar os dados.
+
+    O armazenamento em si é feito por um StorageBackend. Por padrão,
+    JsonFileBackend, mas pode ser trocado com use_backend(), ex: por um
+    SQLiteBackend.
     """
 
-    # path completo dos diretórios do banco de dados json.
-    _FULL_DIR: str = "json_db/list_titles"
-    # path do banco de dados em si, onde serão armazeados os
-    # títulos.
-    _DB_DIR: str = "json_db"
+    # o banco de dados onde os mangás e os títulos são salvos.
+    _backend: StorageBackend = JsonFileBackend()
+
+    # funções chamadas com o mangá a cada save_manga(), ex: para manter
+    # um SearchIndex atualizado.
+    _listeners: List[Callable[[MangaModel], None]] = []
+
+    @classmethod
+    def use_backend(cls, backend: StorageBackend):
+        """
+        Troca o banco de dados usado pelo JsonDB.
+
+        :param backend: o novo banco de dados.
+
+        :return:
+            None
+        """
+        cls._backend = backend
+
+    @classmethod
+    def add_listener(cls, listener: Callable[[MangaModel], None]):
+        """
+        Registra uma função chamada com o mangá depois de cada
+        save_manga().
+
+        :param listener: a função, ex: SearchIndex.add.
+
+        :return:
+            None
+        """
+        cls._listeners.append(listener)
+
+    @classmethod
+    def remove_listener(cls, listener: Callable[[MangaModel], None]):
+        """
+        Remove uma função registrada com add_listener().
+
+        :param listener: a função registrada.
+
+        :return:
+            None
+        """
+        cls._listeners.remove(listener)
+
+    @classmethod
+    def get_backend(cls) -> StorageBackend:
+        """
+        Retorna o banco de dados usado pelo JsonDB.
+
+        :return:
+            StorageBackend
+        """
+        return cls._backend
 
     @classmethod
     def create_db_dir(cls):
@@ -24,11 +75,7 @@ class JsonDB:
         :return:
             None
         """
-        try:
-            os.makedirs(cls._FULL_DIR)
-        # o diretório já existe.
-        except FileExistsError:
-            return
+        cls._backend.create()
 
     @classmethod
     def save_list_titles(cls, list_titles: List[str]):
@@ -40,9 +87,7 @@ class JsonDB:
         :return:
             None
         """
-        file_dir = cls._FULL_DIR + "/list_titles.json"
-        with open(file_dir, "w+", encoding="utf-8") as file:
-            file.write(dumps(list_titles, ensure_ascii=False, indent=4))
+        cls._backend.save_list_titles(list_titles)
 
     @classmethod
     def update_list_title(cls, new_list_titles: List[str]):
@@ -55,15 +100,7 @@ class JsonDB:
         :return:
             None
         """
-        file_dir = cls._FULL_DIR + "/list_titles.json"
-        outdated_file = open(file_dir, "r", encoding="utf-8")
-        outdated_list = loads(outdated_file.read())
-        outdated_file.close()
-        with open(file_dir, "w+", encoding="utf-8") as updated_file:
-            for title in new_list_titles:
-                if title not in outdated_list:
-                    outdated_list.append(title)
-            updated_file.write(dumps(outdated_list, ensure_ascii=False, indent=4))
+        cls._backend.update_list_title(new_list_titles)
 
     @classmethod
     def save_manga(cls, manga: MangaModel):
@@ -75,6 +112,62 @@ class JsonDB:
         :return:
             None
         """
-        name_file = "-".join(manga.title.lower().split(" ")) + ".json"
-        with open(cls._DB_DIR + "/" + name_file, "w+", encoding="utf-8") as file:
-            file.write(manga.to_json())
+        cls._backend.save_manga(manga)
+        for listener in cls._listeners:
+            listener(manga)
+
+    @classmethod
+    def flush(cls):
+        """
+        Garante que todos os mangás salvos foram gravados no disco, caso
+        o banco de dados grave em segundo plano (ex: WriteBehindBackend).
+
+        :return:
+            None
+        """
+        cls._backend.flush()
+
+    @classmethod
+    def close(cls):
+        """
+        Grava os mangás pendentes e fecha o banco de dados.
+
+        :return:
+            None
+        """
+        cls._backend.close()
+
+    @classmethod
+    def load_manga(cls, title: str) -> Optional[MangaModel]:
+        """
+        Carrega um mangá salvo no banco de dados json.
+
+        :param title: o título do mangá.
+
+        :return:
+            o mangá salvo ou None se ele não estiver no banco de dados.
+        """
+        return cls._backend.load_manga(title)
+
+    @classmethod
+    def find_manga_by_url(cls, url: str) -> Optional[MangaModel]:
+        """
+        Procura um mangá pela sua url.
+
+        :param url: a url do mangá.
+
+        :return:
+            o mangá salvo ou None se ele não estiver no banco de dados.
+        """
+        return cls._backend.find_by_url(url)
+
+    @classmethod
+    def iter_mangas(cls) -> Iterator[MangaModel]:
+        """
+        Percorre todos os mangás do banco de dados, carregando um de
+        cada vez.
+
+        :return:
+            Iterator[MangaModel]
+        """
+        return cls._backend.iter_mangas()
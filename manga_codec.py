@@ -0,0 +1,120 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Union
+
+# o orjson é uma dependência opcional, bem mais rápida que o json da
+# biblioteca padrão.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class MangaCodec(ABC):
+    """
+    MangaCodec converte o dicionário de um mangá em bytes e vice-versa.
+    Todos os codecs leem qualquer json válido, então arquivos escritos
+    por um codec podem ser lidos por outro.
+    """
+
+    # nome usado em get_codec().
+    name: str = ""
+
+    @abstractmethod
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        """Converte o dicionário em json, já codificado em utf-8."""
+
+    def decode(self, data: Union[bytes, str]) -> Dict[str, Any]:
+        """Converte o json em dicionário."""
+        return json.loads(data)
+
+
+class JsonPrettyCodec(MangaCodec):
+    """json da biblioteca padrão, indentado. É o formato original
+    dos arquivos do JsonDB."""
+
+    name = "pretty"
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        return json.dumps(data, indent=4, ensure_ascii=False).encode("utf-8")
+
+
+class JsonCompactCodec(MangaCodec):
+    """json da biblioteca padrão, sem espaços nem indentação."""
+
+    name = "compact"
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        return json.dumps(
+            data, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+class OrjsonCodec(MangaCodec):
+    """json compacto gerado pelo orjson, que já produz bytes."""
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        if orjson is None:
+            raise ImportError("o codec 'orjson' precisa do pacote orjson.")
+
+    def encode(self, data: Dict[str, Any]) -> bytes:
+        return orjson.dumps(data)
+
+    def decode(self, data: Union[bytes, str]) -> Dict[str, Any]:
+        return orjson.loads(data)
+
+
+_CODECS: Dict[str, type] = {
+    codec.name: codec
+    for codec in (JsonPrettyCodec, JsonCompactCodec, OrjsonCodec)
+}
+
+# codec usado quando nenhum é escolhido, para manter o formato dos
+# arquivos já existentes.
+DEFAULT_CODEC: str = JsonPrettyCodec.name
+
+
+def available_codecs() -> List[str]:
+    """
+    Retorna os nomes dos codecs que podem ser usados neste ambiente.
+
+    :return:
+        uma lista com os nomes dos codecs.
+    """
+    return [
+        name for name in _CODECS
+        if name != OrjsonCodec.name or orjson is not None
+    ]
+
+
+def get_codec(name: str = None) -> MangaCodec:
+    """
+    Retorna um codec pelo nome.
+
+    :param name: "pretty", "compact" ou "orjson". Por padrão, DEFAULT_CODEC.
+
+    :return:
+        MangaCodec
+
+    :raises ValueError: se não existir um codec com esse nome.
+    """
+    name = name or DEFAULT_CODEC
+    try:
+        return _CODECS[name]()
+    except KeyError:
+        raise ValueError(f"Codec desconhecido: {name}") from None
+
+
+def fastest_codec() -> MangaCodec:
+    """
+    Retorna o codec compacto mais rápido disponível: orjson se estiver
+    instalado, ou o json compacto da biblioteca padrão.
+
+    :return:
+        MangaCodec
+    """
+    if orjson is not None:
+        return OrjsonCodec()
+    return JsonCompactCodec()
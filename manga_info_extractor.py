@@ -0,0 +1,269 @@
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup, Tag
+from instrumentation import METRICS
+from manga_model import MangaModel
+
+# parser usado pelo BeautifulSoup. O lxml é bem mais rápido que o
+# html.parser, mas é uma dependência opcional.
+try:
+    import lxml  # noqa: F401
+    _HTML_PARSER: str = "lxml"
+except ImportError:
+    _HTML_PARSER: str = "html.parser"
+
+
+# elementos que a página do mangá precisa ter para que as informações
+# sejam extraídas. Sem o título, extract_title() falha.
+REQUIRED_SELECTORS: Tuple[str, ...] = (
+    "div#series-data",
+    "div#series-data span.series-title h1",
+)
+
+
+def make_soup(html: str) -> BeautifulSoup:
+    """Faz o parse do html com o parser mais rápido disponível.
+
+    :param html: o código fonte da página.
+
+    :return:
+        a árvore do BeautifulSoup da página.
+    """
+    return BeautifulSoup(html, _HTML_PARSER)
+
+
+def _get_series_data(soup: BeautifulSoup) -> Optional[Tag]:
+    """Retorna a div com as informações do mangá ou None."""
+    return soup.find("div", {"id": "series-data"})
+
+
+def extract_title(series_data: Optional[Tag]) -> str:
+    """
+    Obtém o título do mangá.
+
+    :param series_data: a div "#series-data" da página do mangá.
+
+    :return:
+        uma string com o título do mangá.
+    """
+    span_title = series_data.find("span", {"class": "series-title"})
+    manga_title = span_title.find("h1")
+    return manga_title.text
+
+
+def extract_cover(series_data: Optional[Tag]) -> str:
+    """
+    Obtém a capa do mangá.
+
+    :param series_data: a div "#series-data" da página do mangá.
+
+    :return:
+        uma string contendo a url da capa do mangá.
+    """
+    try:
+        manga_cover = series_data.find("img", {"class": "cover"})
+        return manga_cover.get("src")
+    # se retornar None para a capa.
+    except AttributeError:
+        return ""
+
+
+def extract_status(series_data: Optional[Tag]) -> str:
+    """
+    Obtém o status do mangá.
+
+    :param series_data: a div "#series-data" da página do mangá.
+
+    :return:
+        uma string contendo "completo" caso o mangá esteja finalizado,
+        ou "em laçamento" caso o contrário.
+    """
+    try:
+        i_status = series_data.find("i", {"class": "complete-series"})
+        return i_status.text.lower()
+    # retornou None para o status.
+    except AttributeError:
+        return "em lançamento"
+
+
+def extract_author(series_data: Optional[Tag]) -> str:
+    """
+    Obtém o autor de mangá.
+
+    :param series_data: a div "#series-data" da página do mangá.
+
+    :return:
+        retorna uma string com o nome do autor do mangá.
+    """
+    try:
+        span_author = series_data.find("span", {"class": "series-author"})
+        author: str = ""
+        for tag in span_author:
+            if tag.name is None and tag.strip():
+                line_author = tag.strip().split(" ")
+                author = " ".join(name for name in line_author if name != "")
+    # retornou None para o autor.
+    except (AttributeError, TypeError):
+        return ""
+
+    return author
+
+
+def extract_categories(series_data: Optional[Tag]) -> List[str]:
+    """
+    Obtém as categorias do mangá.
+
+    :param series_data: a div "#series-data" da página do mangá.
+
+    :return:
+        uma lista de categorias das quais o mangá faz parte.
+    """
+    try:
+        div_categories = series_data.find("div", {"class": "carousel"})
+    # retornou None para as categorias.
+    except AttributeError:
+        return []
+    # Não possui categorias
+    if div_categories is None:
+        return []
+
+    return [
+        c for c in div_categories.text.replace(" ", "").split("\n")
+        if c.strip() != ""
+    ]
+
+
+def extract_description(series_data: Optional[Tag]) -> str:
+    """
+    Obtém a descrição do mangá.
+
+    :param series_data: a div "#series-data" da página do mangá.
+
+    :return:
+        uma string contendo a sinopse do mangá.
+    """
+    try:
+        span_description = series_data.find("span", {"class": "series-desc"})
+        return span_description.find("span").text
+    # retornou None para a descrição.
+    except AttributeError:
+        return ""
+
+
+def extract_alternative_titles(series_data: Optional[Tag]) -> List[str]:
+    """
+    Obtém os títulos alternativos do mangá.
+
+    :param series_data: a div "#series-data" da página do mangá.
+
+    :return:
+        uma lista com todos os títulos alternativos do mangá.
+    """
+    try:
+        ol_alternative_titles = series_data.find(
+            "ol", {"class": "series-synom"}
+        )
+        li_alternative_titles = ol_alternative_titles.find_all("li")
+    # retornou None para a lista de títulos alternativos.
+    except AttributeError:
+        return []
+    return [t.text for t in li_alternative_titles]
+
+
+def extract_list_chapters(
+        soup: BeautifulSoup,
+        page_url: str) -> List[Dict[str, Any]]:
+    """
+    Obtém a lista de capítulos do mangá. A lista é gerada por
+    javascript, então o html deve ser o da página já renderizada.
+
+    :param soup: a árvore da página do mangá.
+
+    :param page_url: a url da página, usada para montar as urls
+    absolutas dos capítulos.
+
+    :return:
+        uma lista de dicionários, cada um representando um capítulo
+        com o seu número e a sua url.
+    """
+    all_chapters: List[Dict[str, Any]] = []
+    try:
+        div_list_chapters = soup.find("div", {"id": "chapter-list"})
+        ul_chapters = div_list_chapters.find("ul", {"full-chapters-list"})
+        lis_chapters = ul_chapters.find_all("li")
+
+        for li_chapter in lis_chapters:
+            chapter_number = li_chapter.find("span", {"class": "cap-text"})
+            chapter_url = li_chapter.find(
+                "a",
+                {"class": "link-dark"}
+            ).get("href")
+            all_chapters.append({
+                "pages": [],
+                "number_of_pages": 0,
+                "number_of_chapter": chapter_number.text,
+                "url": urljoin(page_url, chapter_url),
+            })
+    # retornou None para a lista de capítulos.
+    except AttributeError:
+        return []
+    return all_chapters
+
+
+def find_missing_elements(soup: BeautifulSoup) -> List[str]:
+    """
+    Verifica se a página tem os elementos sem os quais as informações
+    do mangá não podem ser extraídas, ex: quando o html veio sem
+    ser renderizado pelo navegador ou é uma página de erro.
+
+    :param soup: a árvore da página do mangá.
+
+    :return:
+        os seletores dos elementos que faltam, ou uma lista vazia.
+    """
+    return [
+        selector for selector in REQUIRED_SELECTORS
+        if soup.select_one(selector) is None
+    ]
+
+
+def extract_manga_info_from_soup(
+        soup: BeautifulSoup,
+        page_url: str) -> MangaModel:
+    """Extrai todas as informações de um mangá da árvore da sua página.
+
+    :param soup: a árvore da página do mangá, ver make_soup().
+
+    :param page_url: a url da página do mangá.
+
+    :return:
+        MangaModel
+    """
+    series_data = _get_series_data(soup)
+    return MangaModel(
+        title=extract_title(series_data),
+        author=extract_author(series_data),
+        url=page_url,
+        cover=extract_cover(series_data),
+        status=extract_status(series_data),
+        description=extract_description(series_data),
+        categories=extract_categories(series_data),
+        alternative_titles=extract_alternative_titles(series_data),
+        chapters=extract_list_chapters(soup, page_url),
+    )
+
+
+def extract_manga_info(html: str, page_url: str) -> MangaModel:
+    """Extrai todas as informações de um mangá a partir do código
+    fonte da sua página. O html é analisado uma única vez e todos
+    os campos são retirados da mesma árvore.
+
+    :param html: o código fonte da página do mangá.
+
+    :param page_url: a url da página do mangá.
+
+    :return:
+        MangaModel
+    """
+    with METRICS.timer("parse", page="manga"):
+        return extract_manga_info_from_soup(make_soup(html), page_url)
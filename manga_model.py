@@ -1,9 +1,179 @@
-from typing import List, Dict, Any
+import sys
+from collections.abc import Sequence
+from os.path import commonprefix
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Union
 from json import dumps
+from manga_codec import MangaCodec, get_codec
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Interna uma string, para que valores repetidos (status,
+    categorias, prefixos de urls) ocupem a memória uma vez só."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class PageList(Sequence):
+    """
+    Lista imutável de urls de páginas que guarda o prefixo em comum das
+    urls (ex: "https://cdn.../capitulo-1/") uma única vez e só o final
+    de cada url. O prefixo é internado, então capítulos com o mesmo
+    prefixo também o compartilham.
+    """
+
+    __slots__ = ("_prefix", "_suffixes")
+
+    def __init__(self, urls: Iterable[str] = ()) -> None:
+        """
+        :param urls: as urls das páginas.
+
+        :return:
+            None
+        """
+        urls = list(urls)
+        prefix = commonprefix(urls) if len(urls) > 1 else ""
+        # corta o prefixo no último "/", para que urls parecidas de
+        # capítulos diferentes tenham o mesmo prefixo.
+        prefix = prefix[:prefix.rfind("/") + 1]
+        self._prefix: str = _intern(prefix)
+        self._suffixes: tuple = tuple(url[len(prefix):] for url in urls)
+
+    def __len__(self) -> int:
+        return len(self._suffixes)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            return [self._prefix + s for s in self._suffixes[index]]
+        return self._prefix + self._suffixes[index]
+
+    def __iter__(self) -> Iterator[str]:
+        prefix = self._prefix
+        return (prefix + suffix for suffix in self._suffixes)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (PageList, list, tuple)):
+            return len(self) == len(other) and all(
+                a == b for a, b in zip(self, other)
+            )
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"PageList({list(self)!r})"
+
+
+class Chapter:
+    """
+    Capítulo de um mangá. Ocupa menos memória que um dicionário, mas
+    pode ser usado como um: chapter["pages"], chapter.get("url"), etc.
+    Chaves desconhecidas são guardadas à parte e mantidas no json.
+    """
+
+    __slots__ = ("_pages", "number_of_pages", "number_of_chapter", "url",
+                 "_extra")
+
+    # as chaves do capítulo, na ordem em que aparecem no json.
+    KEYS = ("pages", "number_of_pages", "number_of_chapter", "url")
+
+    def __init__(self,
+                 url: str = "",
+                 number_of_chapter: str = "",
+                 pages: Iterable[str] = (),
+                 number_of_pages: int = 0,
+                 **extra: Any) -> None:
+        """
+        :param url: url do capítulo.
+
+        :param number_of_chapter: o número do capítulo, ex: "Capítulo 1".
+
+        :param pages: as urls das páginas do capítulo.
+
+        :param number_of_pages: o número de páginas do capítulo.
+
+        :param extra: outras chaves do capítulo, mantidas no json.
+
+        :return:
+            None
+        """
+        self.url: str = url
+        self.number_of_chapter: str = _intern(number_of_chapter)
+        self.pages = pages
+        self.number_of_pages: int = number_of_pages
+        self._extra: Optional[Dict[str, Any]] = dict(extra) or None
+
+    @property
+    def pages(self) -> PageList:
+        """As urls das páginas do capítulo."""
+        return self._pages
+
+    @pages.setter
+    def pages(self, urls: Iterable[str]) -> None:
+        self._pages = urls if isinstance(urls, PageList) else PageList(urls)
+
+    @classmethod
+    def from_dict(cls, chapter: Dict[str, Any]) -> "Chapter":
+        """Cria um capítulo a partir de um dicionário no formato do json."""
+        if isinstance(chapter, Chapter):
+            return chapter
+        return cls(**chapter)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Retorna o capítulo como um dicionário no formato do json."""
+        data: Dict[str, Any] = {
+            "pages": list(self._pages),
+            "number_of_pages": self.number_of_pages,
+            "number_of_chapter": self.number_of_chapter,
+            "url": self.url,
+        }
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    def keys(self) -> List[str]:
+        return list(self.KEYS) + list(self._extra or ())
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.KEYS:
+            return getattr(self, key)
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self.KEYS:
+            setattr(self, key, value)
+            return
+        if self._extra is None:
+            self._extra = {}
+        self._extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.KEYS or bool(self._extra and key in self._extra)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (Chapter, dict)):
+            other = other.to_dict() if isinstance(other, Chapter) else other
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Chapter({self.to_dict()!r})"
+
+
+def _to_dict(chapter: Union[Chapter, Dict[str, Any]]) -> Dict[str, Any]:
+    return chapter.to_dict() if isinstance(chapter, Chapter) else chapter
 
 
 class MangaModel:
     """Modelo que representa um mangá com todas as suas informações."""
+
+    __slots__ = ("title", "alternative_titles", "url", "cover", "status",
+                 "author", "categories", "description", "_chapters")
+
     def __init__(self,
                  title: str = "",
                  alternative_titles: List[str] = None,
@@ -31,7 +201,8 @@ class MangaModel:
 
         :param description: sinopse do mangá.
 
-        :param chapters: todos os capítulos do mangá até o momento.
+        :param chapters: todos os capítulos do mangá até o momento. Os
+        dicionários são convertidos em Chapter.
 
         """
 
@@ -39,14 +210,28 @@ class MangaModel:
         self.alternative_titles: List[str] = alternative_titles
         self.url: str = url
         self.cover: str = cover
-        self.status: str = status
-        self.author: str = author
-        self.categories: List[str] = categories
+        self.status: str = _intern(status)
+        self.author: str = _intern(author)
+        self.categories: List[str] = (
+            None if categories is None else [_intern(c) for c in categories]
+        )
         self.description: str = description
-        self.chapters: List[Dict[str, Any]] = chapters
+        self.chapters = chapters
 
-    def to_json(self) -> str:
-        data: Dict[str, Any] = {
+    @property
+    def chapters(self) -> List[Chapter]:
+        """Os capítulos do mangá."""
+        return self._chapters
+
+    @chapters.setter
+    def chapters(self, chapters: Optional[List[Dict[str, Any]]]) -> None:
+        self._chapters = (
+            None if chapters is None
+            else [Chapter.from_dict(chapter) for chapter in chapters]
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
             "title": self.title,
             "url": self.url,
             "author": self.author,
@@ -55,9 +240,45 @@ class MangaModel:
             "status": self.status,
             "categories": self.categories,
             "description": self.description,
-            "chapters": self.chapters,
+            "chapters": (
+                None if self._chapters is None
+                else [_to_dict(chapter) for chapter in self._chapters]
+            ),
         }
-        return dumps(data, indent=4, ensure_ascii=False)
+
+    def to_json(self) -> str:
+        return dumps(self.to_dict(), indent=4, ensure_ascii=False)
+
+    def to_bytes(self, codec: MangaCodec = None) -> bytes:
+        """
+        Converte o mangá em json já codificado em bytes, sem passar
+        por uma str intermediária.
+
+        :param codec: o codec usado. Por padrão, o json indentado, igual
+        ao de to_json().
+
+        :return:
+            bytes
+        """
+        return (codec or get_codec()).encode(self.to_dict())
+
+    @classmethod
+    def from_bytes(
+            cls,
+            data: Union[bytes, str],
+            codec: MangaCodec = None) -> "MangaModel":
+        """
+        Cria um mangá a partir do json em bytes.
+
+        :param data: o json do mangá.
+
+        :param codec: o codec usado para ler o json. Qualquer codec lê o
+        json de qualquer outro.
+
+        :return:
+            MangaModel
+        """
+        return cls.from_json((codec or get_codec()).decode(data))
 
     @classmethod
     def from_json(cls, json_content: Dict[str, Any]) -> "MangaModel":
@@ -0,0 +1,316 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+from atomic_file import atomic_write
+
+_SCHEMA: str = """
+    CREATE TABLE IF NOT EXISTS entries (
+        url TEXT PRIMARY KEY,
+        sha256 TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        final_url TEXT NOT NULL,
+        content_type TEXT NOT NULL DEFAULT '',
+        etag TEXT,
+        last_modified TEXT,
+        fetched_at REAL NOT NULL,
+        accessed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS entries_sha256 ON entries (sha256);
+    CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+"""
+
+# número de acessos guardados em memória antes de gravar accessed_at.
+_ACCESS_FLUSH_EVERY: int = 256
+
+
+class CachedPage(NamedTuple):
+    """Uma página salva no PageCache."""
+    url: str
+    body: bytes
+    # a url final, depois dos redirecionamentos.
+    final_url: str
+    content_type: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+    @property
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+    def age(self) -> float:
+        """Tempo em segundos desde que a página foi obtida ou
+        revalidada."""
+        return time.time() - self.fetched_at
+
+
+class PageCache:
+    """
+    PageCache é um cache em disco das páginas obtidas, pela url.
+
+    O conteúdo de cada página é salvo uma única vez, com o nome igual ao
+    sha256 do conteúdo (objects/ab/abcdef...), então páginas iguais
+    ocupam o espaço de uma. Um índice em SQLite guarda, para cada url, o
+    sha256, o ETag, o Last-Modified e quando a página foi obtida.
+
+    Uma página mais nova que ttl é usada sem acessar o site. Depois
+    disso, o HttpClient revalida a página com If-None-Match e
+    If-Modified-Since. Quando o cache passa de max_bytes, as páginas
+    usadas há mais tempo são apagadas (LRU).
+
+    Com replay=True, as páginas vêm só do cache, mesmo vencidas, e o
+    site nunca é acessado. Útil para rodar os extratores de novo sobre
+    um crawl anterior.
+
+    O total de bytes é lido do índice uma vez, ao abrir o cache, e
+    mantido em memória; por isso um diretório de cache não deve ser
+    usado por dois processos ao mesmo tempo. Os acessos de get() também
+    ficam em memória e são gravados em lote.
+    """
+
+    def __init__(self,
+                 directory: str = "json_db/cache",
+                 ttl: float = 24 * 60 * 60,
+                 max_bytes: int = 512 * 1024 * 1024,
+                 replay: bool = False) -> None:
+        """
+        :param directory: o diretório do cache.
+
+        :param ttl: tempo em segundos que uma página é usada sem ser
+        revalidada.
+
+        :param max_bytes: tamanho máximo em bytes das páginas salvas.
+
+        :param replay: se True, as páginas vêm só do cache.
+
+        :return:
+            None
+        """
+        self._directory: str = directory
+        self._objects_dir: str = os.path.join(directory, "objects")
+        self.ttl: float = ttl
+        self.max_bytes: int = max_bytes
+        self.replay: bool = replay
+        self._lock = threading.Lock()
+        os.makedirs(self._objects_dir, exist_ok=True)
+        self._connection = sqlite3.connect(
+            os.path.join(directory, "index.sqlite3"),
+            timeout=30,
+            check_same_thread=False,
+        )
+        # url -> quando foi lida por get(), ainda não gravado no índice.
+        self._accessed: Dict[str, float] = {}
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.executescript(_SCHEMA)
+            self._total: int = self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM "
+                "(SELECT DISTINCT sha256, size FROM entries)"
+            ).fetchone()[0]
+
+    def _object_path(self, sha256: str) -> str:
+        return os.path.join(self._objects_dir, sha256[:2], sha256)
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """
+        Retorna a página salva, mesmo que vencida. Use is_fresh() para
+        saber se ela pode ser usada sem revalidação.
+
+        :param url: a url da página.
+
+        :return:
+            a página salva ou None.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT sha256, size, final_url, content_type, etag, "
+                "last_modified, fetched_at FROM entries WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            sha256, size, final_url, content_type, etag, last_modified, \
+                fetched_at = row
+            try:
+                with open(self._object_path(sha256), "rb") as file:
+                    body = file.read()
+            except OSError:
+                # o objeto foi apagado fora do cache.
+                self._accessed.pop(url, None)
+                with self._connection:
+                    self._connection.execute(
+                        "DELETE FROM entries WHERE url = ?", (url,)
+                    )
+                if self._remove_unused_object(sha256):
+                    self._total -= size
+                return None
+            # a leitura não abre uma transação: o acesso é gravado
+            # depois, junto com os outros.
+            self._accessed[url] = time.time()
+            if len(self._accessed) >= _ACCESS_FLUSH_EVERY:
+                self._flush_accessed()
+        return CachedPage(url, body, final_url, content_type, etag,
+                          last_modified, fetched_at)
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        """
+        Informa se a página pode ser usada sem ser revalidada.
+
+        :param page: a página salva.
+
+        :return:
+            True se a página é mais nova que ttl ou se o cache está em
+            modo replay.
+        """
+        return self.replay or page.age() < self.ttl
+
+    def put(self,
+            url: str,
+            body: bytes,
+            final_url: str = None,
+            content_type: str = "",
+            etag: str = None,
+            last_modified: str = None) -> None:
+        """
+        Salva uma página no cache, substituindo a versão anterior.
+
+        :param url: a url da página.
+
+        :param body: o conteúdo da página.
+
+        :param final_url: a url final, depois dos redirecionamentos.
+
+        :param content_type: o cabeçalho Content-Type da resposta.
+
+        :param etag: o cabeçalho ETag da resposta.
+
+        :param last_modified: o cabeçalho Last-Modified da resposta.
+
+        :return:
+            None
+        """
+        sha256 = hashlib.sha256(body).hexdigest()
+        object_path = self._object_path(sha256)
+        with self._lock:
+            if not os.path.exists(object_path):
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                atomic_write(object_path, body)
+            now = time.time()
+            self._accessed.pop(url, None)
+            with self._connection:
+                old = self._connection.execute(
+                    "SELECT sha256, size FROM entries WHERE url = ?", (url,)
+                ).fetchone()
+                stored = self._connection.execute(
+                    "SELECT 1 FROM entries WHERE sha256 = ? LIMIT 1",
+                    (sha256,),
+                ).fetchone()
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO entries VALUES "
+                    "(?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url, sha256, len(body), final_url or url, content_type,
+                     etag, last_modified, now, now),
+                )
+            if stored is None:
+                self._total += len(body)
+            if old is not None and old[0] != sha256:
+                if self._remove_unused_object(old[0]):
+                    self._total -= old[1]
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def touch(self,
+              url: str,
+              etag: str = None,
+              last_modified: str = None) -> None:
+        """
+        Marca a página como revalidada agora, ex: depois de uma
+        resposta 304 (Not Modified).
+
+        :param url: a url da página.
+
+        :param etag: o novo ETag, se o servidor enviou um.
+
+        :param last_modified: o novo Last-Modified, se o servidor
+        enviou um.
+
+        :return:
+            None
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE entries SET fetched_at = ?, "
+                "etag = COALESCE(?, etag), "
+                "last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (time.time(), etag, last_modified, url),
+            )
+
+    def _remove_unused_object(self, sha256: str) -> bool:
+        """Apaga o objeto se nenhuma url o usa mais. Deve ser chamado
+        com self._lock.
+
+        :return:
+            True se o objeto foi apagado.
+        """
+        used = self._connection.execute(
+            "SELECT 1 FROM entries WHERE sha256 = ? LIMIT 1", (sha256,)
+        ).fetchone()
+        if used is not None:
+            return False
+        try:
+            os.remove(self._object_path(sha256))
+        except OSError:
+            pass
+        return True
+
+    def _flush_accessed(self) -> None:
+        """Grava no índice os acessos guardados em memória. Deve ser
+        chamado com self._lock."""
+        if not self._accessed:
+            return
+        with self._connection:
+            self._connection.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE url = ?",
+                [(accessed_at, url)
+                 for url, accessed_at in self._accessed.items()],
+            )
+        self._accessed.clear()
+
+    def _evict(self) -> None:
+        """Apaga as páginas usadas há mais tempo até o cache caber em
+        max_bytes. Deve ser chamado com self._lock."""
+        self._flush_accessed()
+        rows = self._connection.execute(
+            "SELECT url, sha256, size FROM entries ORDER BY accessed_at"
+        ).fetchall()
+        with self._connection:
+            for url, sha256, size in rows:
+                if self._total <= self.max_bytes:
+                    break
+                self._connection.execute(
+                    "DELETE FROM entries WHERE url = ?", (url,)
+                )
+                if self._remove_unused_object(sha256):
+                    self._total -= size
+
+    @property
+    def stats(self) -> dict:
+        """
+        Tamanho do cache.
+
+        :return:
+            um dicionário com o número de páginas e o total de bytes.
+        """
+        with self._lock:
+            entries = self._connection.execute(
+                "SELECT COUNT(*) FROM entries"
+            ).fetchone()[0]
+            return {"entries": entries, "bytes": self._total}
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_accessed()
+            self._connection.close()
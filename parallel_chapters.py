@@ -0,0 +1,230 @@
+import os
+import threading
+from queue import Empty, Queue
+from typing import Any, Callable, Dict, List, Optional
+from selenium.common.exceptions import WebDriverException
+from browser_pool import BrowserPool
+from manga_model import MangaModel
+from scraper_mangas_chapters import ScraperChapters
+
+# memória aproximada, em MB, usada por cada Firefox abrindo o leitor.
+_MEMORY_PER_BROWSER_MB: int = 700
+
+# funções chamadas quando um capítulo é obtido ou falha.
+ChapterCallback = Callable[[Dict[str, Any]], None]
+FailureCallback = Callable[[Dict[str, Any], str], None]
+
+
+def _available_memory_mb() -> int:
+    """Retorna a memória disponível em MB, ou 0 se não for possível
+    obtê-la (ex: fora do Linux)."""
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def suggest_workers(
+        memory_per_browser_mb: int = _MEMORY_PER_BROWSER_MB,
+        max_workers: int = 0) -> int:
+    """Sugere o número de navegadores que podem ser abertos ao mesmo
+    tempo, a partir do número de núcleos e da memória disponível.
+
+    :param memory_per_browser_mb: memória aproximada em MB usada por
+    cada navegador.
+
+    :param max_workers: limite superior para a sugestão. Se for 0,
+    não há limite.
+
+    :return:
+        o número sugerido de navegadores, no mínimo 1.
+    """
+    workers: int = os.cpu_count() or 1
+    memory_mb = _available_memory_mb()
+    if memory_mb:
+        workers = min(workers, memory_mb // memory_per_browser_mb)
+    if max_workers > 0:
+        workers = min(workers, max_workers)
+    return max(1, workers)
+
+
+class WorkerProgress:
+    """Progresso de um navegador de ParallelChapterScraper."""
+
+    def __init__(self, worker_id: int) -> None:
+        """
+        :param worker_id: o número do navegador, a partir de 0.
+
+        :return:
+            None
+        """
+        self.worker_id: int = worker_id
+        # número de capítulos obtidos com sucesso.
+        self.done: int = 0
+        # número de capítulos que falharam.
+        self.failed: int = 0
+        # url do capítulo sendo obtido no momento, ou "" se parado.
+        self.current: str = ""
+
+    def __repr__(self) -> str:
+        return (
+            f"WorkerProgress(worker_id={self.worker_id}, done={self.done}, "
+            f"failed={self.failed}, current={self.current!r})"
+        )
+
+
+class ParallelChapterScraper:
+    """
+    ParallelChapterScraper divide os capítulos de um mangá entre vários
+    navegadores emprestados de um BrowserPool.
+
+    Cada capítulo é preenchido no seu próprio dicionário em
+    manga.chapters, então a ordem dos capítulos não muda. Um capítulo
+    que falha é registrado em failed_chapters e não interrompe os outros.
+    """
+
+    def __init__(self,
+                 browser_pool: BrowserPool,
+                 workers: int = 0,
+                 timeout: int = 30) -> None:
+        """
+        :param browser_pool: o pool de onde os navegadores são emprestados.
+
+        :param workers: número de navegadores usados ao mesmo tempo. Se
+        for 0, usa suggest_workers() limitado ao tamanho do pool.
+
+        :param timeout: o timeout passado para cada ScraperChapters.
+
+        :return:
+            None
+        """
+        self._browser_pool: BrowserPool = browser_pool
+        self._workers: int = workers or suggest_workers(
+            max_workers=browser_pool.size
+        )
+        self._timeout: int = timeout
+        self._progress: List[WorkerProgress] = []
+        # url do capítulo -> erro, da última chamada de get_chapter_pages.
+        self.failed_chapters: Dict[str, str] = {}
+        self._on_chapter_done: Optional[ChapterCallback] = None
+        self._on_chapter_failed: Optional[FailureCallback] = None
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self) -> int:
+        """Número de navegadores usados ao mesmo tempo."""
+        return self._workers
+
+    @property
+    def progress(self) -> List[WorkerProgress]:
+        """O progresso de cada navegador na chamada atual (ou na última)
+        de get_chapter_pages."""
+        return list(self._progress)
+
+    def _record_failure(
+            self,
+            chapter: Dict[str, Any],
+            error: Exception) -> None:
+        url: str = chapter["url"]
+        with self._lock:
+            self.failed_chapters[url] = repr(error)
+        print(f"Erro ao obter o capítulo! {url}: {error!r}")
+        if self._on_chapter_failed is not None:
+            self._on_chapter_failed(chapter, repr(error))
+
+    def _work(self, chapters: Queue, progress: WorkerProgress) -> None:
+        """Obtém capítulos da fila até ela esvaziar."""
+        browser = self._browser_pool.acquire()
+        try:
+            scraper = ScraperChapters(timeout=self._timeout, browser=browser)
+            while True:
+                try:
+                    chapter = chapters.get_nowait()
+                except Empty:
+                    return
+                progress.current = chapter["url"]
+                try:
+                    scraper.get_chapter(chapter)
+                    progress.done += 1
+                    if self._on_chapter_done is not None:
+                        self._on_chapter_done(chapter)
+                except WebDriverException as error:
+                    progress.failed += 1
+                    self._record_failure(chapter, error)
+                    # o navegador pode ter travado, então é trocado.
+                    self._browser_pool.release(browser, discard=True)
+                    # se acquire falhar, não há navegador para devolver.
+                    browser = None
+                    browser = self._browser_pool.acquire()
+                    scraper = ScraperChapters(
+                        timeout=self._timeout, browser=browser
+                    )
+                except Exception as error:  # noqa: BLE001
+                    progress.failed += 1
+                    self._record_failure(chapter, error)
+                finally:
+                    progress.current = ""
+        finally:
+            if browser is not None:
+                self._browser_pool.release(browser)
+
+    def get_chapter_pages(
+            self,
+            manga: MangaModel,
+            chapters: List[Dict[str, Any]] = None,
+            on_chapter_done: ChapterCallback = None,
+            on_chapter_failed: FailureCallback = None) -> Dict[str, str]:
+        """Insere as páginas e o número de páginas em cada capítulo do
+        mangá, usando vários navegadores ao mesmo tempo.
+
+        :param manga: um modelo de mangá já inicializado.
+
+        :param chapters: os capítulos de manga.chapters que devem ser
+        obtidos. Por padrão, todos os capítulos do mangá.
+
+        :param on_chapter_done: chamada com cada capítulo obtido, na
+        thread do navegador que o obteve.
+
+        :param on_chapter_failed: chamada com cada capítulo que falhou e
+        a descrição do erro.
+
+        :return:
+            um dicionário com a url e o erro de cada capítulo que falhou.
+        """
+        self._on_chapter_done = on_chapter_done
+        self._on_chapter_failed = on_chapter_failed
+        if chapters is None:
+            chapters = manga.chapters
+        queue: Queue = Queue()
+        for chapter in chapters:
+            queue.put(chapter)
+
+        self.failed_chapters = {}
+        workers = min(self._workers, len(chapters))
+        self._progress = [WorkerProgress(i) for i in range(workers)]
+        threads = [
+            threading.Thread(
+                target=self._work,
+                args=(queue, progress),
+                name=f"chapters-worker-{progress.worker_id}",
+                daemon=True,
+            )
+            for progress in self._progress
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # capítulos que sobraram na fila porque nenhum navegador pôde
+        # ser aberto.
+        while not queue.empty():
+            chapter = queue.get_nowait()
+            self._record_failure(
+                chapter, RuntimeError("nenhum navegador disponível")
+            )
+        return dict(self.failed_chapters)
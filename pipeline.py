@@ -0,0 +1,242 @@
+import threading
+import time
+from queue import Queue
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+from instrumentation import METRICS
+
+# função chamada quando uma etapa falha em um item: o nome da etapa, o
+# item e o erro.
+ErrorCallback = Callable[[str, Any, Exception], None]
+
+# marca o fim dos itens em uma fila. Cada worker sai ao receber uma.
+_DONE = object()
+
+
+class Stage:
+    """Uma etapa de Pipeline."""
+
+    def __init__(self,
+                 name: str,
+                 function: Callable[[Any], Any],
+                 workers: int = 1,
+                 queue_size: int = 8,
+                 fan_out: bool = False) -> None:
+        """
+        :param name: o nome da etapa, usado nas métricas e nos erros.
+
+        :param function: chamada com cada item recebido. O valor
+        retornado vai para a etapa seguinte, a não ser que seja None.
+
+        :param workers: número de threads que executam function ao
+        mesmo tempo.
+
+        :param queue_size: número máximo de itens esperando na fila de
+        entrada da etapa. Com a fila cheia, a etapa anterior para até
+        esta consumir um item. Se for 0, a fila não tem limite.
+
+        :param fan_out: se True, function retorna vários itens (ex: uma
+        lista), que vão um por um para a etapa seguinte.
+
+        :return:
+            None
+        """
+        if workers <= 0:
+            raise ValueError("O número de workers deve ser maior que 0.")
+        self.name: str = name
+        self.function: Callable[[Any], Any] = function
+        self.workers: int = workers
+        self.queue_size: int = queue_size
+        self.fan_out: bool = fan_out
+
+
+class StageStats:
+    """O que uma etapa de Pipeline fez na última execução."""
+
+    def __init__(self) -> None:
+        # número de itens processados com sucesso.
+        self.done: int = 0
+        # número de itens em que a etapa falhou.
+        self.failed: int = 0
+        # número de itens enviados para a etapa seguinte.
+        self.emitted: int = 0
+        # tempo em segundos somado dos workers executando a etapa.
+        self.busy_seconds: float = 0.0
+        # tempo em segundos somado dos workers parados esperando vaga
+        # na fila da etapa seguinte.
+        self.blocked_seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "done": self.done,
+            "failed": self.failed,
+            "emitted": self.emitted,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+        }
+
+    def __repr__(self) -> str:
+        return f"StageStats({self.to_dict()!r})"
+
+
+class Pipeline:
+    """
+    Pipeline executa etapas encadeadas ao mesmo tempo, cada uma com as
+    suas threads, ligadas por filas de tamanho limitado. Ex:
+
+        links -> informações do mangá -> capítulos -> gravação
+
+    Enquanto uma etapa trabalha em um item, a anterior já trabalha no
+    seguinte. Quando uma fila enche, a etapa que a alimenta espera
+    (backpressure), então a etapa mais lenta define o ritmo de todas e
+    a memória usada pelos itens em espera é limitada.
+
+    Um item que falha em uma etapa é descartado e não interrompe os
+    outros.
+    """
+
+    def __init__(self,
+                 stages: Sequence[Stage],
+                 on_error: ErrorCallback = None) -> None:
+        """
+        :param stages: as etapas, na ordem em que os itens passam.
+
+        :param on_error: chamada com o nome da etapa, o item e o erro
+        quando uma etapa falha em um item. Por padrão, o erro é impresso.
+
+        :return:
+            None
+        """
+        if not stages:
+            raise ValueError("O pipeline precisa de pelo menos uma etapa.")
+        self._stages: List[Stage] = list(stages)
+        self._on_error: Optional[ErrorCallback] = on_error
+        self._stats: Dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """O que cada etapa fez na execução atual (ou na última)."""
+        with self._lock:
+            return {
+                name: stats.to_dict() for name, stats in self._stats.items()
+            }
+
+    def _report(self, stage: Stage, item: Any, error: Exception) -> None:
+        METRICS.count("stage_failures", stage=stage.name)
+        with self._lock:
+            self._stats[stage.name].failed += 1
+        if self._on_error is not None:
+            try:
+                self._on_error(stage.name, item, error)
+                return
+            except Exception as callback_error:  # noqa: BLE001
+                # o worker não pode morrer aqui, senão run() nunca
+                # termina.
+                error = callback_error
+        print(f"Erro na etapa {stage.name}! {item!r}: {error!r}")
+
+    def _emit(self,
+              stage: Stage,
+              stats: StageStats,
+              output: Optional[Queue],
+              result: Any) -> None:
+        """Envia o resultado de um item para a fila da etapa seguinte."""
+        if output is None or result is None:
+            return
+        items = result if stage.fan_out else (result,)
+        for item in items:
+            start = time.perf_counter()
+            output.put(item)
+            blocked = time.perf_counter() - start
+            METRICS.observe("stage_blocked", blocked, stage=stage.name)
+            with self._lock:
+                stats.emitted += 1
+                stats.blocked_seconds += blocked
+
+    def _work(self,
+              index: int,
+              queues: List[Queue],
+              remaining: List[int]) -> None:
+        """Executa a etapa index com os itens da sua fila até receber
+        _DONE. O último worker da etapa a sair avisa a etapa seguinte."""
+        stage = self._stages[index]
+        stats = self._stats[stage.name]
+        source: Queue = queues[index]
+        output: Optional[Queue] = (
+            queues[index + 1] if index + 1 < len(queues) else None
+        )
+        try:
+            while True:
+                item = source.get()
+                if item is _DONE:
+                    return
+                start = time.perf_counter()
+                try:
+                    result = stage.function(item)
+                except Exception as error:  # noqa: BLE001
+                    self._report(stage, item, error)
+                    continue
+                finally:
+                    busy = time.perf_counter() - start
+                    METRICS.observe("stage", busy, stage=stage.name)
+                    with self._lock:
+                        stats.busy_seconds += busy
+                try:
+                    self._emit(stage, stats, output, result)
+                except Exception as error:  # noqa: BLE001
+                    # ex: fan_out com um resultado que não é iterável. O
+                    # worker só sai ao receber _DONE.
+                    self._report(stage, item, error)
+                    continue
+                with self._lock:
+                    stats.done += 1
+        finally:
+            with self._lock:
+                remaining[index] -= 1
+                last: bool = remaining[index] == 0
+            if last and output is not None:
+                for _ in range(self._stages[index + 1].workers):
+                    output.put(_DONE)
+
+    def run(self, items: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Passa os itens por todas as etapas e espera todas terminarem.
+
+        Os itens são colocados na fila da primeira etapa por esta
+        thread, então um gerador só é consumido conforme a primeira
+        etapa tem vaga.
+
+        :param items: os itens da primeira etapa, ex: os números das
+        páginas de listagem.
+
+        :return:
+            o que cada etapa fez (ver stats).
+        """
+        queues: List[Queue] = [
+            Queue(maxsize=stage.queue_size) for stage in self._stages
+        ]
+        remaining: List[int] = [stage.workers for stage in self._stages]
+        with self._lock:
+            self._stats = {stage.name: StageStats() for stage in self._stages}
+        threads: List[threading.Thread] = [
+            threading.Thread(
+                target=self._work,
+                args=(index, queues, remaining),
+                name=f"pipeline-{stage.name}-{worker}",
+                daemon=True,
+            )
+            for index, stage in enumerate(self._stages)
+            for worker in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for item in items:
+                queues[0].put(item)
+        finally:
+            # mesmo se items falhar, as etapas terminam o que receberam.
+            for _ in range(self._stages[0].workers):
+                queues[0].put(_DONE)
+            for thread in threads:
+                thread.join()
+        return self.stats
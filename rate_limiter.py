@@ -0,0 +1,50 @@
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlsplit
+
+
+class HostRateLimiter:
+    """
+    HostRateLimiter limita o número de requisições por segundo feitas
+    a cada host. Pode ser compartilhado entre várias threads.
+
+    Cada host tem o seu próprio intervalo mínimo entre requisições,
+    então requisições para hosts diferentes não esperam umas pelas outras.
+    """
+
+    def __init__(self, requests_per_second: float = 1.0) -> None:
+        """
+        :param requests_per_second: número máximo de requisições por
+        segundo para cada host. Se for 0 ou menor, não há limite.
+
+        :return:
+            None
+        """
+        self._interval: float = (
+            1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        )
+        # próximo instante em que cada host pode receber uma requisição.
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> None:
+        """
+        Bloqueia até que uma nova requisição para o host da url
+        passada seja permitida.
+
+        :param url: a url que será requisitada.
+
+        :return:
+            None
+        """
+        if self._interval == 0.0:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self._interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
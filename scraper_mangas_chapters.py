@@ -1,15 +1,30 @@
-import time
-
-from selenium import webdriver
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.firefox.webdriver import WebDriver
-from selenium.webdriver.firefox.webelement import FirefoxWebElement
-from selenium.webdriver.firefox import options
-from selenium.webdriver.support.ui import WebDriverWait
+try:
+    from selenium.webdriver.firefox.webelement import FirefoxWebElement
+# o Selenium 4 não tem mais uma classe própria para os elementos do
+# Firefox.
+except ImportError:
+    from selenium.webdriver.remote.webelement import (
+        WebElement as FirefoxWebElement,
+    )
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as ec
-from typing import List, Tuple
+from typing import Any, Dict, List, Tuple
 from manga_model import MangaModel
+from instrumentation import METRICS
+from browser_pool import create_firefox
+from adaptive_wait import (
+    AdaptiveWaiter,
+    WaitStats,
+    attribute_changed,
+    document_ready,
+)
+from chapter_pages_extractor import (
+    READER_PAGES_SCRIPT,
+    extract_pages_from_html,
+    extract_pages_from_payload,
+)
 
 
 class ScraperChapters:
@@ -19,11 +34,16 @@ class ScraperChapters:
         muitos capítulos do site "https://mangalivre.net".
     """
 
-    # diferença de tempo entre os cliquer na página.
-    _CLICK_TIME = 0.5
-
-    # tempo para se esperar entre uma request e outra se houver erro.
-    _REQUEST_ERROR_TIME = 1
+    # tempo máximo em segundos de cada espera, pelo nome da condição.
+    # As esperas sem nome aqui usam o timeout passado no construtor.
+    # "page_turn": a imagem do leitor mudar depois do clique.
+    # "adult_warning_closed": a caixa de aviso +18 sumir após o clique.
+    # "page_ready": a página terminar de carregar após um erro de timeout.
+    _WAIT_TIMEOUTS: Dict[str, float] = {
+        "page_turn": 5,
+        "adult_warning_closed": 5,
+        "page_ready": 10,
+    }
 
     # _URL_BASE_READER é a url base para para o leitor dos capítulos.
     # Se a url de um capítulo não contém _URL_BASE_READER, então não
@@ -68,7 +88,11 @@ class ScraperChapters:
         div.adult-warning-wrapper
     """
 
-    def __init__(self, timeout: int = 0, headless_mode: bool = False) -> None:
+    def __init__(self,
+                 timeout: int = 0,
+                 headless_mode: bool = True,
+                 browser: WebDriver = None,
+                 wait_stats: WaitStats = None) -> None:
         """
         Classe responsável por retirar informações dos capítulos dos mangás
         contidos em "https://mangalivre.net" onde as páginas são
@@ -79,19 +103,32 @@ class ScraperChapters:
         esperar para aparecerem as informações dos capítulos.
 
         :param headless_mode: define se o navegador será ou
-        não renderizado. Por padrão, o navegador será renderizado.
+        não renderizado. Por padrão, o navegador não será renderizado.
+
+        :param browser: um navegador já aberto, por exemplo emprestado
+        de um BrowserPool. Nesse caso, close_browser() não o fecha.
+
+        :param wait_stats: onde registrar quanto tempo cada espera levou.
+        Por padrão, cada scraper tem o seu, acessível em wait_stats.
 
         :return:
             None
         """
-        self._options: options.Options = options.Options()
-        self._options.headless = headless_mode
-        self._browser: WebDriver = webdriver.Firefox(options=self._options)
-        self._web_driver_wait = WebDriverWait(
-            driver=self._browser,
-            timeout=timeout,
+        # se o navegador foi criado aqui, ele deve ser fechado aqui.
+        self._owns_browser: bool = browser is None
+        self._browser: WebDriver = browser or create_firefox(headless_mode)
+        self._waiter = AdaptiveWaiter(
+            browser=self._browser,
+            timeouts=self._WAIT_TIMEOUTS,
+            default_timeout=timeout,
+            stats=wait_stats,
         )
 
+    @property
+    def wait_stats(self) -> WaitStats:
+        """O registro de quanto tempo cada espera levou."""
+        return self._waiter.stats
+
     def go_to_the_chapter(self, url: str) -> None:
         """
         Requisita ao navegador a página do capítulo da url passada.
@@ -106,10 +143,18 @@ class ScraperChapters:
         if self._URL_BASE_READER not in url:
             print(f"Url inválida! {self._browser.current_url}")
         try:
-            self._browser.get(url)
+            with METRICS.timer("browser_get", page="chapter"):
+                self._browser.get(url)
         except TimeoutException:
-            time.sleep(self._REQUEST_ERROR_TIME)
-            self._browser.get(url)
+            METRICS.count("browser_get_timeouts", page="chapter")
+            # a página pode ainda terminar de carregar. Se não
+            # terminar, requisita novamente.
+            try:
+                self._waiter.until("page_ready", document_ready())
+            except TimeoutException:
+                METRICS.count("browser_get_retries", page="chapter")
+                with METRICS.timer("browser_get", page="chapter"):
+                    self._browser.get(url)
 
     def _is_18(self) -> bool:
         """
@@ -124,7 +169,8 @@ class ScraperChapters:
         )
 
         try:
-            content = self._web_driver_wait.until(
+            content = self._waiter.until(
+                "is_18",
                 ec.visibility_of_element_located(button_locator)
             )
             # caso tenha conteúdo na caixa, o mangá é.
@@ -143,12 +189,20 @@ class ScraperChapters:
             By.CSS_SELECTOR,
             self.CSS_SELECTOR_CHECK_BUTTON_18
         )
+        box_locator: Tuple = (
+            By.CSS_SELECTOR, self.CSS_BOX_CHECK_18
+        )
         try:
-            button_18 = self._web_driver_wait.until(
+            button_18 = self._waiter.until(
+                "button_18",
                 ec.element_to_be_clickable(button_locator)
             )
             button_18.click()
-            time.sleep(self._CLICK_TIME)
+            # esperando a caixa de aviso sumir.
+            self._waiter.until(
+                "adult_warning_closed",
+                ec.invisibility_of_element_located(box_locator)
+            )
         except TimeoutException:
             return
 
@@ -170,7 +224,8 @@ class ScraperChapters:
         try:
             # esperando que o elemento que contém o número
             # de páginas do capítulo fique visível.
-            element_num_pages: FirefoxWebElement = self._web_driver_wait.until(
+            element_num_pages: FirefoxWebElement = self._waiter.until(
+                "number_of_pages",
                 ec.visibility_of_element_located(locator_num_pages)
             )
             num_pages = int(element_num_pages.text)
@@ -202,7 +257,8 @@ class ScraperChapters:
         try:
             # esperando que o elemento que contém o número
             # do capítulo fique visível.
-            number_of_chapter_element = self._web_driver_wait.until(
+            number_of_chapter_element = self._waiter.until(
+                "number_of_chapter",
                 ec.visibility_of_element_located(
                     number_of_chapter_locator
                 )
@@ -233,11 +289,14 @@ class ScraperChapters:
         page_element: FirefoxWebElement
         # button_element é o elemento com o botão para passar as páginas.
         button_element: FirefoxWebElement
+        page_locator: Tuple = (
+            By.CSS_SELECTOR, self.CSS_SELECTOR_CHAPTER_PAGES
+        )
 
         for _ in range(number_of_pages - 1):
             # obtendo a tag img onde está a página do campítulo.
-            page_element = self._browser.find_element_by_css_selector(
-                self.CSS_SELECTOR_CHAPTER_PAGES
+            page_element = self._browser.find_element(
+                By.CSS_SELECTOR, self.CSS_SELECTOR_CHAPTER_PAGES
             )
             # obtendo o link da página do capítulo.
             page_link: str = page_element.get_attribute("src")
@@ -245,42 +304,122 @@ class ScraperChapters:
                 list_pages.append(page_link)
 
             # obtendo o botão resposável por passar as páginas.
-            button_element = self._browser.find_element_by_css_selector(
-                self.CSS_SELECTOR_BUTTON_NEXT_PAGE
+            button_element = self._browser.find_element(
+                By.CSS_SELECTOR, self.CSS_SELECTOR_BUTTON_NEXT_PAGE
             )
-            # clicando no botão e carregando a próxima página do capítulo.
+            # clicando no botão e esperando a próxima página do capítulo
+            # substituir a imagem atual.
             button_element.click()
-            time.sleep(self._CLICK_TIME)
+            try:
+                self._waiter.until(
+                    "page_turn",
+                    attribute_changed(page_locator, "src", page_link)
+                )
+            except TimeoutException:
+                print(
+                    f"Tempo esgotado ao passar a página! "
+                    f"{self._browser.current_url}"
+                )
+
+        # a última página não precisa de clique, só falta obter o link.
+        if number_of_pages > 0:
+            page_element = self._browser.find_element(
+                By.CSS_SELECTOR, self.CSS_SELECTOR_CHAPTER_PAGES
+            )
+            page_link = page_element.get_attribute("src")
+            if page_link:
+                list_pages.append(page_link)
 
         return list_pages
 
-    def get_chapter_pages(self, manga: MangaModel):
-        """Insere as páginas e o número de páginas no seu capítulo
-        específico. O mangá tem que estar inicializado por get_manga_info().
+    def get_pages_fast(self, number_of_pages: int = 0) -> List[str]:
+        """
+        Retorna uma lista com os links das imagens do capítulo sem
+        passar as páginas uma a uma.
 
-        :param manga: um modelo de mangá já inicializado.
+        Primeiro pede ao leitor o json com todas as páginas do capítulo.
+        Se não conseguir, procura as imagens no html já renderizado.
+
+        :param number_of_pages: número de páginas do capítulo atual.
+        Se for maior que 0, uma lista com outro número de páginas é
+        descartada: com mais páginas (ex: imagens que não são do
+        capítulo), o capítulo nunca seria considerado completo.
+
+        :return:
+            uma lista com todas as páginas do capítulo, ou uma lista
+            vazia caso não tenha sido possível obtê-las.
+        """
+        list_pages: List[str] = []
+        try:
+            with METRICS.timer("reader_json"):
+                payload = self._browser.execute_async_script(
+                    READER_PAGES_SCRIPT
+                )
+            list_pages = extract_pages_from_payload(payload)
+            if not list_pages:
+                list_pages = extract_pages_from_html(self._browser.page_source)
+        except WebDriverException:
+            return []
+
+        if number_of_pages > 0 and len(list_pages) != number_of_pages:
+            return []
+        return list_pages
+
+    def get_chapter(self, chapter: Dict[str, Any]) -> None:
+        """Insere as páginas e o número de páginas em um capítulo.
+
+        :param chapter: um capítulo de MangaModel.chapters.
 
         :return:
             None
         """
-        for chapter in manga.chapters:
-            chapter_url = chapter["url"]
-            self.go_to_the_chapter(chapter_url)
+        with METRICS.timer("chapter"):
+            self.go_to_the_chapter(chapter["url"])
             # verificando se o mangá é +18.
             # caso seja, irá clicar na caixa de checagem.
             if self._is_18():
                 self._click_button_18()
 
             number_of_pages: int = self.get_number_of_pages()
-            chapter_pages: List[str] = self.get_pages(number_of_pages)
-            chapter["pages"] = chapter_pages
-            chapter["number_of_pages"] = number_of_pages
+            chapter_pages: List[str] = self.get_pages_fast(number_of_pages)
+            # se não foi possível obter todas as páginas de uma vez,
+            # passa as páginas clicando no leitor.
+            if not chapter_pages:
+                METRICS.count("reader_click_fallback")
+                with METRICS.timer("reader_click_pages"):
+                    chapter_pages = self.get_pages(number_of_pages)
+        METRICS.count("chapter_pages", len(chapter_pages))
+        chapter["pages"] = chapter_pages
+        # se o leitor não informou o número de páginas, vale o número de
+        # páginas obtidas.
+        chapter["number_of_pages"] = number_of_pages or len(chapter_pages)
+
+    def get_chapter_pages(
+            self,
+            manga: MangaModel,
+            chapters: List[Dict[str, Any]] = None):
+        """Insere as páginas e o número de páginas no seu capítulo
+        específico. O mangá tem que estar inicializado por get_manga_info().
+
+        :param manga: um modelo de mangá já inicializado.
+
+        :param chapters: os capítulos de manga.chapters que devem ser
+        obtidos. Por padrão, todos os capítulos do mangá.
+
+        :return:
+            None
+        """
+        for chapter in manga.chapters if chapters is None else chapters:
+            self.get_chapter(chapter)
 
     def close_browser(self) -> None:
         """
         Finaliza o navegador e fecha todas as janelas associadas à ele.
+        Navegadores recebidos de fora (ex: de um BrowserPool) não são
+        fechados, pois pertencem a quem os passou.
 
         :return:
             None
         """
-        self._browser.quit()
+        if self._owns_browser:
+            self._browser.quit()
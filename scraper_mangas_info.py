@@ -1,11 +1,20 @@
-import time
-from selenium import webdriver
-from selenium.webdriver.firefox import options
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.firefox.webdriver import WebDriver
-from typing import Dict, Any, List
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from selenium.webdriver.support.ui import WebDriverWait
+from browser_pool import BrowserPool, create_firefox
+from chapter_list_loader import ChapterListLoader, ChapterListResult
+from http_client import FetchError, HttpClient
+from instrumentation import METRICS
 from manga_model import MangaModel
+from manga_info_extractor import (
+    extract_manga_info,
+    extract_manga_info_from_soup,
+    find_missing_elements,
+    make_soup,
+)
+from page_cache import PageCache
 
 
 class ScraperMangasInfo:
@@ -13,47 +22,167 @@ class ScraperMangasInfo:
     ScraperMangasInfo é a classe que contém
     funcionalidades para remover informações de um mangá
     ou muitos mangás do site "https://mangalivre.net".
+
+    Por padrão (static_fetch=True) a página do mangá é baixada com um
+    cliente HTTP, sem o navegador, e a lista de capítulos vem do
+    endpoint do site. O navegador só é usado se a página baixada não
+    tiver as informações do mangá ou se o endpoint falhar.
     """
 
     # id do footer da página.
     _ID_FOOTER: str = "social-media"
 
-    def __init__(self, headless_mode: bool = False) -> None:
+    # tempo máximo em segundos esperando a lista de capítulos crescer
+    # depois de descer a página. Se ela crescer antes, a página é
+    # descida de novo na hora.
+    _SCROLL_TIMEOUT: float = 2
+
+    # número de vezes seguidas que a lista não cresce após descer a
+    # página para considerá-la completamente carregada. Com mais de
+    # uma, uma requisição da lista mais lenta que _SCROLL_TIMEOUT não
+    # encerra a espera.
+    _STABLE_SCROLL_ROUNDS: int = 2
+
+    # altura da página e número de capítulos na lista da página.
+    _LIST_SIZE_SCRIPT: str = (
+        "return [document.body.scrollHeight, document.querySelectorAll("
+        "'#chapter-list ul.full-chapters-list li').length];"
+    )
+
+    # número máximo de vezes que a página é descida.
+    _MAX_SCROLL_ROUNDS: int = 500
+
+    # user-agent para não ser bloqueado pelo servidor (STATUS - 403).
+    _HEADERS: Dict[str, str] = {
+        "User-Agent": "Mozilla/5.0",
+    }
+
+    # sufixo da chave no page_cache das páginas renderizadas pelo
+    # navegador, para não misturá-las com o html baixado sem ele.
+    _RENDERED_CACHE_SUFFIX: str = "#rendered"
+
+    def __init__(self,
+                 headless_mode: bool = True,
+                 browser: WebDriver = None,
+                 chapter_list_loader: ChapterListLoader = None,
+                 page_cache: PageCache = None,
+                 static_fetch: bool = True,
+                 http_client: HttpClient = None,
+                 browser_pool: BrowserPool = None) -> None:
         """
         :param headless_mode: define se o navegador será renderizado
-        ou não. Por padrão (headless_mode = False), o navegador será
+        ou não. Por padrão (headless_mode = True), o navegador não será
         renderizado.
 
+        :param browser: um navegador já aberto, por exemplo emprestado
+        de um BrowserPool. Nesse caso, close_browser() não o fecha.
+
+        :param chapter_list_loader: usado para buscar a lista de
+        capítulos direto do site. Por padrão, cria um novo, que usa
+        http_client.
+
+        :param page_cache: cache das páginas dos mangás. Uma página
+        ainda válida no cache não é carregada no navegador, e em modo
+        replay o navegador nunca é aberto. Por padrão, sem cache.
+
+        :param static_fetch: se True, tenta obter o mangá sem o
+        navegador antes de abri-lo.
+
+        :param http_client: o cliente HTTP usado para baixar as páginas
+        dos mangás. Por padrão, cria um que usa page_cache, fechado por
+        close().
+
+        :param browser_pool: se passado e browser não, um navegador é
+        emprestado do pool só quando for necessário e devolvido no fim
+        de cada mangá.
+
         :return:
             None
         """
-        self._options: options.Options = options.Options()
-        self._options.headless = headless_mode
-        self._browser: WebDriver = webdriver.Firefox(options=self._options)
-
-    def _wait_for_list_load(self):
+        # se o navegador foi criado aqui, ele deve ser fechado aqui.
+        self._owns_browser: bool = browser is None and browser_pool is None
+        # o navegador só é aberto quando for usado pela primeira vez.
+        self._browser_instance: Optional[WebDriver] = browser
+        self._browser_pool: Optional[BrowserPool] = browser_pool
+        self._headless_mode: bool = headless_mode
+        self._page_cache: Optional[PageCache] = page_cache
+        self._static_fetch: bool = static_fetch
+        self._owns_http_client: bool = http_client is None
+        self._http_client: HttpClient = http_client or HttpClient(
+            pool_size=4, headers=self._HEADERS, cache=page_cache
+        )
+        self._chapter_list_loader: ChapterListLoader = (
+            chapter_list_loader
+            or ChapterListLoader(client=self._http_client)
+        )
+        # False se a lista de capítulos do último mangá obtido pode
+        # estar incompleta.
+        self.chapter_list_complete: bool = True
+
+    @property
+    def _browser(self) -> WebDriver:
+        """O navegador, aberto no primeiro uso."""
+        if self._browser_instance is None:
+            self._browser_instance = create_firefox(self._headless_mode)
+        return self._browser_instance
+
+    @contextmanager
+    def _borrowed_browser(self) -> Iterator[None]:
+        """Empresta um navegador de browser_pool enquanto durar o bloco
+        with, se este scraper não tiver um navegador próprio."""
+        if self._browser_instance is not None or self._browser_pool is None:
+            yield
+            return
+        with self._browser_pool.browser() as browser:
+            self._browser_instance = browser
+            try:
+                yield
+            finally:
+                self._browser_instance = None
+
+    def _get_list_size(self) -> Tuple[int, int]:
+        """Retorna a altura atual da página no navegador e o número de
+        capítulos carregados na lista."""
+        height, rows = self._browser.execute_script(self._LIST_SIZE_SCRIPT)
+        return height, rows
+
+    def _wait_for_list_load(self, min_chapters: int = 0) -> bool:
         """Espera o carregamento total da lista de mangás.
 
+            :param min_chapters: número de capítulos que a lista tem
+            pelo menos, ex: os já obtidos do endpoint. Uma lista que
+            parou de crescer com menos capítulos está incompleta.
+
             :return:
-                None
+                True se a lista parou de crescer com pelo menos
+                min_chapters capítulos, ou False se ela pode estar
+                incompleta (menos capítulos ou o número máximo de
+                scrolls atingido).
         """
-        last_page_height = self._browser.execute_script(
-            "return document.body.scrollHeight;"
-        )
+        last_size = self._get_list_size()
+        stable_rounds: int = 0
         # Dando scroll até que a lista seja completamente carregada,
-        # se a nova posiçao do stroll for igual a última, então a tela já
-        # foi totalmente carregada.
-        while True:
+        # se a página e a lista não mudarem depois de
+        # _STABLE_SCROLL_ROUNDS scrolls seguidos, então a tela já foi
+        # totalmente carregada.
+        for _ in range(self._MAX_SCROLL_ROUNDS):
             self._browser.execute_script(
                 "window.scrollTo(0,document.documentElement.scrollHeight);"
             )
-            time.sleep(0.5)
-            new_page_height = self._browser.execute_script(
-                "return document.body.scrollHeight;"
-            )
-            if new_page_height == last_page_height:
-                return
-            last_page_height = new_page_height
+            try:
+                WebDriverWait(
+                    driver=self._browser,
+                    timeout=self._SCROLL_TIMEOUT,
+                    poll_frequency=0.1,
+                ).until(lambda _: self._get_list_size() != last_size)
+                stable_rounds = 0
+            except TimeoutException:
+                METRICS.count("scroll_timeouts")
+                stable_rounds += 1
+                if stable_rounds >= self._STABLE_SCROLL_ROUNDS:
+                    return last_size[1] >= min_chapters
+            last_size = self._get_list_size()
+        return False
 
     def _go_to_the_manga(self, manga_url: str):
         """Requisita ao navegador a página do mangá da url passada.
@@ -64,226 +193,223 @@ class ScraperMangasInfo:
         :return:
             None
         """
-        self._browser.get(manga_url)
-        self._wait_for_list_load()
+        with METRICS.timer("browser_get", page="manga"):
+            self._browser.get(manga_url)
 
-    def get_manga_info(self, manga_url: str) -> MangaModel:
-        """Obtém todas as informações do mangá passado e retorna
-        um objeto com todas as informações retiradas nele.
-
-        :param manga_url: url do mangá que deseja remover as informações.
-
-        :return:
-            MangaModel
+    def _fetch_static(self, manga_url: str) -> Optional[Tuple[str, object]]:
         """
-        self._go_to_the_manga(manga_url=manga_url)
-        url: str = self._browser.current_url
-        title: str = self._get_manga_title()
-        cover: str = self._get_manga_cover()
-        status: str = self._get_manga_status()
-        author: str = self._get_manga_author()
-        description: str = self._get_manga_description()
-        categories: List[str] = self._get_manga_categories()
-        alternative_titles = self._get_manga_alternative_titles()
-        chapters: List[Dict[str, Any]] = self._get_manga_list_chapters()
-
-        return MangaModel(
-            title=title,
-            author=author,
-            url=url,
-            cover=cover,
-            status=status,
-            description=description,
-            categories=categories,
-            alternative_titles=alternative_titles,
-            chapters=chapters
-        )
+        Baixa a página do mangá sem o navegador e verifica se ela tem
+        as informações do mangá.
 
-    def _get_manga_title(self) -> str:
-        """
-        Obtém o título do mangá.
+        :param manga_url: url do mangá.
 
         :return:
-            uma string com o título do mangá.
-        """
-        bs = BeautifulSoup(self._browser.page_source, "html.parser")
-        div_manga_info = bs.find("div", {"id": "series-data"})
-        span_title = div_manga_info.find("span", {"class": "series-title"})
-        manga_title = span_title.find("h1")
-        return manga_title.text
-
-    def _get_manga_cover(self) -> str:
-        """
-        Obtém a capa do mangá.
-
-        :return:
-            uma string contendo a url da capa do mangá.
+            a url final e a árvore da página, ou None se a página não
+            pôde ser baixada ou não tem as informações do mangá.
         """
         try:
-            bs = BeautifulSoup(self._browser.page_source, "html.parser")
-            div_manga_info = bs.find("div", {"id": "series-data"})
-            manga_cover = div_manga_info.find("img", {"class": "cover"})
-        # se retornar None para a capa.
-        except AttributeError:
-            return ""
-        return manga_cover.get("src")
-
-    def _get_manga_status(self) -> str:
+            with METRICS.timer("static_fetch"):
+                res = self._http_client.get(manga_url)
+        except FetchError as error:
+            # em modo replay, a página ainda pode estar no cache como
+            # renderizada pelo navegador.
+            if self._page_cache is None or not self._page_cache.replay:
+                print(f"Erro ao baixar a página do mangá! {error}")
+            METRICS.count("static_escalations", reason="fetch_error")
+            return None
+
+        with METRICS.timer("parse", page="manga"):
+            soup = make_soup(res.text)
+            missing = find_missing_elements(soup)
+        if missing:
+            print(
+                f"Página do mangá sem {', '.join(missing)}, "
+                f"usando o navegador! {manga_url}"
+            )
+            METRICS.count("static_escalations", reason="missing_elements")
+            return None
+        return res.url or manga_url, soup
+
+    def _render_page(
+            self,
+            manga_url: str,
+            chapter_list: Optional[ChapterListResult] = None,
+            load_chapters: bool = True,
+    ) -> Tuple[str, str, Optional[ChapterListResult], bool]:
         """
-        Obtém o status do mangá.
+        Obtém o código fonte da página do mangá renderizada pelo
+        navegador, ou uma cópia ainda válida dela no page_cache.
 
-        :return:
-            uma string contendo "completo" caso o mangá esteja finalizado,
-            ou "em laçamento" caso o contrário.
-        """
-        try:
-            bs = BeautifulSoup(self._browser.page_source, "html.parser")
-            div_manga_info = bs.find("div", {"id": "series-data"})
-            i_status = div_manga_info.find("i", {"class": "complete-series"})
-            status = i_status.text.lower()
-        # retornou None para o status.
-        except AttributeError:
-            return "em lançamento"
+        :param manga_url: url do mangá.
 
-        return status
+        :param chapter_list: a lista de capítulos já buscada no
+        endpoint. Se for None e load_chapters for True, ela é buscada
+        com a url final da página.
 
-    def _get_manga_author(self) -> str:
-        """
-        Obtém o autor de mangá.
+        :param load_chapters: se False, a lista de capítulos não é
+        buscada nem carregada na página.
 
         :return:
-            retorna uma string com o nome do autor do mangá.
-        """
-        try:
-            bs = BeautifulSoup(self._browser.page_source, "html.parser")
-            div_manga_info = bs.find("div", {"id": "series-data"})
-            span_author = div_manga_info.find(
-                "span", {"class": "series-author"}
-            )
-            author: str = ""
-            for tag in span_author:
-                if tag.name is None and tag.strip():
-                    tag_author = tag.strip()
-                    line_author = tag_author.split(" ")
-                    line_author = [
-                        name for name in line_author
-                        if name != ""
-                    ]
-                    author = " ".join(line_author)
-        # retornou None para o autor.
-        except AttributeError:
-            return ""
-
-        return author
-
-    def _get_manga_categories(self) -> List[str]:
-        """
-        Obtém as categorias do mangá.
+            a url final, o código fonte, a lista de capítulos do
+            endpoint e se a lista de capítulos da página está completa.
 
-        :return:
-            uma lista de categorias das quais o mangá faz parte.
+        :raises FetchError: se o cache está em modo replay e a página
+        não está nele.
         """
-        try:
-            bs = BeautifulSoup(self._browser.page_source, "html.parser")
-            div_manga_info = bs.find("div", {"id": "series-data"})
-            div_categories = div_manga_info.find("div", {"class": "carousel"})
-            # Não possui categorias
-            if div_categories is None:
-                return []
-
-            categories = [
-                c for c in div_categories.text.replace(" ", "").split("\n")
-                if c.strip() != ""
-            ]
-        # retornou None para as categorias.
-        except AttributeError:
-            return []
-
-        return categories
-
-    def _get_manga_description(self) -> str:
-        """
-        Obtém a descrição do mangá.
+        cache_key = manga_url + self._RENDERED_CACHE_SUFFIX
+        cached_page = (
+            self._page_cache.get(cache_key) if self._page_cache else None
+        )
+        # uma cópia vencida é ignorada: a página é carregada de novo.
+        if cached_page is not None and self._page_cache.is_fresh(cached_page):
+            METRICS.count("page_cache", result="hit", page="manga")
+            url: str = cached_page.final_url
+            if chapter_list is None and load_chapters:
+                chapter_list = self._chapter_list_loader.load(url)
+            # a página do cache não pode ser descida.
+            return url, cached_page.text, chapter_list, False
+        if self._page_cache is not None and self._page_cache.replay:
+            raise FetchError(manga_url, "não está no cache (modo replay)")
 
-        :return:
-            uma string contendo a sinopse do mangá.
-        """
-        try:
-            bs = BeautifulSoup(self._browser.page_source, "html.parser")
-            div_manga_info = bs.find("div", {"id": "series-data"})
-            span_description = div_manga_info.find(
-                "span", {"class": "series-desc"}
+        self._go_to_the_manga(manga_url=manga_url)
+        url = self._browser.current_url
+        if chapter_list is None and load_chapters:
+            chapter_list = self._chapter_list_loader.load(url)
+        scroll_complete: bool = True
+        if chapter_list is not None and not chapter_list.complete:
+            with METRICS.timer("scroll_wait"):
+                scroll_complete = self._wait_for_list_load(
+                    len(chapter_list.chapters)
+                )
+        page_source: str = self._browser.page_source
+        if self._page_cache is not None:
+            self._page_cache.put(
+                cache_key,
+                page_source.encode("utf-8"),
+                final_url=url,
+                content_type="text/html; charset=utf-8",
             )
-            description = span_description.find("span").text
-        # retornou None para a descrição.
-        except AttributeError:
-            return ""
+        return url, page_source, chapter_list, scroll_complete
+
+    def get_manga_info(self, manga_url: str) -> MangaModel:
+        """Obtém todas as informações do mangá passado e retorna
+        um objeto com todas as informações retiradas nele.
 
-        return description
+        Com static_fetch, a página é baixada sem o navegador e a lista
+        de capítulos vem do endpoint do site. O navegador só é usado se
+        a página baixada não tiver as informações do mangá ou se o
+        endpoint falhar; nesse caso a página é descida até carregar a
+        lista inteira. Caso a lista possa estar incompleta,
+        chapter_list_complete fica False.
 
-    def _get_manga_alternative_titles(self) -> List[str]:
-        """
-        Obtém os títulos alternativos do mangá.
+        Com um page_cache, uma cópia ainda válida da página renderizada
+        é usada no lugar do navegador. Nesse caso a página não pode ser
+        descida, então se o endpoint falhar a lista é considerada
+        incompleta.
+
+        :param manga_url: url do mangá que deseja remover as informações.
 
         :return:
-            uma lista com todos os títulos alternativos do mangá.
+            MangaModel
+
+        :raises FetchError: se o cache está em modo replay e a página
+        não está nele.
         """
-        try:
-            bs = BeautifulSoup(self._browser.page_source, "html.parser")
-            div_manga_info = bs.find("div", {"id": "series-data"})
-            ol_alternative_titles = div_manga_info.find(
-                "ol", {"class": "series-synom"}
+        chapter_list: Optional[ChapterListResult] = None
+        static_page = (
+            self._fetch_static(manga_url) if self._static_fetch else None
+        )
+        if static_page is not None:
+            url, soup = static_page
+            chapter_list = self._chapter_list_loader.load(url)
+            if chapter_list.complete:
+                with METRICS.timer("parse", page="manga"):
+                    manga = extract_manga_info_from_soup(soup, url)
+                manga.chapters = chapter_list.chapters
+                self.chapter_list_complete = True
+                METRICS.count("manga_info", path="static")
+                return manga
+            # só a página renderizada tem a lista de capítulos.
+            METRICS.count("static_escalations", reason="chapter_list")
+
+        with self._borrowed_browser():
+            url, page_source, chapter_list, scroll_complete = (
+                self._render_page(manga_url, chapter_list)
             )
-            li_alternative_titles = ol_alternative_titles.find_all("li")
-            alternative_titles = [t.text for t in li_alternative_titles]
-        # retornou None para a lista de títulos alternativos.
-        except AttributeError:
-            return []
-        return alternative_titles
-
-    def _get_manga_list_chapters(self) -> List[Dict[str, Any]]:
-        """
-        Obtém a lista de capítulos do mangá. A lista é gerada por
-        javascript.
+        METRICS.count("manga_info", path="browser")
+
+        manga = extract_manga_info(page_source, url)
+        if chapter_list.complete:
+            manga.chapters = chapter_list.chapters
+            self.chapter_list_complete = True
+        elif len(chapter_list.chapters) > len(manga.chapters):
+            # o endpoint falhou no meio, mas ainda trouxe mais
+            # capítulos que a página.
+            manga.chapters = chapter_list.chapters
+            self.chapter_list_complete = False
+        else:
+            self.chapter_list_complete = scroll_complete
+
+        if not self.chapter_list_complete:
+            print(f"A lista de capítulos pode estar incompleta! {url}")
+        return manga
+
+    def get_manga_metadata(self, manga_url: str) -> MangaModel:
+        """Obtém as informações do mangá sem a lista de capítulos
+        (chapters fica None), ex: para atualizar o título, a capa ou o
+        status de mangás já salvos.
+
+        Com static_fetch, o navegador só é usado se a página baixada
+        não tiver as informações do mangá.
+
+        :param manga_url: url do mangá.
 
         :return:
-            um dicionário com cada chave representando um número de
-            capítulo e contém a url desse capítulo.
+            MangaModel
+
+        :raises FetchError: se o cache está em modo replay e a página
+        não está nele.
         """
-        all_chapters: List[Dict[str, Any]] = []
-        res_body: str = self._browser.page_source
-        try:
-            bs = BeautifulSoup(res_body, "html.parser")
-            div_list_chapters = bs.find("div", {"id": "chapter-list"})
-            ul_chapters = div_list_chapters.find("ul", {"full-chapters-list"})
-            lis_chapters = ul_chapters.find_all("li")
-
-            for li_chapter in lis_chapters:
-                current_chapter: Dict[str, Any] = {}
-                chapter_number = li_chapter.find("span", {"class": "cap-text"})
-                chapter_url = li_chapter.find(
-                    "a",
-                    {"class": "link-dark"}
-                ).get("href")
-
-                chapter_url = urljoin(
-                    self._browser.current_url, chapter_url
+        static_page = (
+            self._fetch_static(manga_url) if self._static_fetch else None
+        )
+        if static_page is not None:
+            url, soup = static_page
+            with METRICS.timer("parse", page="manga"):
+                manga = extract_manga_info_from_soup(soup, url)
+            METRICS.count("manga_metadata", path="static")
+        else:
+            with self._borrowed_browser():
+                url, page_source, _, _ = self._render_page(
+                    manga_url, load_chapters=False
                 )
-                current_chapter["pages"] = []
-                current_chapter["number_of_pages"] = 0
-                current_chapter["number_of_chapter"] = chapter_number.text
-                current_chapter["url"] = chapter_url
-                all_chapters.append(current_chapter)
-        # retornou None para a lista de capítulos.
-        except AttributeError:
-            return []
-        return all_chapters
+            manga = extract_manga_info(page_source, url)
+            METRICS.count("manga_metadata", path="browser")
+        manga.chapters = None
+        return manga
 
     def close_browser(self):
         """
         Finaliza o navegador e fecha todas as janelas associadas à ele.
+        Navegadores recebidos de fora (ex: de um BrowserPool) não são
+        fechados, pois pertencem a quem os passou.
+
+        :return:
+            None
+        """
+        if self._owns_browser and self._browser_instance is not None:
+            self._browser_instance.quit()
+            self._browser_instance = None
+
+    def close(self) -> None:
+        """
+        Finaliza o navegador (ver close_browser) e fecha as conexões do
+        cliente HTTP criado por este scraper. Clientes recebidos de fora
+        não são fechados.
 
         :return:
             None
         """
-        self._browser.quit()
+        self.close_browser()
+        if self._owns_http_client:
+            self._http_client.close()
@@ -1,8 +1,12 @@
 import time
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from bs4 import BeautifulSoup
-from requests import get
 from urllib.parse import urljoin
+from http_client import FetchError, HttpClient
+from instrumentation import METRICS
+from page_cache import PageCache
+from rate_limiter import HostRateLimiter
 
 # a url base para as páginas com as listas de mangás do site.
 _BASE_URL: str = "https://mangalivre.net/series/index/nome/todos?page="
@@ -16,46 +20,109 @@ _HEADERS: Dict[str, str] = {
     "User-Agent": "Mozilla/5.0",
 }
 
+# cliente HTTP compartilhado pelas funções do módulo, criado no primeiro
+# uso. As conexões com o site são reaproveitadas entre as páginas.
+_CLIENT: Optional[HttpClient] = None
 
-def _set_range_pages(start: int, end: int) -> List[str]:
+
+def _get_client() -> HttpClient:
+    """Retorna o cliente HTTP compartilhado do módulo, criando-o se
+    necessário."""
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = HttpClient(headers=_HEADERS)
+    return _CLIENT
+
+
+def use_page_cache(cache: Optional[PageCache]) -> None:
+    """
+    Faz o cliente compartilhado do módulo usar um cache das páginas de
+    listagem, ex: PageCache(replay=True) para rodar de novo sobre um
+    crawl anterior sem acessar o site.
+
+    :param cache: o cache, ou None para não usar cache.
+
+    :return:
+        None
+    """
+    global _CLIENT
+    if _CLIENT is not None:
+        _CLIENT.close()
+    _CLIENT = HttpClient(headers=_HEADERS, cache=cache)
+
+
+def _set_range_pages(
+        start: int,
+        end: int,
+        base_url: str = _BASE_URL) -> List[str]:
     """Cria uma lista de urls do intervalo inicial até o final
-    a partir de _BASE_URL. Retorna uma lista vazia caso o
+    a partir de base_url. Retorna uma lista vazia caso o
     intervalo não seja válido.
 
     :param start: o intervalo inicial de páginas. Deve ser maior que 0.
 
     :param end: o intervalo final de páginas. Deve ser maior que 0.
 
+    :param base_url: a url das páginas, sem o número. Por padrão,
+    _BASE_URL.
+
     :return:
         Uma lista contendo as urls no intervalo especificado.
     """
     if (start <= 0 or end <= 0) and start < end:
         return []
-    return [_BASE_URL + str(i) for i in range(start, end+1)]
+    return [base_url + str(i) for i in range(start, end+1)]
 
 
-def _get_mangas_links(page_url: str) -> List[str]:
+def _get_mangas_links(
+        page_url: str,
+        client: HttpClient = None,
+        rate_limiter: HostRateLimiter = None) -> List[str]:
     """Faz uma requisição e busca na página as urls dos mangás
     contidos nela.
 
     :param page_url: a url da página onde estão presentes os mangás.
 
+    :param client: o cliente HTTP usado na requisição. Por padrão,
+    usa o cliente compartilhado do módulo.
+
+    :param rate_limiter: se passado, limita as requisições ao site,
+    inclusive as novas tentativas.
+
     :return:
         Uma lista contém todas as urls dos mangás da página.
+
+    :raises FetchError: se a página não pôde ser obtida.
     """
 
-    res = get(page_url, headers=_HEADERS)
-    if res.status_code == 200:
+    res = (client or _get_client()).get(page_url, rate_limiter=rate_limiter)
+    with METRICS.timer("parse", page="listing"):
         soup = BeautifulSoup(res.text, "html.parser")
         mangas_links = soup.find_all("a", {"class": "link-block"})
-        return [urljoin(_BASE_URL, link.get("href")) for link in mangas_links]
-    return []
+        return [urljoin(page_url, link.get("href")) for link in mangas_links]
+
+
+def _get_mangas_links_or_report(
+        page_url: str,
+        client: Optional[HttpClient],
+        failed_pages: Optional[List[str]]) -> List[str]:
+    """Chama _get_mangas_links, mas em caso de falha registra a url
+    da página em failed_pages e retorna uma lista vazia."""
+    try:
+        return _get_mangas_links(page_url, client)
+    except FetchError as error:
+        print(f"Erro ao buscar a página de mangás! {error}")
+        if failed_pages is not None:
+            failed_pages.append(page_url)
+        return []
 
 
 def get_mangas_links_in_range(
         start: int,
         end: int,
-        sleep_time: int = 0) -> List[str]:
+        sleep_time: int = 0,
+        failed_pages: List[str] = None,
+        base_url: str = _BASE_URL) -> List[str]:
     """Busca as urls dos mangás no intervalo de páginas passado.
 
     :param start: o intervalo inicial de páginas. Deve ser maior que 0.
@@ -65,12 +132,87 @@ def get_mangas_links_in_range(
     :param sleep_time: o tempo em segundos que deverá se passar entre cada
     requisição. Por padrão é 0.
 
+    :param failed_pages: se passada, recebe as urls das páginas que
+    não puderam ser obtidas.
+
+    :param base_url: a url das páginas de listagem, sem o número, ex:
+    a de um servidor local nos benchmarks. Por padrão, _BASE_URL.
+
     :return:
         Uma lista que contém as urls dos mangás contidos em cada página.
     """
     all_mangas_in_page_range: List[str] = []
-    pages_urls = _set_range_pages(start, end)
+    pages_urls = _set_range_pages(start, end, base_url)
     for page_url in pages_urls:
-        all_mangas_in_page_range += _get_mangas_links(page_url)
-        time.sleep(sleep_time)
+        all_mangas_in_page_range += _get_mangas_links_or_report(
+            page_url, None, failed_pages
+        )
+        with METRICS.timer("sleep"):
+            time.sleep(sleep_time)
     return all_mangas_in_page_range
+
+
+def get_mangas_links_in_range_concurrent(
+        start: int,
+        end: int,
+        max_workers: int = 8,
+        requests_per_second: float = 2.0,
+        client: HttpClient = None,
+        failed_pages: List[str] = None,
+        base_url: str = _BASE_URL) -> List[str]:
+    """Busca as urls dos mangás no intervalo de páginas passado,
+    requisitando várias páginas ao mesmo tempo.
+
+    As urls são retornadas na ordem das páginas, como em
+    get_mangas_links_in_range, mas sem repetições.
+
+    :param start: o intervalo inicial de páginas. Deve ser maior que 0.
+
+    :param end: o intervalo final de páginas. Deve ser maior que 0.
+
+    :param max_workers: número máximo de páginas requisitadas ao mesmo
+    tempo.
+
+    :param requests_per_second: número máximo de requisições por segundo
+    feitas ao site. Se for 0 ou menor, não há limite.
+
+    :param client: o cliente HTTP usado nas requisições. Por padrão,
+    usa o cliente compartilhado do módulo. O tamanho do pool de
+    conexões do cliente deve ser pelo menos max_workers.
+
+    :param failed_pages: se passada, recebe as urls das páginas que
+    não puderam ser obtidas, na ordem das páginas.
+
+    :param base_url: a url das páginas de listagem, sem o número. Por
+    padrão, _BASE_URL.
+
+    :return:
+        Uma lista que contém as urls dos mangás contidos em cada página.
+    """
+    # o limite vale para cada tentativa, inclusive as novas tentativas
+    # do HttpClient depois de uma falha.
+    rate_limiter = HostRateLimiter(requests_per_second)
+
+    def fetch_page(page_url: str) -> Optional[List[str]]:
+        try:
+            return _get_mangas_links(page_url, client, rate_limiter)
+        except FetchError as error:
+            print(f"Erro ao buscar a página de mangás! {error}")
+            return None
+
+    pages_urls = _set_range_pages(start, end, base_url)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # executor.map devolve os resultados na ordem das páginas.
+        links_per_page = list(executor.map(fetch_page, pages_urls))
+
+    if failed_pages is not None:
+        failed_pages += [
+            page_url for page_url, page_links
+            in zip(pages_urls, links_per_page) if page_links is None
+        ]
+
+    # dict mantém a ordem de inserção e descarta as urls repetidas.
+    all_mangas_in_page_range: Dict[str, None] = {}
+    for page_links in links_per_page:
+        all_mangas_in_page_range.update(dict.fromkeys(page_links or []))
+    return list(all_mangas_in_page_range)
@@ -0,0 +1,321 @@
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from typing import (
+    Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+)
+from manga_model import MangaModel
+
+_SCHEMA: str = """
+    CREATE TABLE IF NOT EXISTS docs (
+        id INTEGER PRIMARY KEY,
+        url TEXT NOT NULL UNIQUE,
+        title TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS postings (
+        field TEXT NOT NULL,
+        term TEXT NOT NULL,
+        doc_id INTEGER NOT NULL REFERENCES docs (id) ON DELETE CASCADE,
+        PRIMARY KEY (field, term, doc_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+"""
+
+# campo dos tokens do título e dos títulos alternativos.
+TITLE: str = "title"
+# campos indexados pelo valor inteiro, sem separar em tokens.
+AUTHOR: str = "author"
+STATUS: str = "status"
+CATEGORY: str = "category"
+
+# operadores de search().
+AND: str = "and"
+OR: str = "or"
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# número máximo de parâmetros em uma consulta do SQLite.
+_MAX_PARAMETERS: int = 900
+
+
+def normalize(text: str) -> str:
+    """
+    Remove os acentos e as diferenças entre maiúsculas e minúsculas,
+    ex: "Ação" -> "acao".
+
+    :param text: o texto a ser normalizado.
+
+    :return:
+        o texto normalizado.
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.casefold().split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Separa um texto normalizado em palavras.
+
+    :param text: o texto, ex: "Shingeki no Kyojin".
+
+    :return:
+        as palavras, ex: ["shingeki", "no", "kyojin"].
+    """
+    return _TOKEN_PATTERN.findall(normalize(text))
+
+
+class SearchHit(NamedTuple):
+    """Um mangá encontrado por SearchIndex.search()."""
+    url: str
+    title: str
+
+
+class SearchIndex:
+    """
+    SearchIndex é um índice invertido salvo em SQLite para buscar os
+    mangás do JsonDB sem ler todos os arquivos.
+
+    Títulos e títulos alternativos são separados em palavras, sem
+    acentos e em minúsculas, e podem ser buscados pelo prefixo. Autor,
+    status e categorias são indexados pelo valor inteiro (também sem
+    acentos e em minúsculas).
+
+    Para manter o índice atualizado a cada save_manga():
+
+        JsonDB.add_listener(index.add)
+
+    Como o mesmo mangá é salvo várias vezes durante o crawl (ex: a cada
+    poucos capítulos), add() só escreve no índice quando o título, o
+    autor, o status ou as categorias mudaram desde a última vez.
+    """
+
+    def __init__(self, path: str = "json_db/search.sqlite3") -> None:
+        """
+        :param path: o path do arquivo do índice.
+
+        :return:
+            None
+        """
+        self._path: str = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # url -> o título e as postings indexadas por este processo.
+        self._indexed: Dict[str, Tuple[str, FrozenSet[tuple]]] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(
+                self._path, check_same_thread=False
+            )
+            self._connection.execute("PRAGMA foreign_keys = ON")
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.executescript(_SCHEMA)
+        return self._connection
+
+    @staticmethod
+    def _key(manga: MangaModel) -> str:
+        return manga.url or manga.title
+
+    @staticmethod
+    def _postings(manga: MangaModel) -> Set[tuple]:
+        postings: Set[tuple] = set()
+        for title in [manga.title] + list(manga.alternative_titles or []):
+            postings.update((TITLE, token) for token in tokenize(title))
+        for field, value in ((AUTHOR, manga.author), (STATUS, manga.status)):
+            if normalize(value):
+                postings.add((field, normalize(value)))
+        for category in manga.categories or []:
+            if normalize(category):
+                postings.add((CATEGORY, normalize(category)))
+        return postings
+
+    @staticmethod
+    def _insert(cursor: sqlite3.Cursor,
+                key: str,
+                title: str,
+                postings: Iterable[tuple]) -> None:
+        # apagar o documento apaga também as suas postings.
+        cursor.execute("DELETE FROM docs WHERE url = ?", (key,))
+        cursor.execute(
+            "INSERT INTO docs (url, title) VALUES (?, ?)", (key, title)
+        )
+        doc_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO postings VALUES (?, ?, ?)",
+            [(field, term, doc_id) for field, term in postings],
+        )
+
+    def add(self, manga: MangaModel) -> None:
+        """
+        Indexa um mangá, substituindo a versão anterior dele (pela url).
+        Se os campos indexados não mudaram desde o último add() do
+        mesmo mangá, nada é escrito.
+
+        :param manga: o mangá salvo.
+
+        :return:
+            None
+        """
+        key = self._key(manga)
+        entry = (manga.title, frozenset(self._postings(manga)))
+        with self._lock:
+            if self._indexed.get(key) == entry:
+                return
+            with self._connect() as connection:
+                self._insert(connection.cursor(), key, *entry)
+            self._indexed[key] = entry
+
+    def remove(self, url: str) -> None:
+        """
+        Remove um mangá do índice.
+
+        :param url: a url do mangá.
+
+        :return:
+            None
+        """
+        with self._lock, self._connect() as connection:
+            connection.execute("DELETE FROM docs WHERE url = ?", (url,))
+            self._indexed.pop(url, None)
+
+    def rebuild(self, mangas: Iterable[MangaModel]) -> int:
+        """
+        Apaga o índice e indexa de novo todos os mangás, ex:
+        index.rebuild(JsonDB.iter_mangas()).
+
+        :param mangas: os mangás a serem indexados.
+
+        :return:
+            o número de mangás indexados.
+        """
+        count: int = 0
+        with self._lock:
+            self._indexed.clear()
+            try:
+                with self._connect() as connection:
+                    cursor = connection.cursor()
+                    cursor.execute("DELETE FROM docs")
+                    for manga in mangas:
+                        key = self._key(manga)
+                        entry = (manga.title, frozenset(self._postings(manga)))
+                        self._insert(cursor, key, *entry)
+                        self._indexed[key] = entry
+                        count += 1
+            except BaseException:
+                # o índice voltou ao que era antes.
+                self._indexed.clear()
+                raise
+        return count
+
+    def _match(self,
+               connection: sqlite3.Connection,
+               field: str,
+               term: str,
+               prefix: bool) -> Set[int]:
+        if prefix:
+            # o índice da chave primária é usado também na busca por
+            # intervalo.
+            rows = connection.execute(
+                "SELECT doc_id FROM postings "
+                "WHERE field = ? AND term >= ? AND term < ?",
+                (field, term, term + "\U0010ffff"),
+            )
+        else:
+            rows = connection.execute(
+                "SELECT doc_id FROM postings WHERE field = ? AND term = ?",
+                (field, term),
+            )
+        return {row[0] for row in rows}
+
+    def search(self,
+               title: str = None,
+               author: str = None,
+               status: str = None,
+               categories: Iterable[str] = (),
+               operator: str = AND,
+               prefix: bool = True,
+               limit: int = 0) -> List[SearchHit]:
+        """
+        Busca os mangás pelo título, autor, status e categorias.
+
+        Cada palavra do título, o autor, o status e cada categoria é um
+        critério. Com operator=AND, o mangá precisa atender todos os
+        critérios; com operator=OR, pelo menos um.
+
+        :param title: palavras do título ou de um título alternativo,
+        ex: "one pie".
+
+        :param author: o autor do mangá.
+
+        :param status: o status do mangá, ex: "Completo".
+
+        :param categories: as categorias do mangá.
+
+        :param operator: AND ou OR.
+
+        :param prefix: se True, as palavras do título são buscadas pelo
+        prefixo, ex: "pie" encontra "piece".
+
+        :param limit: número máximo de resultados. 0 para todos.
+
+        :return:
+            os mangás encontrados, ordenados pelo título.
+        """
+        if operator not in (AND, OR):
+            raise ValueError(f"Operador desconhecido: {operator}")
+        criteria = [(TITLE, token, prefix) for token in tokenize(title)]
+        criteria += [
+            (field, normalize(value), False)
+            for field, value in ((AUTHOR, author), (STATUS, status))
+            if value
+        ]
+        criteria += [
+            (CATEGORY, normalize(category), False) for category in categories
+        ]
+        if not criteria:
+            return []
+
+        with self._lock:
+            connection = self._connect()
+            doc_ids: Optional[Set[int]] = None
+            for field, term, is_prefix in criteria:
+                matches = self._match(connection, field, term, is_prefix)
+                if doc_ids is None:
+                    doc_ids = matches
+                elif operator == AND:
+                    doc_ids &= matches
+                else:
+                    doc_ids |= matches
+                if operator == AND and not doc_ids:
+                    return []
+            doc_ids = sorted(doc_ids)
+            hits: List[SearchHit] = []
+            # em partes, por causa do limite de parâmetros do SQLite.
+            for start in range(0, len(doc_ids), _MAX_PARAMETERS):
+                chunk = doc_ids[start:start + _MAX_PARAMETERS]
+                hits += [SearchHit(*row) for row in connection.execute(
+                    "SELECT url, title FROM docs WHERE id IN "
+                    f"({','.join('?' * len(chunk))})",
+                    chunk,
+                )]
+        hits.sort(key=lambda hit: (normalize(hit.title), hit.url))
+        return hits[:limit] if limit else hits
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM docs"
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
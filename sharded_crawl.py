@@ -0,0 +1,596 @@
+"""
+Crawl dividido entre várias máquinas (ou processos).
+
+Os jobs ficam em um JobJournal em um disco compartilhado por todas as
+máquinas. Cada worker empresta páginas de listagem e mangás do journal,
+então dois workers nunca pegam o mesmo job, e grava os mangás no seu
+próprio diretório (shard). No fim, merge junta os shards em um único
+banco de dados, sem mangás repetidos, e atualiza o índice de busca
+dele.
+
+Uso, a partir da raiz do projeto:
+
+    python sharded_crawl.py plan --queue /shared/jobs.sqlite3 --last 401
+    python sharded_crawl.py worker --queue /shared/jobs.sqlite3 \\
+        --shards /shared/shards --browsers 4
+    python sharded_crawl.py status --queue /shared/jobs.sqlite3
+    python sharded_crawl.py merge --shards /shared/shards --output json_db
+
+Para ganhar velocidade, basta iniciar workers em mais máquinas.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+from browser_pool import BrowserPool
+from incremental_update import is_chapter_complete, merge_stored_chapters
+from job_journal import (
+    PENDING,
+    RUNNING,
+    JobJournal,
+    MangaCheckpoint,
+    default_owner,
+)
+from manga_model import MangaModel
+from page_cache import PageCache
+from parallel_chapters import ParallelChapterScraper
+from pipeline import Pipeline, Stage
+from scraper_mangas_info import ScraperMangasInfo
+from scraper_mangas_links import get_mangas_links_in_range
+from search_index import SearchIndex
+from storage_backend import JsonFileBackend, StorageBackend
+from write_behind import WriteBehindBackend
+
+# tipos dos jobs no journal compartilhado.
+LISTING_KIND: str = "listing_page"
+MANGA_KIND: str = "manga"
+
+# um mangá entre as etapas do worker (ver app.py).
+MangaJob = Tuple[str, MangaModel, Any]
+
+
+def open_queue(path: str,
+               lease_seconds: float = 3600,
+               shared_storage: bool = True) -> JobJournal:
+    """
+    Abre o journal compartilhado pelos workers.
+
+    :param path: o path do arquivo do journal.
+
+    :param lease_seconds: tempo em segundos que um mangá fica reservado
+    para um worker. Deve ser maior que o tempo de obter um mangá
+    inteiro, ou outro worker vai obtê-lo de novo.
+
+    :param shared_storage: se True, o arquivo está em um disco de rede
+    e não pode usar o WAL do SQLite.
+
+    :return:
+        JobJournal
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return JobJournal(
+        path, lease_seconds=lease_seconds, wal=not shared_storage
+    )
+
+
+def plan(journal: JobJournal,
+         first_page: int = 1,
+         last_page: int = 401,
+         manga_urls: Iterable[str] = (),
+         refresh: bool = False) -> None:
+    """
+    Adiciona ao journal as páginas de listagem e, opcionalmente, urls de
+    mangás já conhecidas. Jobs que já existem não são alterados, então
+    planejar de novo não repete o que já foi feito, a não ser com
+    refresh.
+
+    :param journal: o journal compartilhado.
+
+    :param first_page: a primeira página de listagem.
+
+    :param last_page: a última página de listagem.
+
+    :param manga_urls: urls de mangás adicionadas direto.
+
+    :param refresh: se True, começa um crawl novo: as páginas e os
+    mangás já concluídos ou que falharam voltam a ser pendentes, para
+    obter os mangás e os capítulos novos.
+
+    :return:
+        None
+    """
+    if refresh:
+        journal.reset(LISTING_KIND)
+        journal.reset(MANGA_KIND)
+    journal.add(
+        LISTING_KIND, [str(page) for page in range(first_page, last_page + 1)]
+    )
+    journal.add(MANGA_KIND, manga_urls)
+
+
+def _shard_name(owner: str) -> str:
+    """O nome do diretório do shard de um worker, ex: "host-1234"."""
+    return "".join(c if c.isalnum() or c in "-_." else "-" for c in owner)
+
+
+class ShardWorker:
+    """
+    ShardWorker obtém os jobs do journal compartilhado até não sobrar
+    nenhum: primeiro os mangás pendentes e, quando não houver, uma
+    página de listagem, cujos mangás são adicionados ao journal para
+    todos os workers.
+
+    Os mangás passam pelas mesmas etapas de app.py (informações ->
+    capítulos -> gravação), com um Pipeline, e são gravados em
+    shards_dir/<shard_id>.
+    """
+
+    def __init__(self,
+                 journal: JobJournal,
+                 shards_dir: str = "json_db/shards",
+                 shard_id: str = None,
+                 browsers: int = 1,
+                 info_workers: int = 2,
+                 chapter_workers: int = 1,
+                 batch_size: int = 2,
+                 idle_wait: float = 30,
+                 chapters: bool = True,
+                 listing_url: str = None,
+                 page_cache: PageCache = None) -> None:
+        """
+        :param journal: o journal compartilhado.
+
+        :param shards_dir: o diretório com os shards de todos os workers.
+
+        :param shard_id: o nome deste worker, usado como dono dos jobs
+        e como nome do shard. Por padrão, "<host>-<pid>".
+
+        :param browsers: tamanho do pool de navegadores deste worker.
+
+        :param info_workers: threads obtendo as informações dos mangás.
+
+        :param chapter_workers: threads obtendo as páginas dos capítulos.
+        Os navegadores são divididos entre elas.
+
+        :param batch_size: número de mangás emprestados de cada vez.
+
+        :param idle_wait: tempo em segundos esperando quando não há jobs
+        pendentes, mas outros workers ainda têm jobs em andamento (que
+        podem adicionar mangás ou ter o empréstimo expirado).
+
+        :param chapters: se False, só as informações e a lista de
+        capítulos de cada mangá são obtidas, sem o navegador.
+
+        :param listing_url: a url das páginas de listagem, sem o número.
+        Por padrão, a do site.
+
+        :param page_cache: cache das páginas dos mangás deste worker.
+
+        :return:
+            None
+        """
+        self._journal: JobJournal = journal
+        self._owner: str = _shard_name(shard_id or default_owner())
+        self._shard_dir: str = os.path.join(shards_dir, self._owner)
+        self._browsers: int = browsers
+        self._info_workers: int = info_workers
+        self._chapter_workers: int = chapter_workers
+        self._batch_size: int = batch_size
+        self._idle_wait: float = idle_wait
+        self._chapters: bool = chapters
+        self._listing_kwargs: Dict[str, str] = (
+            {"base_url": listing_url} if listing_url else {}
+        )
+        self._page_cache: Optional[PageCache] = page_cache
+        self._storage: Optional[StorageBackend] = None
+        self._browser_pool: Optional[BrowserPool] = None
+        # cada thread das etapas tem o seu scraper.
+        self._local = threading.local()
+        # os scrapers de informações criados pelas threads, fechados no
+        # fim de run().
+        self._scrapers_info: List[ScraperMangasInfo] = []
+        self._scrapers_lock = threading.Lock()
+        self.pages_done: int = 0
+
+    @property
+    def shard_dir(self) -> str:
+        """O diretório onde este worker grava os mangás."""
+        return self._shard_dir
+
+    def _discover(self, page: str) -> None:
+        """Adiciona ao journal os mangás de uma página de listagem. Se a
+        página falhar, o job dela é marcado como falho e o worker segue
+        com os outros jobs."""
+        failed: List[str] = []
+        try:
+            links = get_mangas_links_in_range(
+                int(page), int(page), failed_pages=failed,
+                **self._listing_kwargs
+            )
+            if not failed:
+                self._journal.add(MANGA_KIND, links)
+                self._storage.update_list_title(links)
+        # ex: um html inesperado ou um erro ao gravar a lista de títulos.
+        except Exception as error:  # noqa: BLE001
+            print(f"Erro ao buscar a página de mangás! {page}: {error!r}")
+            self._journal.fail(LISTING_KIND, page, repr(error), self._owner)
+            return
+        if failed:
+            self._journal.fail(
+                LISTING_KIND, page, "página não obtida", self._owner
+            )
+            return
+        self._journal.complete(LISTING_KIND, [page], self._owner)
+        self.pages_done += 1
+
+    def _has_work_elsewhere(self) -> bool:
+        """Verifica se outros workers ainda têm jobs em andamento."""
+        return any(
+            self._journal.counts(kind).get(RUNNING, 0)
+            for kind in (LISTING_KIND, MANGA_KIND)
+        )
+
+    def _leased_mangas(self) -> Iterator[str]:
+        """Empresta mangás do journal até não sobrar nenhum job."""
+        while True:
+            urls = self._journal.lease(
+                MANGA_KIND, self._owner, limit=self._batch_size
+            )
+            if urls:
+                yield from urls
+                continue
+            pages = self._journal.lease(LISTING_KIND, self._owner)
+            if pages:
+                self._discover(pages[0])
+                continue
+            if not self._has_work_elsewhere():
+                return
+            time.sleep(self._idle_wait)
+
+    def _renew(self, manga_link: str) -> bool:
+        """Renova o empréstimo de um mangá. Retorna False se ele não é
+        mais deste worker."""
+        if self._journal.renew(MANGA_KIND, [manga_link], self._owner):
+            return True
+        print(f"Mangá emprestado para outro worker! {manga_link}")
+        return False
+
+    def _fetch_manga_info(self, manga_link: str) -> Optional[MangaJob]:
+        # o empréstimo começou quando o mangá entrou na fila, e pode ter
+        # expirado enquanto ele esperava.
+        if not self._renew(manga_link):
+            return None
+        if not hasattr(self._local, "scraper_info"):
+            self._local.scraper_info = ScraperMangasInfo(
+                browser_pool=self._browser_pool, page_cache=self._page_cache
+            )
+            with self._scrapers_lock:
+                self._scrapers_info.append(self._local.scraper_info)
+        manga = self._local.scraper_info.get_manga_info(manga_link)
+        stored_manga = self._storage.load_manga(manga.title)
+        pending_chapters = merge_stored_chapters(manga, stored_manga)
+        self._storage.save_manga(manga)
+        if not self._chapters:
+            pending_chapters = []
+        return manga_link, manga, pending_chapters
+
+    def _fetch_chapters(self, job: MangaJob) -> Optional[MangaJob]:
+        manga_link, manga, pending_chapters = job
+        if not self._renew(manga_link):
+            return None
+        checkpoint = MangaCheckpoint(
+            self._journal, manga, self._storage.save_manga,
+            flush=self._storage.flush,
+            owner=self._owner,
+            # o mangá continua emprestado enquanto os capítulos são
+            # obtidos.
+            renew=lambda: self._journal.renew(
+                MANGA_KIND, [manga_link], self._owner
+            ),
+        )
+        if pending_chapters:
+            if not hasattr(self._local, "scraper_chapters"):
+                self._local.scraper_chapters = ParallelChapterScraper(
+                    self._browser_pool,
+                    workers=max(1, self._browsers // self._chapter_workers),
+                    timeout=30,
+                )
+            checkpoint.start(pending_chapters)
+            self._local.scraper_chapters.get_chapter_pages(
+                manga,
+                pending_chapters,
+                on_chapter_done=checkpoint.chapter_done,
+                on_chapter_failed=checkpoint.chapter_failed,
+            )
+        return manga_link, manga, checkpoint
+
+    def _persist_manga(self, job: MangaJob) -> None:
+        manga_link, _, checkpoint = job
+        checkpoint.flush()
+        failed_chapters = checkpoint.failed_chapters
+        if failed_chapters:
+            # o mangá volta para a fila e os capítulos que faltam são
+            # obtidos na próxima tentativa.
+            self._journal.fail(
+                MANGA_KIND, manga_link,
+                f"{len(failed_chapters)} capítulos não foram obtidos",
+                self._owner,
+            )
+            return
+        self._journal.complete(MANGA_KIND, [manga_link], self._owner)
+
+    def _report_error(self, stage: str, item: Any, error: Exception) -> None:
+        manga_link = item if isinstance(item, str) else item[0]
+        print(f"Erro ao obter o mangá! {manga_link}: {error!r}")
+        self._journal.fail(MANGA_KIND, manga_link, repr(error), self._owner)
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Obtém jobs do journal até não sobrar nenhum.
+
+        :return:
+            o que cada etapa fez e o número de páginas de listagem
+            obtidas por este worker.
+        """
+        self._storage = WriteBehindBackend(JsonFileBackend(self._shard_dir))
+        self._storage.create()
+        try:
+            with BrowserPool(size=self._browsers) as browser_pool:
+                self._browser_pool = browser_pool
+                pipeline = Pipeline(
+                    [
+                        Stage("info", self._fetch_manga_info,
+                              workers=self._info_workers,
+                              queue_size=self._batch_size),
+                        Stage("chapters", self._fetch_chapters,
+                              workers=self._chapter_workers,
+                              queue_size=self._batch_size),
+                        Stage("persist", self._persist_manga,
+                              queue_size=self._batch_size),
+                    ],
+                    on_error=self._report_error,
+                )
+                stages = pipeline.run(self._leased_mangas())
+        finally:
+            for scraper_info in self._scrapers_info:
+                scraper_info.close()
+            self._scrapers_info = []
+            self._local = threading.local()
+            self._storage.close()
+            self._browser_pool = None
+        return {"shard": self._owner, "listing_pages": self.pages_done,
+                "stages": stages}
+
+
+def _completeness(manga: MangaModel) -> int:
+    """Número de capítulos do mangá com todas as páginas."""
+    return sum(
+        is_chapter_complete(chapter) for chapter in manga.chapters or []
+    )
+
+
+def merge_copies(manga: MangaModel, other: MangaModel) -> MangaModel:
+    """
+    Junta duas cópias do mesmo mangá, obtidas por workers diferentes.
+
+    A cópia com mais capítulos completos é a base. Os capítulos da
+    outra cópia que faltam na base, ou que só estão completos na outra,
+    são copiados para ela.
+
+    :param manga: uma cópia do mangá.
+
+    :param other: outra cópia do mesmo mangá.
+
+    :return:
+        a cópia base, com os capítulos das duas.
+    """
+    if _completeness(other) > _completeness(manga):
+        manga, other = other, manga
+    chapters = list(manga.chapters or [])
+    positions: Dict[str, int] = {
+        chapter["url"]: index for index, chapter in enumerate(chapters)
+    }
+    for chapter in other.chapters or []:
+        index = positions.get(chapter["url"])
+        if index is None:
+            positions[chapter["url"]] = len(chapters)
+            chapters.append(chapter)
+        elif (is_chapter_complete(chapter)
+              and not is_chapter_complete(chapters[index])):
+            chapters[index] = chapter
+    manga.chapters = chapters
+    return manga
+
+
+def merge_shards(shards_dir: str,
+                 output: StorageBackend = None,
+                 index: SearchIndex = None) -> Dict[str, int]:
+    """
+    Junta os mangás de todos os shards em um banco de dados, sem
+    repetições: cópias do mesmo mangá (pela url), nos shards ou já
+    salvas em output, são juntadas com merge_copies. Se o título de um
+    mangá mudou, a cópia com o título antigo é apagada. Só as urls e os
+    títulos dos mangás ficam em memória.
+
+    :param shards_dir: o diretório com os shards.
+
+    :param output: onde os mangás são gravados. Por padrão, o JsonDB
+    em "json_db".
+
+    :param index: se passado, o índice de busca de output, atualizado
+    com cada mangá gravado.
+
+    :return:
+        o número de shards, de mangás gravados e de cópias juntadas.
+    """
+    output = output or JsonFileBackend()
+    output.create()
+    # url do mangá -> título com que ele está gravado em output.
+    titles: Dict[str, str] = {
+        manga.url: manga.title for manga in output.iter_mangas()
+    }
+    # urls dos mangás gravados por este merge.
+    merged: Set[str] = set()
+    # (título, url) das cópias com um título que não é mais o do mangá.
+    stale: Set[Tuple[str, str]] = set()
+    duplicates: int = 0
+    names = sorted(
+        name for name in os.listdir(shards_dir)
+        if os.path.isdir(os.path.join(shards_dir, name))
+    )
+    for name in names:
+        shard = JsonFileBackend(os.path.join(shards_dir, name))
+        output.update_list_title(shard.load_list_titles())
+        for manga in shard.iter_mangas():
+            title = titles.get(manga.url)
+            if title is not None:
+                if manga.url in merged:
+                    duplicates += 1
+                # a cópia de output pode ter páginas que o shard não
+                # tem (ex: um worker com --skip-chapters).
+                saved = output.load_manga(title)
+                if saved is not None:
+                    manga = merge_copies(saved, manga)
+                if manga.title != title:
+                    stale.add((title, manga.url))
+            output.save_manga(manga)
+            # o índice é pela url, então um título novo substitui o
+            # antigo.
+            if index is not None:
+                index.add(manga)
+            titles[manga.url] = manga.title
+            merged.add(manga.url)
+    output.flush()
+    # só depois de gravar o mangá com o título novo.
+    for title, url in stale:
+        if titles[url] != title:
+            output.delete_manga(title, url)
+    return {"shards": len(names), "mangas": len(merged),
+            "duplicates": duplicates}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Crawl dividido entre várias máquinas."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = commands.add_parser(
+        "plan", help="adiciona as páginas de listagem ao journal."
+    )
+    plan_parser.add_argument("--queue", required=True)
+    plan_parser.add_argument("--first", type=int, default=1)
+    plan_parser.add_argument("--last", type=int, default=401)
+    plan_parser.add_argument(
+        "--urls", help="arquivo com urls de mangás, uma por linha."
+    )
+    plan_parser.add_argument(
+        "--refresh", action="store_true",
+        help="obtém de novo os mangás já concluídos."
+    )
+
+    worker_parser = commands.add_parser(
+        "worker", help="obtém jobs do journal até não sobrar nenhum."
+    )
+    worker_parser.add_argument("--queue", required=True)
+    worker_parser.add_argument("--shards", default="json_db/shards")
+    worker_parser.add_argument("--shard-id")
+    worker_parser.add_argument("--browsers", type=int, default=1)
+    worker_parser.add_argument("--info-workers", type=int, default=2)
+    worker_parser.add_argument("--chapter-workers", type=int, default=1)
+    worker_parser.add_argument("--lease-seconds", type=float, default=3600)
+    worker_parser.add_argument(
+        "--skip-chapters", action="store_true",
+        help="não obtém as páginas dos capítulos (sem navegador)."
+    )
+
+    status_parser = commands.add_parser(
+        "status", help="mostra quantos jobs há em cada estado."
+    )
+    status_parser.add_argument("--queue", required=True)
+
+    merge_parser = commands.add_parser(
+        "merge", help="junta os shards em um banco de dados."
+    )
+    merge_parser.add_argument("--shards", default="json_db/shards")
+    merge_parser.add_argument("--output", default="json_db")
+    merge_parser.add_argument(
+        "--index",
+        help="o índice de busca atualizado com os mangás juntados. Por "
+             "padrão, search.sqlite3 no diretório de --output."
+    )
+
+    for command_parser in (plan_parser, worker_parser, status_parser):
+        command_parser.add_argument(
+            "--local", action="store_true",
+            help="o journal está em um disco local (usa o WAL)."
+        )
+    args = parser.parse_args()
+
+    if args.command == "merge":
+        index = SearchIndex(
+            args.index or os.path.join(args.output, "search.sqlite3")
+        )
+        try:
+            result: Dict[str, Any] = merge_shards(
+                args.shards, JsonFileBackend(args.output), index
+            )
+        finally:
+            index.close()
+        print(json.dumps(result, indent=4))
+        return
+
+    journal = open_queue(
+        args.queue,
+        lease_seconds=getattr(args, "lease_seconds", 3600),
+        shared_storage=not args.local,
+    )
+    try:
+        if args.command == "plan":
+            urls: List[str] = []
+            if args.urls:
+                with open(args.urls, "r", encoding="utf-8") as file:
+                    urls = [line.strip() for line in file if line.strip()]
+            plan(journal, args.first, args.last, urls, args.refresh)
+            result = {LISTING_KIND: journal.counts(LISTING_KIND),
+                      MANGA_KIND: journal.counts(MANGA_KIND)}
+        elif args.command == "worker":
+            result = ShardWorker(
+                journal,
+                shards_dir=args.shards,
+                shard_id=args.shard_id,
+                browsers=args.browsers,
+                info_workers=args.info_workers,
+                chapter_workers=args.chapter_workers,
+                chapters=not args.skip_chapters,
+            ).run()
+        else:
+            result = {
+                kind: journal.counts(kind)
+                for kind in (LISTING_KIND, MANGA_KIND,
+                             MangaCheckpoint.KIND)
+            }
+            result["pending"] = sum(
+                journal.counts(kind).get(PENDING, 0)
+                for kind in (LISTING_KIND, MANGA_KIND)
+            )
+    finally:
+        journal.close()
+    print(json.dumps(result, indent=4, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from manga_model import Chapter, MangaModel
+from storage_backend import StorageBackend
+
+_SCHEMA: str = """
+    CREATE TABLE IF NOT EXISTS mangas (
+        id INTEGER PRIMARY KEY,
+        url TEXT NOT NULL UNIQUE,
+        title TEXT NOT NULL,
+        author TEXT NOT NULL,
+        status TEXT NOT NULL,
+        cover TEXT NOT NULL,
+        description TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS mangas_title ON mangas (title);
+    CREATE INDEX IF NOT EXISTS mangas_author ON mangas (author);
+
+    CREATE TABLE IF NOT EXISTS alternative_titles (
+        manga_id INTEGER NOT NULL REFERENCES mangas (id) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        title TEXT NOT NULL,
+        PRIMARY KEY (manga_id, position)
+    );
+
+    CREATE TABLE IF NOT EXISTS categories (
+        manga_id INTEGER NOT NULL REFERENCES mangas (id) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        PRIMARY KEY (manga_id, position)
+    );
+    CREATE INDEX IF NOT EXISTS categories_category ON categories (category);
+
+    CREATE TABLE IF NOT EXISTS chapters (
+        id INTEGER PRIMARY KEY,
+        manga_id INTEGER NOT NULL REFERENCES mangas (id) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        url TEXT NOT NULL,
+        number_of_chapter TEXT NOT NULL,
+        number_of_pages INTEGER NOT NULL,
+        -- as outras chaves do capítulo (ex: "images"), em json.
+        extra TEXT
+    );
+    CREATE INDEX IF NOT EXISTS chapters_manga ON chapters (manga_id, position);
+
+    CREATE TABLE IF NOT EXISTS pages (
+        chapter_id INTEGER NOT NULL REFERENCES chapters (id) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        url TEXT NOT NULL,
+        PRIMARY KEY (chapter_id, position)
+    );
+
+    CREATE TABLE IF NOT EXISTS list_titles (
+        position INTEGER PRIMARY KEY,
+        title TEXT NOT NULL UNIQUE
+    );
+"""
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    SQLiteBackend salva os mangás em um banco SQLite, com tabelas
+    separadas para mangás, títulos alternativos, categorias, capítulos
+    e páginas, e índices por url, título, autor e categoria.
+
+    Cada mangá é identificado pela sua url, então mangás com o mesmo
+    título não se sobrescrevem.
+    """
+
+    def __init__(self, path: str = "json_db/mangas.sqlite3") -> None:
+        """
+        :param path: o path do arquivo do banco de dados.
+
+        :return:
+            None
+        """
+        self._path: str = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(
+                self._path, check_same_thread=False
+            )
+            self._connection.execute("PRAGMA foreign_keys = ON")
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.executescript(_SCHEMA)
+            columns = [row[1] for row in self._connection.execute(
+                "PRAGMA table_info(chapters)"
+            )]
+            # bancos criados antes da coluna extra.
+            if "extra" not in columns:
+                self._connection.execute(
+                    "ALTER TABLE chapters ADD COLUMN extra TEXT"
+                )
+        return self._connection
+
+    @staticmethod
+    def _chapter_extra(chapter: Dict[str, Any]) -> Optional[str]:
+        """As chaves do capítulo que não têm coluna própria, em json."""
+        extra = {
+            key: chapter[key] for key in chapter.keys()
+            if key not in Chapter.KEYS
+        }
+        return json.dumps(extra, ensure_ascii=False) if extra else None
+
+    def create(self) -> None:
+        with self._lock:
+            self._connect()
+
+    def save_list_titles(self, list_titles: List[str]) -> None:
+        with self._lock, self._connect() as connection:
+            connection.execute("DELETE FROM list_titles")
+            connection.executemany(
+                "INSERT OR IGNORE INTO list_titles (title) VALUES (?)",
+                [(title,) for title in list_titles],
+            )
+
+    def update_list_title(self, new_list_titles: List[str]) -> None:
+        with self._lock, self._connect() as connection:
+            connection.executemany(
+                "INSERT OR IGNORE INTO list_titles (title) VALUES (?)",
+                [(title,) for title in new_list_titles],
+            )
+
+    def load_list_titles(self) -> List[str]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT title FROM list_titles ORDER BY position"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def _insert_manga(cursor: sqlite3.Cursor, manga: MangaModel) -> None:
+        # apagar o mangá apaga também os capítulos, páginas, títulos
+        # alternativos e categorias dele (ON DELETE CASCADE).
+        cursor.execute("DELETE FROM mangas WHERE url = ?", (manga.url,))
+        cursor.execute(
+            "INSERT INTO mangas (url, title, author, status, cover, "
+            "description) VALUES (?, ?, ?, ?, ?, ?)",
+            (manga.url, manga.title, manga.author, manga.status,
+             manga.cover, manga.description),
+        )
+        manga_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO alternative_titles VALUES (?, ?, ?)",
+            [(manga_id, i, t)
+             for i, t in enumerate(manga.alternative_titles or [])],
+        )
+        cursor.executemany(
+            "INSERT INTO categories VALUES (?, ?, ?)",
+            [(manga_id, i, c) for i, c in enumerate(manga.categories or [])],
+        )
+        for position, chapter in enumerate(manga.chapters or []):
+            cursor.execute(
+                "INSERT INTO chapters (manga_id, position, url, "
+                "number_of_chapter, number_of_pages, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (manga_id, position, chapter["url"],
+                 chapter["number_of_chapter"], chapter["number_of_pages"],
+                 SQLiteBackend._chapter_extra(chapter)),
+            )
+            chapter_id = cursor.lastrowid
+            cursor.executemany(
+                "INSERT INTO pages VALUES (?, ?, ?)",
+                [(chapter_id, i, page)
+                 for i, page in enumerate(chapter["pages"])],
+            )
+
+    def save_mangas(self, mangas: Iterable[MangaModel]) -> int:
+        # todos os mangás são salvos em uma única transação.
+        with self._lock, self._connect() as connection:
+            cursor = connection.cursor()
+            for manga in mangas:
+                self._insert_manga(cursor, manga)
+        # o SQLite não informa quantos bytes foram escritos.
+        return 0
+
+    def _load(self, manga_id: int) -> MangaModel:
+        """Monta o MangaModel a partir das tabelas. Deve ser chamado com
+        self._lock."""
+        connection = self._connect()
+        url, title, author, status, cover, description = connection.execute(
+            "SELECT url, title, author, status, cover, description "
+            "FROM mangas WHERE id = ?",
+            (manga_id,),
+        ).fetchone()
+        alternative_titles = [row[0] for row in connection.execute(
+            "SELECT title FROM alternative_titles WHERE manga_id = ? "
+            "ORDER BY position",
+            (manga_id,),
+        )]
+        categories = [row[0] for row in connection.execute(
+            "SELECT category FROM categories WHERE manga_id = ? "
+            "ORDER BY position",
+            (manga_id,),
+        )]
+        chapters: List[Dict[str, Any]] = []
+        chapter_rows = connection.execute(
+            "SELECT id, url, number_of_chapter, number_of_pages, extra "
+            "FROM chapters WHERE manga_id = ? ORDER BY position",
+            (manga_id,),
+        ).fetchall()
+        for (chapter_id, chapter_url, number, number_of_pages,
+             extra) in chapter_rows:
+            pages = [row[0] for row in connection.execute(
+                "SELECT url FROM pages WHERE chapter_id = ? ORDER BY position",
+                (chapter_id,),
+            )]
+            chapter: Dict[str, Any] = {
+                "pages": pages,
+                "number_of_pages": number_of_pages,
+                "number_of_chapter": number,
+                "url": chapter_url,
+            }
+            if extra:
+                chapter.update(json.loads(extra))
+            chapters.append(chapter)
+        return MangaModel(
+            title=title,
+            alternative_titles=alternative_titles,
+            url=url,
+            status=status,
+            cover=cover,
+            author=author,
+            categories=categories,
+            description=description,
+            chapters=chapters,
+        )
+
+    def _find(self, query: str, params: tuple) -> List[MangaModel]:
+        with self._lock:
+            ids = [row[0] for row in self._connect().execute(query, params)]
+            return [self._load(manga_id) for manga_id in ids]
+
+    def load_manga(self, title: str) -> Optional[MangaModel]:
+        mangas = self.find_by_title(title)
+        return mangas[0] if mangas else None
+
+    def find_by_url(self, url: str) -> Optional[MangaModel]:
+        mangas = self._find("SELECT id FROM mangas WHERE url = ?", (url,))
+        return mangas[0] if mangas else None
+
+    def find_by_title(self, title: str) -> List[MangaModel]:
+        """Retorna os mangás com o título passado."""
+        return self._find(
+            "SELECT id FROM mangas WHERE title = ? ORDER BY id", (title,)
+        )
+
+    def find_by_author(self, author: str) -> List[MangaModel]:
+        """Retorna os mangás do autor passado."""
+        return self._find(
+            "SELECT id FROM mangas WHERE author = ? ORDER BY id", (author,)
+        )
+
+    def find_by_category(self, category: str) -> List[MangaModel]:
+        """Retorna os mangás da categoria passada."""
+        return self._find(
+            "SELECT DISTINCT manga_id FROM categories WHERE category = ? "
+            "ORDER BY manga_id",
+            (category,),
+        )
+
+    def delete_manga(self, title: str, url: str) -> None:
+        # os mangás são identificados pela url, então um mangá salvo de
+        # novo com outro título não deixa uma cópia com o título antigo.
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                "DELETE FROM mangas WHERE title = ? AND url = ?", (title, url)
+            )
+
+    def iter_mangas(self) -> Iterator[MangaModel]:
+        with self._lock:
+            ids = [row[0] for row in self._connect().execute(
+                "SELECT id FROM mangas ORDER BY id"
+            )]
+        for manga_id in ids:
+            with self._lock:
+                manga = self._load(manga_id)
+            yield manga
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
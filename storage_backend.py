@@ -0,0 +1,172 @@
+import os
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, List, Optional
+from manga_codec import MangaCodec, get_codec
+from manga_model import MangaModel
+from atomic_file import atomic_write
+from instrumentation import METRICS
+from title_registry import TitleRegistry
+
+
+class StorageBackend(ABC):
+    """
+    StorageBackend é a interface dos bancos de dados usados pelo JsonDB
+    para salvar os mangás e a lista de títulos.
+    """
+
+    @abstractmethod
+    def create(self) -> None:
+        """Cria o banco de dados se ele não existir."""
+
+    @abstractmethod
+    def save_list_titles(self, list_titles: List[str]) -> None:
+        """Salva a lista de títulos, substituindo a anterior."""
+
+    @abstractmethod
+    def update_list_title(self, new_list_titles: List[str]) -> None:
+        """Adiciona à lista de títulos os títulos que ainda não estão
+        nela."""
+
+    @abstractmethod
+    def load_list_titles(self) -> List[str]:
+        """Retorna a lista de títulos salva."""
+
+    def save_manga(self, manga: MangaModel) -> None:
+        """Salva um mangá, substituindo a versão anterior."""
+        self.save_mangas([manga])
+
+    @abstractmethod
+    def save_mangas(self, mangas: Iterable[MangaModel]) -> int:
+        """Salva vários mangás de uma vez. Retorna o número de bytes
+        escritos, ou 0 se o banco de dados não souber informá-lo."""
+
+    @abstractmethod
+    def load_manga(self, title: str) -> Optional[MangaModel]:
+        """Retorna o mangá com o título passado, ou None."""
+
+    @abstractmethod
+    def iter_mangas(self) -> Iterator[MangaModel]:
+        """Percorre todos os mangás salvos, um de cada vez."""
+
+    @abstractmethod
+    def delete_manga(self, title: str, url: str) -> None:
+        """Apaga o mangá salvo com o título passado, se ele ainda for o
+        da url passada. Usado quando o título de um mangá muda."""
+
+    def find_by_url(self, url: str) -> Optional[MangaModel]:
+        """Retorna o mangá com a url passada, ou None."""
+        for manga in self.iter_mangas():
+            if manga.url == url:
+                return manga
+        return None
+
+    def flush(self) -> None:
+        """Grava no disco os mangás que ainda estão só na memória."""
+
+    def close(self) -> None:
+        """Libera os recursos do banco de dados."""
+
+
+class JsonFileBackend(StorageBackend):
+    """
+    JsonFileBackend salva cada mangá em um arquivo json com o nome
+    gerado a partir do título, e a lista de títulos em
+    "list_titles/list_titles.json", mantida por um TitleRegistry.
+    """
+
+    def __init__(self,
+                 db_dir: str = "json_db",
+                 codec: MangaCodec = None) -> None:
+        """
+        :param db_dir: o diretório do banco de dados.
+
+        :param codec: o codec usado para escrever e ler os mangás. Por
+        padrão, o json indentado.
+
+        :return:
+            None
+        """
+        self._codec: MangaCodec = codec or get_codec()
+        # path do banco de dados em si, onde serão armazeados os
+        # títulos.
+        self._db_dir: str = db_dir
+        # path completo dos diretórios do banco de dados json.
+        self._full_dir: str = db_dir + "/list_titles"
+        # criado no primeiro uso, depois que o diretório existir.
+        self._registry: Optional[TitleRegistry] = None
+
+    @property
+    def db_dir(self) -> str:
+        """O diretório do banco de dados."""
+        return self._db_dir
+
+    def create(self) -> None:
+        try:
+            os.makedirs(self._full_dir)
+        # o diretório já existe.
+        except FileExistsError:
+            return
+
+    def _get_registry(self) -> TitleRegistry:
+        if self._registry is None:
+            self._registry = TitleRegistry(self._full_dir)
+        return self._registry
+
+    def save_list_titles(self, list_titles: List[str]) -> None:
+        self._get_registry().replace(list_titles)
+
+    def load_list_titles(self) -> List[str]:
+        return self._get_registry().titles
+
+    def update_list_title(self, new_list_titles: List[str]) -> None:
+        self._get_registry().add_many(new_list_titles)
+
+    def _manga_file_dir(self, title: str) -> str:
+        """Retorna o path do arquivo onde o mangá de título passado
+        é salvo."""
+        name_file = "-".join(title.lower().split(" ")) + ".json"
+        return self._db_dir + "/" + name_file
+
+    def save_mangas(self, mangas: Iterable[MangaModel]) -> int:
+        bytes_written: int = 0
+        for manga in mangas:
+            with METRICS.timer("manga_encode"):
+                data = manga.to_bytes(self._codec)
+            # escrita atômica: uma queda no meio não corrompe o arquivo.
+            with METRICS.timer("manga_write"):
+                bytes_written += atomic_write(
+                    self._manga_file_dir(manga.title), data
+                )
+        METRICS.count("manga_write_bytes", bytes_written)
+        return bytes_written
+
+    def _load_file(self, file_dir: str) -> MangaModel:
+        with open(file_dir, "rb") as file:
+            return MangaModel.from_bytes(file.read(), self._codec)
+
+    def load_manga(self, title: str) -> Optional[MangaModel]:
+        try:
+            return self._load_file(self._manga_file_dir(title))
+        except FileNotFoundError:
+            return None
+
+    def delete_manga(self, title: str, url: str) -> None:
+        file_dir = self._manga_file_dir(title)
+        try:
+            manga = self._load_file(file_dir)
+        except FileNotFoundError:
+            return
+        # outro mangá, ou o mesmo com o título novo, pode ter o mesmo
+        # nome de arquivo.
+        if manga.url == url and manga.title == title:
+            os.remove(file_dir)
+
+    def iter_mangas(self) -> Iterator[MangaModel]:
+        try:
+            names = sorted(os.listdir(self._db_dir))
+        except FileNotFoundError:
+            return
+        for name in names:
+            file_dir = self._db_dir + "/" + name
+            if name.endswith(".json") and os.path.isfile(file_dir):
+                yield self._load_file(file_dir)
@@ -0,0 +1,135 @@
+import csv
+import gc
+import json
+import os
+import weakref
+from typing import Iterator, List
+
+import pytest
+
+from catalog_export import (
+    PAGE_COLUMNS, export_jsonl, export_pages_table, iter_page_rows
+)
+from manga_codec import JsonCompactCodec
+from manga_model import MangaModel
+
+
+class _TrackedManga(MangaModel):
+    """Um MangaModel que aceita weakref, para saber se foi liberado."""
+    __slots__ = ("__weakref__",)
+
+
+def _manga(number: int, cls: type = MangaModel) -> MangaModel:
+    return cls(
+        title=f"Mangá {number}",
+        url=f"https://site/manga/{number}",
+        author="Autor",
+        alternative_titles=[],
+        categories=["Ação"],
+        chapters=[
+            {"pages": [f"https://cdn/{number}/{c}/{p}.jpg" for p in range(2)],
+             "number_of_pages": 2, "number_of_chapter": f"Capítulo {c}",
+             "url": f"https://site/ler/{number}/{c}", "images": [None, None]}
+            for c in (1, 2)
+        ],
+    )
+
+
+def _streamed(count: int, alive: List[int]) -> Iterator[MangaModel]:
+    """Gera os mangás um por um, registrando quantos dos anteriores
+    ainda estão na memória quando cada um é criado. Um exportador que
+    lê um mangá de cada vez guarda no máximo o anterior (a variável do
+    laço), enquanto uma lista guardaria todos."""
+    previous: List[weakref.ref] = []
+    for number in range(count):
+        gc.collect()
+        alive.append(sum(ref() is not None for ref in previous))
+        manga = _manga(number, _TrackedManga)
+        previous.append(weakref.ref(manga))
+        yield manga
+        del manga
+
+
+def _lines(file_dir: str) -> List[dict]:
+    with open(file_dir, "rb") as file:
+        return [json.loads(line) for line in file]
+
+
+def test_jsonl_has_one_manga_per_line(tmp_path):
+    file_dir = os.path.join(tmp_path, "catalogo.jsonl")
+    mangas = [_manga(0), _manga(1)]
+    assert export_jsonl(file_dir, mangas) == 2
+    assert _lines(file_dir) == [manga.to_dict() for manga in mangas]
+
+
+def test_jsonl_fields_and_pages(tmp_path):
+    file_dir = os.path.join(tmp_path, "catalogo.jsonl")
+    export_jsonl(file_dir, [_manga(0)], fields=["url", "chapters"],
+                 include_pages=False, codec=JsonCompactCodec())
+    [line] = _lines(file_dir)
+    assert list(line) == ["url", "chapters"]
+    assert line["chapters"][0] == {
+        "number_of_pages": 2,
+        "number_of_chapter": "Capítulo 1",
+        "url": "https://site/ler/0/1",
+        "images": [None, None],
+    }
+
+
+def test_jsonl_unknown_field(tmp_path):
+    with pytest.raises(ValueError):
+        export_jsonl(os.path.join(tmp_path, "x.jsonl"), [], fields=["nome"])
+
+
+def test_jsonl_is_streamed(tmp_path):
+    alive: List[int] = []
+    file_dir = os.path.join(tmp_path, "catalogo.jsonl")
+    assert export_jsonl(file_dir, _streamed(5, alive)) == 5
+    assert max(alive) <= 1
+    assert len(_lines(file_dir)) == 5
+
+
+def test_csv_has_one_row_per_page(tmp_path):
+    file_dir = os.path.join(tmp_path, "paginas.csv")
+    assert export_pages_table(file_dir, [_manga(0)]) == 4
+    with open(file_dir, encoding="utf-8", newline="") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == list(PAGE_COLUMNS)
+    assert rows[1] == [
+        "https://site/manga/0", "Mangá 0", "https://site/ler/0/1",
+        "Capítulo 1", "2", "0", "https://cdn/0/1/0.jpg",
+    ]
+
+
+def test_csv_one_row_per_chapter_without_pages(tmp_path):
+    file_dir = os.path.join(tmp_path, "capitulos.csv")
+    assert export_pages_table(
+        file_dir, [_manga(0), _manga(1)], include_pages=False
+    ) == 4
+    with open(file_dir, encoding="utf-8", newline="") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == list(PAGE_COLUMNS[:5])
+    assert [row[2] for row in rows[1:]] == [
+        "https://site/ler/0/1", "https://site/ler/0/2",
+        "https://site/ler/1/1", "https://site/ler/1/2",
+    ]
+
+
+def test_csv_is_streamed(tmp_path):
+    alive: List[int] = []
+    file_dir = os.path.join(tmp_path, "paginas.csv")
+    assert export_pages_table(file_dir, _streamed(5, alive)) == 20
+    assert max(alive) <= 1
+
+
+def test_page_rows_are_lazy():
+    alive: List[int] = []
+    rows = iter_page_rows(_streamed(3, alive))
+    next(rows)
+    assert alive == [0]
+
+
+def test_unknown_table_format(tmp_path):
+    with pytest.raises(ValueError):
+        export_pages_table(os.path.join(tmp_path, "x.xlsx"), [],
+                           file_format="xlsx")
@@ -0,0 +1,88 @@
+from typing import Dict, Optional
+
+import pytest
+
+from benchmarks.standin_server import StandinServer, StandinSite
+from chapter_list_loader import ChapterListLoader, extract_chapters_from_payload
+
+PAGE_URL: str = "https://site/series/chapters_list.json?page=1&id_serie=1"
+
+
+@pytest.mark.parametrize("payload", [{"chapters": False}, {"chapters": []}])
+def test_end_of_list(payload):
+    assert extract_chapters_from_payload(payload, PAGE_URL) == []
+
+
+@pytest.mark.parametrize("payload", [
+    {},
+    {"error": "muitas requisições"},
+    {"chapters": None},
+    {"chapters": "nenhum"},
+    {"chapters": [1, 2]},
+    {"chapters": [{"number": "1", "releases": "scan"}]},
+    ["não é um dicionário"],
+])
+def test_unexpected_payload_is_not_the_end(payload):
+    assert extract_chapters_from_payload(payload, PAGE_URL) is None
+
+
+def test_releases_as_a_list():
+    payload = {"chapters": [
+        {"number": "2", "releases": [None, {"link": "/ler/a/b/2"}]},
+        {"number": "1", "releases": []},
+    ]}
+    chapters = extract_chapters_from_payload(payload, PAGE_URL)
+    assert [chapter["url"] for chapter in chapters] == [
+        "https://site/ler/a/b/2"
+    ]
+
+
+def test_extracts_chapters():
+    payload = {"chapters": [
+        {"number": "2", "releases": {"7": {"link": "/ler/a/b/2"}}},
+        # sem nenhum release com link.
+        {"number": "1", "releases": {}},
+    ]}
+    chapters = extract_chapters_from_payload(payload, PAGE_URL)
+    assert chapters == [{
+        "pages": [],
+        "number_of_pages": 0,
+        "number_of_chapter": "Capítulo 2",
+        "url": "https://site/ler/a/b/2",
+    }]
+
+
+class _FailingSite(StandinSite):
+    """Responde com um erro a partir de uma página da lista de
+    capítulos."""
+
+    def __init__(self, failing_page: int, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.failing_page: int = failing_page
+
+    def chapters_list(self, manga_id: int, page: int) -> Optional[Dict]:
+        if page >= self.failing_page:
+            return {"error": "muitas requisições"}
+        return super().chapters_list(manga_id, page)
+
+
+def test_load_until_the_end_of_the_list():
+    with StandinServer(StandinSite(mangas=1, chapters=65)) as server:
+        result = ChapterListLoader(max_workers=2).load(server.manga_urls()[0])
+    assert result.complete
+    assert len(result.chapters) == 65
+    assert len({chapter["url"] for chapter in result.chapters}) == 65
+
+
+def test_load_stops_incomplete_on_error_payload():
+    site = _FailingSite(failing_page=2, mangas=1, chapters=65)
+    with StandinServer(site) as server:
+        result = ChapterListLoader(max_workers=2).load(server.manga_urls()[0])
+    assert not result.complete
+    # só a primeira página foi obtida.
+    assert len(result.chapters) == 30
+
+
+def test_load_invalid_manga_url():
+    result = ChapterListLoader().load("https://site/sem-id")
+    assert result == ([], False)
@@ -0,0 +1,128 @@
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Tuple
+
+import pytest
+from requests import Response
+
+import http_client
+from http_client import FetchError, HttpClient
+from rate_limiter import HostRateLimiter
+
+# uma resposta do servidor de teste: status, cabeçalhos e corpo.
+ScriptedResponse = Tuple[int, Dict[str, str], bytes]
+
+
+class _ScriptedHandler(BaseHTTPRequestHandler):
+    """Responde cada requisição com a próxima resposta de script."""
+    script: List[ScriptedResponse]
+    requests: List[str]
+
+    def log_message(self, *_) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.requests.append(self.path)
+        status, headers, body = (
+            self.script.pop(0) if self.script else (200, {}, b"ok")
+        )
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server() -> Iterator[type]:
+    handler = type("Handler", (_ScriptedHandler,), {
+        "script": [],
+        "requests": [],
+    })
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    host, port = httpd.server_address[:2]
+    handler.url = f"http://{host}:{port}/page"
+    yield handler
+    httpd.shutdown()
+    httpd.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> List[float]:
+    """As esperas entre as tentativas, sem esperar de verdade."""
+    delays: List[float] = []
+    monkeypatch.setattr(http_client.time, "sleep", delays.append)
+    return delays
+
+
+def test_retries_temporary_failures(server, sleeps):
+    server.script = [(503, {}, b""), (502, {}, b""), (200, {}, b"done")]
+    with HttpClient(max_retries=4, backoff_base=0.01) as client:
+        response = client.get(server.url)
+    assert response.text == "done"
+    assert len(server.requests) == 3
+    assert len(sleeps) == 2
+    assert all(0 <= delay <= 0.04 for delay in sleeps)
+
+
+def test_waits_retry_after_seconds(server, sleeps):
+    server.script = [(429, {"Retry-After": "7"}, b""), (200, {}, b"done")]
+    with HttpClient() as client:
+        assert client.get(server.url).status_code == 200
+    assert sleeps == [7.0]
+
+
+def test_retry_after_http_date():
+    response = Response()
+    response.headers["Retry-After"] = formatdate(
+        time.time() + 30, usegmt=True
+    )
+    assert 25 <= HttpClient._retry_after(response) <= 30
+    response.headers["Retry-After"] = "não é uma data"
+    assert HttpClient._retry_after(response) is None
+
+
+def test_gives_up_after_max_retries(server, sleeps):
+    server.script = [(503, {}, b"")] * 3
+    with HttpClient(max_retries=2, backoff_base=0.01) as client:
+        with pytest.raises(FetchError) as error:
+            client.get(server.url)
+    assert error.value.status_code == 503
+    assert len(server.requests) == 3
+    assert len(sleeps) == 2
+
+
+def test_does_not_retry_client_errors(server, sleeps):
+    server.script = [(404, {}, b"")]
+    with HttpClient() as client:
+        with pytest.raises(FetchError) as error:
+            client.get(server.url)
+    assert error.value.status_code == 404
+    assert len(server.requests) == 1
+    assert sleeps == []
+
+
+class _RecordingLimiter(HostRateLimiter):
+    """Registra as urls que esperaram a vez, sem esperar."""
+
+    def __init__(self) -> None:
+        super().__init__(0)
+        self.urls: List[str] = []
+
+    def wait(self, url: str) -> None:
+        self.urls.append(url)
+
+
+def test_retries_wait_for_the_rate_limiter(server, sleeps):
+    server.script = [(503, {}, b""), (429, {}, b""), (200, {}, b"done")]
+    limiter = _RecordingLimiter()
+    with HttpClient(max_retries=4, backoff_base=0.01) as client:
+        assert client.get(server.url, rate_limiter=limiter).text == "done"
+    assert limiter.urls == [server.url] * 3
@@ -0,0 +1,174 @@
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional
+
+import pytest
+
+from http_client import HttpClient
+from image_downloader import _CHUNK_SIZE, ImageDownloader
+from manga_model import MangaModel
+
+# maior que um pedaço, para que um download cortado deixe um .part.
+IMAGE: bytes = bytes(range(256)) * 1024
+CREDITS: bytes = b"creditos" * 100
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    """Serve as imagens de images, respeitando o cabeçalho Range."""
+    images: Dict[str, bytes]
+    # os cabeçalhos Range recebidos, ou None sem Range.
+    ranges: List[Optional[str]]
+    # se True, a próxima resposta é cortada no meio.
+    cut_next: bool
+    # se True, a próxima resposta 206 informa o trecho errado.
+    wrong_range_next: bool
+
+    def log_message(self, *_) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        body = self.images.get(self.path)
+        requested = self.headers.get("Range")
+        self.ranges.append(requested)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        start = int(requested[6:-1]) if requested else 0
+        if start >= len(body):
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{len(body)}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if start:
+            self.send_response(206)
+            shown = 0 if type(self).wrong_range_next else start
+            type(self).wrong_range_next = False
+            self.send_header(
+                "Content-Range",
+                f"bytes {shown}-{len(body) - 1}/{len(body)}",
+            )
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+        if type(self).cut_next:
+            type(self).cut_next = False
+            self.wfile.write(body[start:start + _CHUNK_SIZE + 1000])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body[start:])
+
+
+@pytest.fixture
+def server() -> Iterator[type]:
+    handler = type("Handler", (_ImageHandler,), {
+        "images": {"/a.png": IMAGE, "/c1.png": CREDITS, "/c2.png": CREDITS},
+        "ranges": [],
+        "cut_next": False,
+        "wrong_range_next": False,
+    })
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    host, port = httpd.server_address[:2]
+    handler.base_url = f"http://{host}:{port}"
+    yield handler
+    httpd.shutdown()
+    httpd.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def downloader(tmp_path) -> Iterator[ImageDownloader]:
+    client = HttpClient(max_retries=0)
+    with ImageDownloader(str(tmp_path), workers=2, client=client) as images:
+        yield images
+
+
+def _read(downloader: ImageDownloader, image: Dict) -> bytes:
+    with open(downloader.path_of(image), "rb") as file:
+        return file.read()
+
+
+def _write_part(downloader: ImageDownloader, url: str, data: bytes) -> None:
+    with open(downloader._part_path(url), "wb") as file:
+        file.write(data)
+
+
+def test_downloads_the_image(server, downloader):
+    image = downloader.download(server.base_url + "/a.png")
+    assert image["sha256"] == hashlib.sha256(IMAGE).hexdigest()
+    assert image["size"] == len(IMAGE)
+    assert image["file"].endswith(".png")
+    assert _read(downloader, image) == IMAGE
+    assert os.listdir(downloader._parts_dir) == []
+
+
+def test_interrupted_download_is_resumed(server, downloader):
+    server.cut_next = True
+    image = downloader.download(server.base_url + "/a.png")
+    assert _read(downloader, image) == IMAGE
+    assert server.ranges == [None, f"bytes={_CHUNK_SIZE}-"]
+    assert downloader.stats["resumed"] == 1
+
+
+def test_part_from_a_previous_run_is_resumed(server, downloader):
+    url = server.base_url + "/a.png"
+    _write_part(downloader, url, IMAGE[:4000])
+    image = downloader.download(url)
+    assert _read(downloader, image) == IMAGE
+    assert server.ranges == ["bytes=4000-"]
+
+
+def test_complete_part_answered_with_416_is_downloaded_again(
+        server, downloader):
+    url = server.base_url + "/a.png"
+    _write_part(downloader, url, IMAGE)
+    image = downloader.download(url)
+    assert _read(downloader, image) == IMAGE
+    assert server.ranges == [f"bytes={len(IMAGE)}-", None]
+
+
+def test_wrong_content_range_restarts_the_download(server, downloader):
+    url = server.base_url + "/a.png"
+    _write_part(downloader, url, IMAGE[:4000])
+    server.wrong_range_next = True
+    image = downloader.download(url)
+    assert _read(downloader, image) == IMAGE
+    assert server.ranges == ["bytes=4000-", None]
+    assert downloader.stats["resumed"] == 0
+
+
+def test_equal_images_are_stored_once(server, downloader):
+    first = downloader.download(server.base_url + "/c1.png")
+    second = downloader.download(server.base_url + "/c2.png")
+    assert first["file"] == second["file"]
+    assert first["url"] != second["url"]
+    assert downloader.stats["duplicates"] == 1
+
+
+def test_download_manga_registers_and_reuses_the_images(server, downloader):
+    pages = [server.base_url + path
+             for path in ("/a.png", "/c1.png", "/missing.png")]
+    manga = MangaModel(title="Mangá", chapters=[{
+        "pages": pages, "number_of_pages": 3,
+        "number_of_chapter": "Capítulo 1", "url": "c1",
+    }])
+    failed = downloader.download_manga(manga)
+    images = manga.chapters[0]["images"]
+    assert [image and image["url"] for image in images] == pages[:2] + [None]
+    assert list(failed) == [pages[2]]
+
+    requests = len(server.ranges)
+    downloader.download_manga(manga)
+    # só a imagem que falhou é pedida de novo.
+    assert len(server.ranges) == requests + 1
+    assert downloader.stats["reused"] == 2
@@ -0,0 +1,83 @@
+from typing import Any, Dict, List
+
+import pytest
+
+from incremental_update import is_chapter_complete, merge_stored_chapters
+from manga_model import MangaModel
+
+
+def _chapter(number: int,
+             pages: int = 0,
+             number_of_pages: int = None) -> Dict[str, Any]:
+    """Um capítulo com pages páginas. Por padrão, o número de páginas
+    bate com a lista."""
+    return {
+        "pages": [f"p{number}-{page}" for page in range(pages)],
+        "number_of_pages": pages if number_of_pages is None
+        else number_of_pages,
+        "number_of_chapter": f"Capítulo {number}",
+        "url": f"https://site/ler/manga/{number}",
+    }
+
+
+def _manga(chapters: List[Dict[str, Any]]) -> MangaModel:
+    return MangaModel(title="Mangá", url="https://site/manga/manga/1",
+                      chapters=chapters)
+
+
+def _urls(chapters) -> List[str]:
+    return [chapter["url"].rsplit("/", 1)[1] for chapter in chapters]
+
+
+@pytest.mark.parametrize("chapter, complete", [
+    (_chapter(1, pages=3), True),
+    (_chapter(1, pages=0), False),
+    (_chapter(1, pages=2, number_of_pages=3), False),
+    (_chapter(1, pages=3, number_of_pages=2), False),
+    ({"url": "sem páginas"}, False),
+])
+def test_is_chapter_complete(chapter, complete):
+    assert is_chapter_complete(chapter) is complete
+
+
+def test_without_stored_manga_everything_is_pending():
+    manga = _manga([_chapter(2), _chapter(1)])
+    assert _urls(merge_stored_chapters(manga, None)) == ["2", "1"]
+    assert _urls(merge_stored_chapters(manga, _manga([]))) == ["2", "1"]
+
+
+def test_only_new_and_incomplete_chapters_are_pending():
+    stored = _manga([
+        _chapter(3, pages=0),
+        _chapter(2, pages=2, number_of_pages=5),
+        _chapter(1, pages=4),
+    ])
+    manga = _manga([_chapter(4), _chapter(3), _chapter(2), _chapter(1)])
+
+    pending = merge_stored_chapters(manga, stored)
+
+    assert _urls(pending) == ["4", "3", "2"]
+    # o capítulo completo vem do salvo, sem ser obtido de novo.
+    unchanged = manga.chapters[3]
+    assert list(unchanged["pages"]) == [f"p1-{page}" for page in range(4)]
+    assert unchanged["number_of_pages"] == 4
+
+
+def test_downloaded_images_are_kept():
+    stored_chapter = _chapter(1, pages=1)
+    stored_chapter["images"] = [{"sha256": "ab", "file": "objects/ab/ab"}]
+    manga = _manga([_chapter(1)])
+    assert merge_stored_chapters(manga, _manga([stored_chapter])) == []
+    assert manga.chapters[0]["images"] == stored_chapter["images"]
+
+
+def test_stored_only_chapters_are_kept_at_the_end_in_order():
+    stored = _manga([_chapter(5, pages=1), _chapter(4, pages=1),
+                     _chapter(2, pages=1), _chapter(1, pages=0)])
+    manga = _manga([_chapter(6), _chapter(2)])
+
+    pending = merge_stored_chapters(manga, stored)
+
+    assert _urls(pending) == ["6"]
+    # a ordem da lista nova e, depois, a dos que só estavam salvos.
+    assert _urls(manga.chapters) == ["6", "2", "5", "4", "1"]
@@ -0,0 +1,173 @@
+import os
+import time
+from typing import Iterator, List
+
+import pytest
+
+from job_journal import (
+    DONE,
+    FAILED,
+    PENDING,
+    RUNNING,
+    JobJournal,
+    MangaCheckpoint,
+)
+from manga_model import MangaModel
+
+
+@pytest.fixture
+def journal(tmp_path) -> Iterator[JobJournal]:
+    with JobJournal(
+        os.path.join(tmp_path, "jobs.sqlite3"),
+        lease_seconds=60,
+        max_attempts=2,
+    ) as journal:
+        yield journal
+
+
+def test_lease_in_order_without_repeating(journal):
+    journal.add("manga", ["a", "b", "c"])
+    assert journal.lease("manga", "w1", limit=2) == ["a", "b"]
+    assert journal.lease("manga", "w2", limit=2) == ["c"]
+    assert journal.lease("manga", "w3") == []
+    assert journal.counts("manga") == {RUNNING: 3}
+
+
+def test_add_does_not_change_existing_jobs(journal):
+    journal.add("manga", ["a"])
+    journal.complete("manga", ["a"])
+    journal.add("manga", ["a", "b"])
+    assert journal.state("manga", "a") == DONE
+    assert journal.state("manga", "b") == PENDING
+
+
+def test_expired_lease_goes_to_another_owner(tmp_path):
+    with JobJournal(os.path.join(tmp_path, "jobs.sqlite3"),
+                    lease_seconds=0.05) as journal:
+        journal.add("manga", ["a"])
+        assert journal.lease("manga", "w1") == ["a"]
+        assert journal.lease("manga", "w2") == []
+        time.sleep(0.1)
+        assert journal.lease("manga", "w2") == ["a"]
+        # o dono antigo perdeu o job.
+        assert journal.renew("manga", ["a"], "w1") == 0
+        journal.complete("manga", ["a"], "w1")
+        journal.fail("manga", "a", "erro", "w1")
+        assert journal.state("manga", "a") == RUNNING
+        journal.complete("manga", ["a"], "w2")
+        assert journal.state("manga", "a") == DONE
+
+
+def test_renew_keeps_the_job(tmp_path):
+    with JobJournal(os.path.join(tmp_path, "jobs.sqlite3"),
+                    lease_seconds=0.2) as journal:
+        journal.add("manga", ["a"])
+        journal.lease("manga", "w1")
+        for _ in range(3):
+            time.sleep(0.1)
+            assert journal.renew("manga", ["a"], "w1") == 1
+        assert journal.lease("manga", "w2") == []
+
+
+def test_claim_only_once(journal):
+    journal.add("manga", ["a"])
+    assert journal.claim("manga", "a", "w1")
+    assert not journal.claim("manga", "a", "w2")
+    assert not journal.claim("manga", "inexistente", "w1")
+
+
+def test_fail_retries_until_max_attempts(journal):
+    journal.add("manga", ["a"])
+    journal.lease("manga")
+    journal.fail("manga", "a", "erro")
+    assert journal.state("manga", "a") == PENDING
+    journal.lease("manga")
+    journal.fail("manga", "a", "erro")
+    assert journal.state("manga", "a") == FAILED
+    assert journal.lease("manga") == []
+
+
+def test_requeue_running(journal):
+    journal.add("manga", ["a", "b"])
+    journal.lease("manga", limit=2)
+    journal.complete("manga", ["a"])
+    assert journal.requeue_running("manga") == 1
+    assert journal.state("manga", "b") == PENDING
+
+
+def test_new_run_after_a_finished_run(journal):
+    assert not journal.begin_run("manga")
+    journal.add("manga", ["a", "b"])
+    journal.lease("manga", limit=2)
+    journal.complete("manga", ["a"])
+    journal.fail("manga", "b", "erro")
+    journal.lease("manga")
+    journal.fail("manga", "b", "erro")
+    journal.finish_run("manga")
+
+    assert not journal.begin_run("manga")
+    assert journal.counts("manga") == {PENDING: 2}
+    assert journal.lease("manga", limit=2) == ["a", "b"]
+
+
+def test_interrupted_run_is_resumed(journal):
+    journal.begin_run("manga")
+    journal.add("manga", ["a", "b"])
+    journal.lease("manga", limit=2)
+    journal.complete("manga", ["a"])
+    # o processo morreu aqui.
+    journal.requeue_running()
+
+    assert journal.begin_run("manga")
+    assert journal.state("manga", "a") == DONE
+    assert journal.lease("manga", limit=2) == ["b"]
+
+
+def _manga(chapters: int) -> MangaModel:
+    return MangaModel(
+        title="Mangá",
+        url="https://site/manga/manga/1",
+        chapters=[
+            {"pages": [], "number_of_pages": 0,
+             "number_of_chapter": f"Capítulo {i}", "url": f"c{i}"}
+            for i in range(chapters)
+        ],
+    )
+
+
+def test_checkpoint_completes_chapters_only_after_saving(journal):
+    manga = _manga(3)
+    saved: List[int] = []
+    renewed: List[bool] = []
+    checkpoint = MangaCheckpoint(
+        journal, manga, lambda _: saved.append(1), every=2,
+        renew=lambda: renewed.append(True),
+    )
+    checkpoint.start(manga.chapters)
+    checkpoint.chapter_done(manga.chapters[0])
+    assert saved == []
+    assert journal.state(MangaCheckpoint.KIND, "c0") == RUNNING
+    checkpoint.chapter_done(manga.chapters[1])
+    assert saved == [1]
+    assert journal.state(MangaCheckpoint.KIND, "c1") == DONE
+
+    checkpoint.chapter_failed(manga.chapters[2], "erro")
+    assert checkpoint.failed_chapters == ["c2"]
+    checkpoint.flush()
+    assert len(saved) == 2
+    assert len(renewed) == 3
+
+
+def test_checkpoint_starts_all_chapters_in_one_transaction(journal):
+    manga = _manga(50)
+    transactions: List[int] = []
+    original = journal._transaction
+
+    def counting_transaction(function):
+        transactions.append(1)
+        return original(function)
+
+    journal._transaction = counting_transaction
+    MangaCheckpoint(journal, manga, lambda _: None).start(manga.chapters)
+    assert len(transactions) == 1
+    assert journal.counts(MangaCheckpoint.KIND) == {RUNNING: 50}
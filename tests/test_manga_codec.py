@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from manga_codec import (
+    DEFAULT_CODEC, JsonCompactCodec, JsonPrettyCodec, OrjsonCodec,
+    available_codecs, get_codec, orjson
+)
+from manga_model import MangaModel
+from test_manga_model import _baseline_json, _baseline_manga
+
+_CODECS = [
+    "pretty",
+    "compact",
+    pytest.param("orjson", marks=pytest.mark.skipif(
+        orjson is None, reason="orjson não está instalado")),
+]
+
+
+def _key_order(value):
+    """As chaves de todos os dicionários, na ordem em que aparecem."""
+    if isinstance(value, dict):
+        return [(key, _key_order(item)) for key, item in value.items()]
+    if isinstance(value, list):
+        return [_key_order(item) for item in value]
+    return None
+
+
+@pytest.mark.parametrize("name", _CODECS)
+def test_round_trip_keeps_the_baseline_data_and_key_order(name):
+    codec = get_codec(name)
+    data = _baseline_manga()
+    encoded = MangaModel.from_json(data).to_bytes(codec)
+    assert isinstance(encoded, bytes)
+
+    decoded = json.loads(encoded)
+    assert decoded == data
+    assert _key_order(decoded) == _key_order(data)
+
+    manga = MangaModel.from_bytes(encoded, codec)
+    assert manga.to_json() == _baseline_json(data)
+
+
+def test_pretty_codec_writes_the_baseline_bytes():
+    data = _baseline_manga()
+    encoded = MangaModel.from_json(data).to_bytes(JsonPrettyCodec())
+    assert encoded == _baseline_json(data).encode("utf-8")
+    # o codec padrão continua sendo o formato original.
+    assert MangaModel.from_json(data).to_bytes() == encoded
+    assert DEFAULT_CODEC == JsonPrettyCodec.name
+
+
+def test_compact_codec_writes_json_without_spaces():
+    data = _baseline_manga()
+    encoded = MangaModel.from_json(data).to_bytes(JsonCompactCodec())
+    assert encoded == json.dumps(
+        data, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+@pytest.mark.skipif(orjson is None, reason="orjson não está instalado")
+def test_orjson_codec_matches_the_compact_codec():
+    manga = MangaModel.from_json(_baseline_manga())
+    assert manga.to_bytes(OrjsonCodec()) == manga.to_bytes(JsonCompactCodec())
+
+
+@pytest.mark.parametrize("writer", _CODECS)
+@pytest.mark.parametrize("reader", _CODECS)
+def test_any_codec_reads_any_other(writer, reader):
+    data = _baseline_manga()
+    encoded = MangaModel.from_json(data).to_bytes(get_codec(writer))
+    assert MangaModel.from_bytes(encoded, get_codec(reader)).to_dict() == data
+
+
+def test_unknown_codec():
+    assert "pretty" in available_codecs()
+    with pytest.raises(ValueError):
+        get_codec("yaml")
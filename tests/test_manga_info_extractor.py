@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from manga_info_extractor import (
+    extract_author,
+    extract_categories,
+    extract_list_chapters,
+    extract_manga_info,
+    extract_title,
+    find_missing_elements,
+    make_soup,
+)
+
+PAGE_URL: str = "https://mangalivre.net/manga/one-piece/13"
+
+FIXTURE: str = os.path.join(
+    os.path.dirname(__file__), "fixtures", "manga_page.html"
+)
+
+
+@pytest.fixture(scope="module")
+def html() -> str:
+    with open(FIXTURE, "r", encoding="utf-8") as file:
+        return file.read()
+
+
+@pytest.fixture
+def series_data(html):
+    return make_soup(html).find("div", {"id": "series-data"})
+
+
+def test_extract_title(series_data):
+    assert extract_title(series_data) == "One Piece"
+
+
+def test_extract_author_ignores_tags_and_extra_spaces(series_data):
+    assert extract_author(series_data) == "Eiichiro Oda"
+
+
+def test_extract_categories(series_data):
+    assert extract_categories(series_data) == ["Ação", "Aventura", "Comédia"]
+
+
+def test_extract_list_chapters(html):
+    chapters = extract_list_chapters(make_soup(html), PAGE_URL)
+    assert chapters == [
+        {
+            "pages": [],
+            "number_of_pages": 0,
+            "number_of_chapter": "Capítulo 2",
+            "url": "https://mangalivre.net/ler/one-piece/online/2/capitulo-2",
+        },
+        {
+            "pages": [],
+            "number_of_pages": 0,
+            "number_of_chapter": "Capítulo 1",
+            "url": "https://mangalivre.net/ler/one-piece/online/1/capitulo-1",
+        },
+    ]
+
+
+def test_extract_manga_info(html):
+    manga = extract_manga_info(html, PAGE_URL)
+    assert manga.title == "One Piece"
+    assert manga.url == PAGE_URL
+    assert manga.author == "Eiichiro Oda"
+    assert manga.status == "completo"
+    assert manga.cover == "https://static.mangalivre.net/capas/one-piece.jpg"
+    assert manga.alternative_titles == ["ワンピース", "Wan Pīsu"]
+    assert manga.description == "Monkey D. Luffy quer ser o Rei dos Piratas."
+    assert len(manga.chapters) == 2
+
+
+def test_missing_fields_have_defaults():
+    html = (
+        '<div id="series-data"><span class="series-title">'
+        "<h1>Sem Dados</h1></span></div>"
+    )
+    manga = extract_manga_info(html, PAGE_URL)
+    assert manga.title == "Sem Dados"
+    assert manga.author == ""
+    assert manga.categories == []
+    assert manga.status == "em lançamento"
+    assert manga.chapters == []
+
+
+def test_find_missing_elements(html):
+    assert find_missing_elements(make_soup(html)) == []
+    assert find_missing_elements(make_soup("<html></html>")) == [
+        "div#series-data",
+        "div#series-data span.series-title h1",
+    ]
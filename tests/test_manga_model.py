@@ -0,0 +1,79 @@
+import json
+from typing import Any, Dict
+
+from manga_model import Chapter, MangaModel, PageList
+
+
+def _baseline_manga() -> Dict[str, Any]:
+    """Um mangá no formato dos arquivos gravados antes do modelo compacto."""
+    return {
+        "title": "One Piece",
+        "url": "https://mangalivre.net/manga/one-piece/13",
+        "author": "Eiichiro Oda",
+        "alternative_titles": ["ワンピース", "Wan Pīsu"],
+        "cover": "https://static.mangalivre.net/capas/one-piece.jpg",
+        "status": "Em andamento",
+        "categories": ["Ação", "Aventura", "Comédia"],
+        "description": "Gol D. Roger, o Rei dos Piratas...",
+        "chapters": [
+            {
+                "pages": [
+                    "https://img.mangalivre.net/13/1/01.jpg",
+                    "https://img.mangalivre.net/13/1/02.jpg",
+                ],
+                "number_of_pages": 2,
+                "number_of_chapter": "Capítulo 1",
+                "url": "https://mangalivre.net/ler/one-piece/online/1",
+            },
+            {
+                "pages": [],
+                "number_of_pages": 0,
+                "number_of_chapter": "Capítulo 2",
+                "url": "https://mangalivre.net/ler/one-piece/online/2",
+            },
+        ],
+    }
+
+
+def _baseline_json(data: Dict[str, Any]) -> str:
+    # o mesmo json.dumps do MangaModel.to_json original.
+    return json.dumps(data, indent=4, ensure_ascii=False)
+
+
+def test_to_json_keeps_the_baseline_layout():
+    data = _baseline_manga()
+    manga = MangaModel.from_json(json.loads(_baseline_json(data)))
+    assert manga.to_json() == _baseline_json(data)
+
+
+def test_chapters_are_stored_as_chapter_objects():
+    manga = MangaModel.from_json(_baseline_manga())
+    chapter = manga.chapters[0]
+    assert isinstance(chapter, Chapter)
+    assert isinstance(chapter["pages"], PageList)
+    assert chapter["pages"] == _baseline_manga()["chapters"][0]["pages"]
+    assert chapter == _baseline_manga()["chapters"][0]
+    assert list(chapter.keys()) == list(Chapter.KEYS)
+
+
+def test_unknown_chapter_keys_are_kept_after_the_known_ones():
+    data = _baseline_manga()
+    data["chapters"][1]["scanlator"] = "Grupo X"
+    manga = MangaModel.from_json(data)
+    assert manga.chapters[1]["scanlator"] == "Grupo X"
+    assert manga.to_json() == _baseline_json(data)
+
+
+def test_assigned_dicts_become_chapters():
+    manga = MangaModel(title="x", chapters=None)
+    assert manga.to_dict()["chapters"] is None
+    manga.chapters = _baseline_manga()["chapters"]
+    assert all(isinstance(c, Chapter) for c in manga.chapters)
+    manga.chapters[1]["pages"] = ["https://img.mangalivre.net/13/2/01.jpg"]
+    manga.chapters[1]["number_of_pages"] = 1
+    assert manga.to_dict()["chapters"][1] == {
+        "pages": ["https://img.mangalivre.net/13/2/01.jpg"],
+        "number_of_pages": 1,
+        "number_of_chapter": "Capítulo 2",
+        "url": "https://mangalivre.net/ler/one-piece/online/2",
+    }
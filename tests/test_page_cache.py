@@ -0,0 +1,134 @@
+import os
+import time
+
+import pytest
+
+from http_client import FetchError, HttpClient
+from page_cache import PageCache
+from test_http_client import server  # noqa: F401
+
+
+@pytest.fixture
+def cache(tmp_path):
+    page_cache = PageCache(str(tmp_path / "cache"))
+    yield page_cache
+    page_cache.close()
+
+
+def _objects(directory) -> int:
+    return sum(len(files) for _, _, files in os.walk(directory / "objects"))
+
+
+def test_put_and_get(cache):
+    assert cache.get("http://a") is None
+    cache.put("http://a", b"page", final_url="http://b",
+              content_type="text/html", etag='"1"')
+    page = cache.get("http://a")
+    assert page.body == b"page"
+    assert page.final_url == "http://b"
+    assert page.etag == '"1"'
+    assert cache.stats == {"entries": 1, "bytes": 4}
+
+
+def test_equal_pages_are_stored_once(cache, tmp_path):
+    cache.put("http://a", b"same")
+    cache.put("http://b", b"same")
+    assert cache.stats == {"entries": 2, "bytes": 4}
+    assert _objects(tmp_path / "cache") == 1
+
+    # o objeto só é apagado quando nenhuma url o usa mais.
+    cache.put("http://a", b"other")
+    assert cache.stats == {"entries": 2, "bytes": 9}
+    cache.put("http://b", b"other")
+    assert cache.stats == {"entries": 2, "bytes": 5}
+    assert _objects(tmp_path / "cache") == 1
+
+
+def test_pages_expire_after_ttl(cache):
+    cache.ttl = 60
+    cache.put("http://a", b"page")
+    assert cache.is_fresh(cache.get("http://a"))
+
+    page = cache.get("http://a")._replace(fetched_at=time.time() - 61)
+    assert not cache.is_fresh(page)
+    cache.replay = True
+    assert cache.is_fresh(page)
+
+
+def test_touch_revalidates_the_page(cache):
+    cache.ttl = 0
+    cache.put("http://a", b"page", etag='"1"', last_modified="old")
+    before = cache.get("http://a")
+    assert not cache.is_fresh(before)
+
+    cache.ttl = 60
+    cache.touch("http://a", etag='"2"')
+    after = cache.get("http://a")
+    assert after.fetched_at >= before.fetched_at
+    assert after.etag == '"2"'
+    assert after.last_modified == "old"
+    assert after.body == b"page"
+
+
+def test_http_client_revalidates_with_304(cache, server):  # noqa: F811
+    cache.ttl = 0
+    server.script = [
+        (200, {"ETag": '"v1"'}, b"body"),
+        (304, {"ETag": '"v2"'}, b""),
+    ]
+    with HttpClient(cache=cache) as client:
+        assert client.get(server.url).text == "body"
+        assert client.get(server.url).text == "body"
+    assert len(server.requests) == 2
+    assert cache.get(server.url).etag == '"v2"'
+
+
+def test_replay_never_touches_the_site(cache, server):  # noqa: F811
+    cache.ttl = 0
+    cache.put(server.url, b"saved")
+    cache.replay = True
+    with HttpClient(cache=cache) as client:
+        assert client.get(server.url).text == "saved"
+        with pytest.raises(FetchError):
+            client.get(server.url + "/missing")
+    assert server.requests == []
+
+
+def test_evicts_the_least_recently_used_pages(tmp_path):
+    cache = PageCache(str(tmp_path / "cache"), max_bytes=10)
+    cache.put("http://a", b"aaaa")
+    time.sleep(0.01)
+    cache.put("http://b", b"bbbb")
+    time.sleep(0.01)
+    # ler a deixa como a usada mais recentemente.
+    assert cache.get("http://a") is not None
+    time.sleep(0.01)
+    cache.put("http://c", b"cccc")
+
+    assert cache.get("http://b") is None
+    assert cache.get("http://a").body == b"aaaa"
+    assert cache.get("http://c").body == b"cccc"
+    assert cache.stats == {"entries": 2, "bytes": 8}
+    assert _objects(tmp_path / "cache") == 2
+    cache.close()
+
+
+def test_total_bytes_survive_reopening(tmp_path):
+    cache = PageCache(str(tmp_path / "cache"))
+    cache.put("http://a", b"aaaa")
+    cache.put("http://b", b"aaaa")
+    cache.put("http://c", b"cc")
+    cache.close()
+
+    reopened = PageCache(str(tmp_path / "cache"))
+    assert reopened.stats == {"entries": 3, "bytes": 6}
+    reopened.close()
+
+
+def test_missing_object_is_dropped(cache, tmp_path):
+    cache.put("http://a", b"page")
+    for root, _, files in os.walk(tmp_path / "cache" / "objects"):
+        for name in files:
+            os.remove(os.path.join(root, name))
+    assert cache.get("http://a") is None
+    assert cache.stats == {"entries": 0, "bytes": 0}
@@ -0,0 +1,113 @@
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+import pytest
+
+from pipeline import Pipeline, Stage
+
+# tempo máximo de uma execução antes de considerar que ela travou.
+TIMEOUT: float = 10
+
+
+def _run(pipeline: Pipeline, items: Iterable[Any]) -> Dict[str, Any]:
+    """Executa o pipeline em outra thread, falhando se ele travar."""
+    result: Dict[str, Any] = {}
+
+    def target() -> None:
+        try:
+            result["stats"] = pipeline.run(items)
+        except BaseException as error:  # noqa: BLE001
+            result["error"] = error
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(TIMEOUT)
+    assert not thread.is_alive(), "o pipeline não terminou"
+    if "error" in result:
+        raise result["error"]
+    return result["stats"]
+
+
+def test_items_pass_through_all_stages():
+    output: List[int] = []
+    lock = threading.Lock()
+
+    def collect(item: int) -> None:
+        with lock:
+            output.append(item)
+
+    pipeline = Pipeline([
+        Stage("split", lambda n: [n, n + 100], fan_out=True),
+        Stage("double", lambda n: n * 2, workers=3, queue_size=1),
+        Stage("collect", collect),
+    ])
+    stats = _run(pipeline, range(5))
+    assert sorted(output) == sorted(
+        2 * n for i in range(5) for n in (i, i + 100)
+    )
+    assert stats["split"]["emitted"] == 10
+    assert stats["double"]["done"] == 10
+    assert stats["collect"]["done"] == 10
+
+
+def test_failed_item_is_reported_and_others_continue():
+    errors: List[Tuple[str, Any, Exception]] = []
+
+    def check(n: int) -> int:
+        if n == 2:
+            raise ValueError("item inválido")
+        return n
+
+    pipeline = Pipeline(
+        [Stage("check", check, workers=2), Stage("last", lambda n: None)],
+        on_error=lambda *error: errors.append(error),
+    )
+    stats = _run(pipeline, range(5))
+    assert stats["check"]["done"] == 4
+    assert stats["check"]["failed"] == 1
+    assert stats["last"]["done"] == 4
+    assert [(stage, item) for stage, item, _ in errors] == [("check", 2)]
+
+
+def test_failing_on_error_does_not_stop_the_workers():
+    def on_error(*_) -> None:
+        raise RuntimeError("banco de dados travado")
+
+    pipeline = Pipeline(
+        [Stage("fail", lambda n: 1 / 0, workers=2)], on_error=on_error
+    )
+    stats = _run(pipeline, range(6))
+    assert stats["fail"]["failed"] == 6
+
+
+def test_non_iterable_fan_out_result_is_a_failure():
+    errors: List[Any] = []
+    pipeline = Pipeline(
+        [Stage("split", lambda n: n, fan_out=True), Stage("last", print)],
+        on_error=lambda stage, item, error: errors.append(item),
+    )
+    stats = _run(pipeline, range(3))
+    assert stats["split"]["failed"] == 3
+    assert stats["split"]["done"] == 0
+    assert sorted(errors) == [0, 1, 2]
+
+
+def test_stages_finish_when_the_items_fail():
+    done: List[int] = []
+
+    def items() -> Iterable[int]:
+        yield 1
+        yield 2
+        raise RuntimeError("página de listagem falhou")
+
+    pipeline = Pipeline([Stage("collect", done.append)])
+    with pytest.raises(RuntimeError):
+        _run(pipeline, items())
+    assert done == [1, 2]
+
+
+def test_workers_must_be_positive():
+    with pytest.raises(ValueError):
+        Stage("stage", print, workers=0)
+    with pytest.raises(ValueError):
+        Pipeline([])
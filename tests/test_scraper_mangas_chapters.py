@@ -0,0 +1,100 @@
+from typing import Any, Callable, Dict, List
+
+import pytest
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    WebDriverException,
+)
+from selenium.webdriver.common.by import By
+
+from scraper_mangas_chapters import ScraperChapters
+
+
+class _FakeElement:
+    def __init__(self,
+                 text: str = "",
+                 src: Callable[[], str] = None,
+                 on_click: Callable[[], None] = None) -> None:
+        self.text: str = text
+        self._src = src
+        self._on_click = on_click
+
+    def is_displayed(self) -> bool:
+        return True
+
+    def get_attribute(self, name: str) -> str:
+        return self._src() if name == "src" and self._src else None
+
+    def click(self) -> None:
+        if self._on_click is not None:
+            self._on_click()
+
+
+class _FakeReader:
+    """
+    Navegador falso com o leitor de um capítulo que não expõe o json
+    das páginas, então só passando as páginas uma a uma.
+    """
+
+    def __init__(self, pages: List[str]) -> None:
+        self.pages: List[str] = pages
+        self.current: int = 0
+        self.current_url: str = ""
+        self.page_source: str = "<html><body></body></html>"
+        self.clicks: int = 0
+        self._elements: Dict[str, _FakeElement] = {
+            ScraperChapters.CSS_BOX_CHECK_18: _FakeElement(text=""),
+            ScraperChapters.CSS_SELECTOR_NUMBER_OF_PAGES: _FakeElement(
+                text=str(len(pages))
+            ),
+            ScraperChapters.CSS_SELECTOR_CHAPTER_PAGES: _FakeElement(
+                src=lambda: self.pages[self.current]
+            ),
+            ScraperChapters.CSS_SELECTOR_BUTTON_NEXT_PAGE: _FakeElement(
+                on_click=self._next_page
+            ),
+        }
+
+    def _next_page(self) -> None:
+        self.clicks += 1
+        self.current = min(self.current + 1, len(self.pages) - 1)
+
+    def get(self, url: str) -> None:
+        self.current_url = url
+        self.current = 0
+
+    def find_element(self, by: str, value: str) -> _FakeElement:
+        assert by == By.CSS_SELECTOR
+        if value not in self._elements:
+            raise NoSuchElementException(value)
+        return self._elements[value]
+
+    def execute_async_script(self, *_) -> Any:
+        raise WebDriverException("o leitor não tem o json das páginas")
+
+    def execute_script(self, *_) -> Any:
+        return "complete"
+
+
+@pytest.fixture
+def reader() -> _FakeReader:
+    return _FakeReader([f"https://cdn/p{page}.jpg" for page in range(4)])
+
+
+def test_get_chapter_falls_back_to_clicking_the_pages(reader):
+    scraper = ScraperChapters(browser=reader)
+    chapter: Dict[str, Any] = {
+        "pages": [],
+        "number_of_pages": 0,
+        "number_of_chapter": "Capítulo 1",
+        "url": "https://mangalivre.net/ler/manga/online/1/capitulo-1",
+    }
+    scraper.get_chapter(chapter)
+    assert list(chapter["pages"]) == reader.pages
+    assert chapter["number_of_pages"] == 4
+    assert reader.clicks == 3
+
+
+def test_get_pages_fast_without_the_reader_json(reader):
+    scraper = ScraperChapters(browser=reader)
+    assert scraper.get_pages_fast(4) == []
@@ -0,0 +1,68 @@
+import time
+from typing import Any, Iterator, Optional
+
+import pytest
+
+from scraper_mangas_info import ScraperMangasInfo
+
+# tempo de espera da lista nos testes, bem menor que o do site.
+SCROLL_TIMEOUT: float = 0.2
+
+
+class _FakeMangaPage:
+    """
+    Navegador falso com a página de um mangá: depois de cada scroll, a
+    lista ganha per_scroll capítulos após delay segundos, até ter total
+    capítulos.
+    """
+
+    def __init__(self, total: int, per_scroll: int, delay: float) -> None:
+        self.total: int = total
+        self.per_scroll: int = per_scroll
+        self.delay: float = delay
+        self.rows: int = 0
+        self._loaded_at: Optional[float] = None
+
+    def execute_script(self, script: str, *_) -> Any:
+        now = time.monotonic()
+        if self._loaded_at is not None and now >= self._loaded_at:
+            self.rows = min(self.total, self.rows + self.per_scroll)
+            self._loaded_at = None
+        if "scrollTo" in script:
+            if self._loaded_at is None and self.rows < self.total:
+                self._loaded_at = now + self.delay
+            return None
+        return [100 * self.rows, self.rows]
+
+
+@pytest.fixture
+def make_scraper() -> Iterator[Any]:
+    scrapers = []
+
+    def make(page: _FakeMangaPage) -> ScraperMangasInfo:
+        scraper = ScraperMangasInfo(browser=page, static_fetch=False)
+        scraper._SCROLL_TIMEOUT = SCROLL_TIMEOUT
+        scrapers.append(scraper)
+        return scraper
+
+    yield make
+    for scraper in scrapers:
+        scraper.close()
+
+
+def test_slow_list_request_does_not_end_the_wait(make_scraper):
+    # cada requisição da lista demora mais que uma espera inteira.
+    page = _FakeMangaPage(total=3, per_scroll=1, delay=1.5 * SCROLL_TIMEOUT)
+    assert make_scraper(page)._wait_for_list_load()
+    assert page.rows == 3
+
+
+def test_list_shorter_than_known_chapters_is_incomplete(make_scraper):
+    page = _FakeMangaPage(total=2, per_scroll=1, delay=0)
+    assert not make_scraper(page)._wait_for_list_load(min_chapters=5)
+    assert page.rows == 2
+
+
+def test_list_with_the_known_chapters_is_complete(make_scraper):
+    page = _FakeMangaPage(total=4, per_scroll=2, delay=0)
+    assert make_scraper(page)._wait_for_list_load(min_chapters=4)
@@ -0,0 +1,67 @@
+import time
+from typing import List, Optional
+
+import pytest
+
+from benchmarks.standin_server import StandinServer, StandinSite
+from http_client import HttpClient
+from scraper_mangas_links import (
+    get_mangas_links_in_range, get_mangas_links_in_range_concurrent
+)
+
+
+class _OverlappingSite(StandinSite):
+    """Cada página de listagem repete os mangás da página anterior, como
+    quando um mangá novo empurra os outros para a página seguinte."""
+
+    def listing(self, page: int) -> Optional[str]:
+        current = super().listing(page)
+        if current is None or page == 1:
+            return current
+        return current + super().listing(page - 1)
+
+
+@pytest.fixture
+def server():
+    site = _OverlappingSite(mangas=10, mangas_per_page=3)
+    with StandinServer(site, latency=0.02) as standin:
+        yield standin
+
+
+def _manga_urls(server: StandinServer, ids) -> List[str]:
+    return [server.base_url + server.site.manga_path(i) for i in ids]
+
+
+def test_links_are_ordered_and_unique(server):
+    failed_pages: List[str] = []
+    with HttpClient(pool_size=4) as client:
+        links = get_mangas_links_in_range_concurrent(
+            1, 5, max_workers=4, requests_per_second=0, client=client,
+            failed_pages=failed_pages, base_url=server.listing_url,
+        )
+    assert links == _manga_urls(server, range(1, 11))
+    # a página 5 não existe.
+    assert failed_pages == [server.listing_url + "5"]
+
+
+def test_matches_the_sequential_version(server):
+    with HttpClient(pool_size=4) as client:
+        links = get_mangas_links_in_range_concurrent(
+            1, 4, max_workers=4, requests_per_second=0, client=client,
+            base_url=server.listing_url,
+        )
+    sequential = get_mangas_links_in_range(1, 4, base_url=server.listing_url)
+    assert links == list(dict.fromkeys(sequential))
+
+
+def test_requests_per_second_limits_the_host(server):
+    start = time.monotonic()
+    with HttpClient(pool_size=4) as client:
+        get_mangas_links_in_range_concurrent(
+            1, 4, max_workers=4, requests_per_second=20, client=client,
+            base_url=server.listing_url,
+        )
+    # 4 requisições a 20 por segundo: 3 intervalos de 0.05 s, mesmo com
+    # 4 threads.
+    assert time.monotonic() - start >= 0.15
+    assert server.stats["requests"] == 4
@@ -0,0 +1,112 @@
+import os
+from typing import List
+
+import pytest
+
+from manga_model import MangaModel
+from search_index import OR, SearchIndex, normalize, tokenize
+
+
+def _manga(number: int, title: str, author: str = "", status: str = "",
+           categories: List[str] = (), alternative: List[str] = ()):
+    return MangaModel(
+        title=title,
+        url=f"https://site/manga/{number}",
+        author=author,
+        status=status,
+        categories=list(categories),
+        alternative_titles=list(alternative),
+        chapters=[],
+    )
+
+
+@pytest.fixture
+def index(tmp_path):
+    search_index = SearchIndex(os.path.join(tmp_path, "search.sqlite3"))
+    search_index.add(_manga(1, "One Piece", "Eiichiro Oda", "Em andamento",
+                            ["Ação", "Aventura"], ["ワンピース"]))
+    search_index.add(_manga(2, "One Punch-Man", "ONE", "Em andamento",
+                            ["Ação", "Comédia"]))
+    search_index.add(_manga(3, "Shingeki no Kyojin", "Hajime Isayama",
+                            "Completo", ["Ação", "Drama"],
+                            ["Attack on Titan"]))
+    yield search_index
+    search_index.close()
+
+
+def _titles(hits) -> List[str]:
+    return [hit.title for hit in hits]
+
+
+def test_normalize_and_tokenize():
+    assert normalize("  Ação   e COMÉDIA ") == "acao e comedia"
+    assert tokenize("One Punch-Man") == ["one", "punch", "man"]
+
+
+def test_title_prefix(index):
+    assert _titles(index.search(title="one")) == ["One Piece", "One Punch-Man"]
+    assert _titles(index.search(title="pie")) == ["One Piece"]
+    assert index.search(title="pie", prefix=False) == []
+    # os títulos alternativos também são buscados.
+    assert _titles(index.search(title="titan")) == ["Shingeki no Kyojin"]
+
+
+def test_and_requires_every_criterion(index):
+    assert _titles(index.search(title="one p", categories=["comedia"])) == [
+        "One Punch-Man"
+    ]
+    assert _titles(index.search(categories=["Ação", "Drama"])) == [
+        "Shingeki no Kyojin"
+    ]
+    assert index.search(title="one", status="Completo") == []
+
+
+def test_or_accepts_any_criterion(index):
+    hits = index.search(author="eiichiro oda", status="completo", operator=OR)
+    assert _titles(hits) == ["One Piece", "Shingeki no Kyojin"]
+    assert len(index.search(categories=["ação"], operator=OR, limit=2)) == 2
+
+
+def test_unknown_operator(index):
+    with pytest.raises(ValueError):
+        index.search(title="one", operator="xor")
+
+
+def test_add_replaces_the_previous_version(index):
+    index.add(_manga(1, "One Piece", "Eiichiro Oda", "Completo"))
+    assert _titles(index.search(status="completo")) == [
+        "One Piece", "Shingeki no Kyojin"
+    ]
+    assert index.search(title="one", categories=["aventura"]) == []
+    assert len(index) == 3
+
+
+def test_unchanged_manga_is_not_written_again(index):
+    statements: List[str] = []
+    index._connect().set_trace_callback(statements.append)
+    manga = _manga(2, "One Punch-Man", "ONE", "Em andamento",
+                   ["Ação", "Comédia"])
+    # ex: o mesmo mangá salvo a cada poucos capítulos.
+    manga.chapters = [{"pages": [], "number_of_pages": 0,
+                       "number_of_chapter": "Capítulo 1", "url": "c1"}]
+    index.add(manga)
+    assert statements == []
+
+    manga.status = "Completo"
+    index.add(manga)
+    assert statements != []
+    assert _titles(index.search(status="completo")) == [
+        "One Punch-Man", "Shingeki no Kyojin"
+    ]
+
+
+def test_remove_and_rebuild(index):
+    index.remove("https://site/manga/2")
+    assert _titles(index.search(title="one")) == ["One Piece"]
+    # add() do mesmo mangá depois de removido volta a indexá-lo.
+    index.add(_manga(2, "One Punch-Man"))
+    assert len(index) == 3
+
+    assert index.rebuild([_manga(4, "Vagabond")]) == 1
+    assert len(index) == 1
+    assert _titles(index.search(title="vaga")) == ["Vagabond"]
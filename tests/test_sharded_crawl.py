@@ -0,0 +1,146 @@
+import os
+from typing import Any, Dict, List
+
+import sharded_crawl
+from job_journal import DONE, FAILED, JobJournal
+from manga_model import MangaModel
+from sharded_crawl import (
+    LISTING_KIND, MANGA_KIND, ShardWorker, merge_copies, merge_shards, plan
+)
+from search_index import SearchIndex
+from storage_backend import JsonFileBackend
+
+URL: str = "https://site/manga/manga/1"
+
+
+def _chapter(number: int, pages: int) -> Dict[str, Any]:
+    """Um capítulo com pages páginas, ou incompleto se pages for 0."""
+    return {
+        "pages": [f"p{number}-{page}" for page in range(pages)],
+        "number_of_pages": pages,
+        "number_of_chapter": f"Capítulo {number}",
+        "url": f"c{number}",
+    }
+
+
+def _manga(title: str, chapters: List[Dict[str, Any]]) -> MangaModel:
+    return MangaModel(title=title, url=URL, chapters=chapters)
+
+
+def _pages(manga: MangaModel) -> Dict[str, int]:
+    return {
+        chapter["url"]: len(chapter["pages"]) for chapter in manga.chapters
+    }
+
+
+def test_merge_copies_keeps_complete_chapters():
+    manga = _manga("Mangá", [_chapter(1, 2), _chapter(2, 0)])
+    other = _manga("Mangá", [_chapter(2, 3), _chapter(3, 0)])
+    merged = merge_copies(manga, other)
+    assert _pages(merged) == {"c1": 2, "c2": 3, "c3": 0}
+
+
+def test_merge_copies_uses_the_most_complete_copy_as_base():
+    manga = _manga("Antigo", [_chapter(1, 0)])
+    other = _manga("Novo", [_chapter(1, 1), _chapter(2, 1)])
+    merged = merge_copies(manga, other)
+    assert merged.title == "Novo"
+    assert _pages(merged) == {"c1": 1, "c2": 1}
+
+
+def _backend(path: str) -> JsonFileBackend:
+    backend = JsonFileBackend(path)
+    backend.create()
+    return backend
+
+
+def test_merge_shards_joins_copies_of_the_same_manga(tmp_path):
+    shards_dir = os.path.join(tmp_path, "shards")
+    _backend(os.path.join(shards_dir, "a")).save_manga(
+        _manga("Mangá", [_chapter(1, 2), _chapter(2, 0)])
+    )
+    shard_b = _backend(os.path.join(shards_dir, "b"))
+    shard_b.save_manga(_manga("Mangá", [_chapter(2, 1)]))
+    shard_b.update_list_title(["Mangá"])
+    output = _backend(os.path.join(tmp_path, "output"))
+
+    result = merge_shards(shards_dir, output)
+
+    assert result == {"shards": 2, "mangas": 1, "duplicates": 1}
+    assert _pages(output.load_manga("Mangá")) == {"c1": 2, "c2": 1}
+    assert output.load_list_titles() == ["Mangá"]
+
+
+def test_merge_shards_keeps_the_pages_already_in_the_output(tmp_path):
+    shards_dir = os.path.join(tmp_path, "shards")
+    # um worker com --skip-chapters não obtém as páginas.
+    _backend(os.path.join(shards_dir, "a")).save_manga(
+        _manga("Mangá", [_chapter(1, 0), _chapter(2, 0)])
+    )
+    output = _backend(os.path.join(tmp_path, "output"))
+    output.save_manga(_manga("Mangá", [_chapter(1, 3)]))
+
+    result = merge_shards(shards_dir, output)
+
+    assert result["mangas"] == 1
+    assert _pages(output.load_manga("Mangá")) == {"c1": 3, "c2": 0}
+
+
+def test_merge_shards_removes_the_copy_with_the_old_title(tmp_path):
+    shards_dir = os.path.join(tmp_path, "shards")
+    _backend(os.path.join(shards_dir, "a")).save_manga(
+        _manga("Título Novo", [_chapter(1, 1), _chapter(2, 1)])
+    )
+    output_dir = os.path.join(tmp_path, "output")
+    output = _backend(output_dir)
+    output.save_manga(_manga("Título Antigo", [_chapter(1, 1)]))
+
+    merge_shards(shards_dir, output)
+
+    mangas = list(output.iter_mangas())
+    assert [manga.title for manga in mangas] == ["Título Novo"]
+    assert not os.path.exists(os.path.join(output_dir, "título-antigo.json"))
+
+
+def test_merge_shards_updates_the_search_index(tmp_path):
+    shards_dir = os.path.join(tmp_path, "shards")
+    _backend(os.path.join(shards_dir, "a")).save_manga(
+        _manga("Título Novo", [_chapter(1, 1)])
+    )
+    output = _backend(os.path.join(tmp_path, "output"))
+    index = SearchIndex(os.path.join(tmp_path, "search.sqlite3"))
+    index.add(_manga("Título Antigo", []))
+
+    merge_shards(shards_dir, output, index)
+
+    assert [hit.title for hit in index.search(title="título")] == [
+        "Título Novo"
+    ]
+    assert index.search(title="antigo") == []
+    index.close()
+
+
+def test_listing_page_error_does_not_stop_the_worker(tmp_path, monkeypatch):
+    def get_links(start: int, end: int, **_) -> List[str]:
+        if start == 1:
+            raise ValueError("html inesperado")
+        return [f"https://site/manga/m{start}/{start}"]
+
+    monkeypatch.setattr(sharded_crawl, "get_mangas_links_in_range", get_links)
+    journal = JobJournal(os.path.join(tmp_path, "jobs.sqlite3"))
+    plan(journal, 1, 2)
+    worker = ShardWorker(
+        journal, shards_dir=os.path.join(tmp_path, "shards"),
+        shard_id="w1", idle_wait=0,
+    )
+    worker._storage = _backend(worker.shard_dir)
+
+    leased: List[str] = []
+    for manga_link in worker._leased_mangas():
+        leased.append(manga_link)
+        journal.complete(MANGA_KIND, [manga_link])
+
+    assert leased == ["https://site/manga/m2/2"]
+    assert journal.state(LISTING_KIND, "1") == FAILED
+    assert journal.state(LISTING_KIND, "2") == DONE
+    journal.close()
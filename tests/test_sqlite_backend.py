@@ -0,0 +1,62 @@
+import os
+import sqlite3
+
+from manga_model import MangaModel
+from sqlite_backend import SQLiteBackend
+
+IMAGES = [
+    {"url": "https://cdn/1.jpg", "sha256": "ab" * 32, "size": 10,
+     "file": "objects/ab/abab.jpg"},
+    None,
+]
+
+
+def _manga() -> MangaModel:
+    return MangaModel(
+        title="Mangá",
+        alternative_titles=["Outro título"],
+        url="https://site/manga/manga/1",
+        status="Completo",
+        cover="https://cdn/capa.jpg",
+        author="Autor",
+        categories=["Ação", "Comédia"],
+        description="Sinopse.",
+        chapters=[
+            {"pages": ["https://cdn/1.jpg", "https://cdn/2.jpg"],
+             "number_of_pages": 2, "number_of_chapter": "Capítulo 1",
+             "url": "c1", "images": IMAGES},
+            {"pages": [], "number_of_pages": 0,
+             "number_of_chapter": "Capítulo 2", "url": "c2"},
+        ],
+    )
+
+
+def test_round_trip_keeps_the_extra_chapter_keys(tmp_path):
+    path = os.path.join(tmp_path, "mangas.sqlite3")
+    backend = SQLiteBackend(path)
+    backend.save_manga(_manga())
+    backend.close()
+
+    reopened = SQLiteBackend(path)
+    manga = reopened.load_manga("Mangá")
+    assert manga.to_dict() == _manga().to_dict()
+    assert manga.chapters[0]["images"] == IMAGES
+    assert "images" not in manga.chapters[1]
+    reopened.close()
+
+
+def test_adds_the_extra_column_to_old_databases(tmp_path):
+    path = os.path.join(tmp_path, "mangas.sqlite3")
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE chapters (id INTEGER PRIMARY KEY, "
+        "manga_id INTEGER NOT NULL, position INTEGER NOT NULL, "
+        "url TEXT NOT NULL, number_of_chapter TEXT NOT NULL, "
+        "number_of_pages INTEGER NOT NULL)"
+    )
+    connection.close()
+
+    backend = SQLiteBackend(path)
+    backend.save_manga(_manga())
+    assert backend.load_manga("Mangá").chapters[0]["images"] == IMAGES
+    backend.close()
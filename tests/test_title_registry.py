@@ -0,0 +1,104 @@
+import os
+from unittest import mock
+
+import pytest
+
+from title_registry import TitleRegistry
+
+
+def _log(directory: str) -> str:
+    with open(os.path.join(directory, "list_titles.log"),
+              "r", encoding="utf-8") as file:
+        return file.read()
+
+
+def test_titles_survive_reopening(tmp_path):
+    registry = TitleRegistry(str(tmp_path))
+    assert registry.add_many(["a", "b", "a"]) == ["a", "b"]
+    assert registry.add_many(["b", "c"]) == ["c"]
+
+    reopened = TitleRegistry(str(tmp_path))
+    assert reopened.titles == ["a", "b", "c"]
+    assert "c" in reopened
+    assert len(reopened) == 3
+
+
+def test_log_is_replayed_over_the_snapshot(tmp_path):
+    registry = TitleRegistry(str(tmp_path))
+    registry.add_many(["a", "b"])
+    registry.compact()
+    assert _log(str(tmp_path)) == ""
+    registry.add_many(["c"])
+    assert TitleRegistry(str(tmp_path)).titles == ["a", "b", "c"]
+
+
+def test_compacts_after_compact_every_titles(tmp_path):
+    registry = TitleRegistry(str(tmp_path), compact_every=3)
+    registry.add_many(["a", "b"])
+    assert _log(str(tmp_path)) != ""
+    registry.add_many(["c"])
+    assert _log(str(tmp_path)) == ""
+    assert TitleRegistry(str(tmp_path)).titles == ["a", "b", "c"]
+
+
+def test_cut_last_line_is_dropped(tmp_path):
+    registry = TitleRegistry(str(tmp_path))
+    registry.add_many(["a"])
+    with open(os.path.join(tmp_path, "list_titles.log"), "a",
+              encoding="utf-8") as file:
+        file.write('"b')
+
+    reopened = TitleRegistry(str(tmp_path))
+    assert reopened.titles == ["a"]
+    reopened.add_many(["c"])
+    assert TitleRegistry(str(tmp_path)).titles == ["a", "c"]
+
+
+def test_replace_line_discards_the_titles_before_it(tmp_path):
+    registry = TitleRegistry(str(tmp_path))
+    registry.add_many(["a", "b"])
+    with open(os.path.join(tmp_path, "list_titles.log"), "a",
+              encoding="utf-8") as file:
+        file.write('{"replace": ["x", "y"]}\n"z"\n')
+    assert TitleRegistry(str(tmp_path)).titles == ["x", "y", "z"]
+
+
+def test_replace(tmp_path):
+    registry = TitleRegistry(str(tmp_path))
+    registry.add_many(["a", "b"])
+    registry.replace(["x", "y", "x"])
+    assert registry.titles == ["x", "y"]
+    assert _log(str(tmp_path)) == ""
+    assert TitleRegistry(str(tmp_path)).titles == ["x", "y"]
+
+
+def _interrupt(registry: TitleRegistry, step: str) -> None:
+    """Chama replace() simulando uma queda do processo em step."""
+    with mock.patch.object(TitleRegistry, step, side_effect=SystemExit):
+        with pytest.raises(SystemExit):
+            registry.replace(["x", "y"])
+
+
+@pytest.mark.parametrize("step", ["_compact", "_truncate_log"])
+def test_interrupted_replace_keeps_the_new_list(tmp_path, step):
+    registry = TitleRegistry(str(tmp_path))
+    registry.add_many(["a", "b"])
+    registry.compact()
+    registry.add_many(["c"])
+
+    # antes de gravar o snapshot, ou antes de esvaziar o log.
+    _interrupt(registry, step)
+
+    reopened = TitleRegistry(str(tmp_path))
+    assert reopened.titles == ["x", "y"]
+    reopened.add_many(["z"])
+    assert TitleRegistry(str(tmp_path)).titles == ["x", "y", "z"]
+
+
+def test_replace_cut_before_reaching_the_disk_keeps_the_old_list(tmp_path):
+    registry = TitleRegistry(str(tmp_path))
+    registry.add_many(["a", "b"])
+    with open(os.path.join(tmp_path, "list_titles.log"), "a",
+              encoding="utf-8") as file:
+        file.write('{"replace": ["x", "y"')
+    assert TitleRegistry(str(tmp_path)).titles == ["a", "b"]
@@ -0,0 +1,79 @@
+import pytest
+
+from manga_model import MangaModel
+from storage_backend import JsonFileBackend
+from write_behind import WriteBehindBackend
+
+
+def _manga(title: str = "Manga A", pages: int = 0) -> MangaModel:
+    return MangaModel(
+        title=title,
+        url=f"https://mangalivre.net/manga/{title.lower()}/1",
+        alternative_titles=[],
+        categories=[],
+        chapters=[{
+            "pages": [f"https://cdn/p{i}.jpg" for i in range(pages)],
+            "number_of_pages": pages,
+            "number_of_chapter": "Capítulo 1",
+            "url": "https://mangalivre.net/ler/a/online/1",
+        }],
+    )
+
+
+@pytest.fixture
+def backend(tmp_path):
+    json_backend = JsonFileBackend(str(tmp_path))
+    json_backend.create()
+    # a thread só grava quando flush() é chamado.
+    storage = WriteBehindBackend(json_backend, flush_interval=3600)
+    yield storage, json_backend
+    storage.close()
+
+
+def test_writes_the_manga_as_it_was_when_saved(backend):
+    storage, json_backend = backend
+    manga = _manga()
+    storage.save_manga(manga)
+    # um scraper continua alterando o mangá depois do save_manga().
+    manga.chapters[0]["pages"] = ["https://cdn/p0.jpg"]
+    manga.chapters[0]["number_of_pages"] = 1
+    manga.title = "Outro"
+
+    assert storage.load_manga("Manga A").chapters[0]["pages"] == []
+    storage.flush()
+    stored = json_backend.load_manga("Manga A")
+    assert stored.chapters[0]["number_of_pages"] == 0
+    assert json_backend.load_manga("Outro") is None
+
+
+def test_saves_of_the_same_manga_are_coalesced(backend):
+    storage, json_backend = backend
+    storage.save_manga(_manga(pages=1))
+    storage.save_manga(_manga(pages=2))
+    pending = storage.find_by_url(_manga().url)
+    assert pending.chapters[0]["number_of_pages"] == 2
+    assert json_backend.load_manga("Manga A") is None
+
+    storage.flush()
+    assert json_backend.load_manga("Manga A").chapters[0]["pages"] == [
+        "https://cdn/p0.jpg", "https://cdn/p1.jpg"
+    ]
+    stats = storage.stats
+    assert stats["saves"] == 2
+    assert stats["saves_coalesced"] == 1
+    assert stats["mangas_written"] == 1
+
+
+def test_failed_write_keeps_the_mangas_pending(backend, monkeypatch):
+    storage, json_backend = backend
+    storage.save_manga(_manga())
+
+    def fail(_):
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr(json_backend, "save_mangas", fail)
+    with pytest.raises(OSError):
+        storage.flush()
+    monkeypatch.undo()
+    storage.flush()
+    assert json_backend.load_manga("Manga A") is not None
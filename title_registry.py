@@ -0,0 +1,173 @@
+import os
+import threading
+from json import JSONDecodeError, dumps, loads
+from typing import Iterable, List, Set
+from atomic_file import atomic_write
+
+
+class TitleRegistry:
+    """
+    TitleRegistry guarda a lista de títulos (ou urls) dos mangás.
+
+    A lista fica em um snapshot json, no mesmo formato de antes, e os
+    títulos novos são acrescentados em um log, um título json por linha.
+    Na memória, um set permite verificar se um título já existe em O(1),
+    então adicionar um lote custa proporcional ao tamanho do lote e não
+    ao tamanho da lista.
+
+    Quando o log fica grande, ele é compactado: a lista inteira é
+    gravada atomicamente em um novo snapshot e o log é esvaziado.
+
+    replace() grava a lista nova no log como uma única linha
+    {"replace": [...]}, que ao carregar descarta tudo o que veio antes.
+    Assim uma queda em qualquer ponto deixa a lista antiga ou a nova.
+    """
+
+    def __init__(self, directory: str, compact_every: int = 10000) -> None:
+        """
+        :param directory: o diretório onde ficam o snapshot e o log.
+
+        :param compact_every: número de títulos no log a partir do qual
+        ele é compactado.
+
+        :return:
+            None
+        """
+        self._snapshot_dir: str = directory + "/list_titles.json"
+        self._log_dir: str = directory + "/list_titles.log"
+        self._compact_every: int = compact_every
+        self._titles: List[str] = []
+        self._index: Set[str] = set()
+        self._log_size: int = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _append_in_memory(self, title: str) -> bool:
+        if title in self._index:
+            return False
+        self._index.add(title)
+        self._titles.append(title)
+        return True
+
+    def _load(self) -> None:
+        """Carrega o snapshot e aplica o log por cima."""
+        try:
+            with open(self._snapshot_dir, "r", encoding="utf-8") as file:
+                for title in loads(file.read()):
+                    self._append_in_memory(title)
+        except FileNotFoundError:
+            pass
+
+        try:
+            with open(self._log_dir, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return
+
+        # a última linha pode ter sido cortada por uma queda. Ela é
+        # removida para que o próximo título não seja escrito nela.
+        complete_size = data.rfind(b"\n") + 1
+        if complete_size < len(data):
+            with open(self._log_dir, "r+b") as file:
+                file.truncate(complete_size)
+        for line in data[:complete_size].splitlines():
+            try:
+                title = loads(line.decode("utf-8"))
+            except (UnicodeDecodeError, JSONDecodeError):
+                continue
+            self._log_size += 1
+            if isinstance(title, dict):
+                # a lista foi substituída por replace().
+                self._reset(title.get("replace") or [])
+            else:
+                self._append_in_memory(title)
+
+    def _reset(self, titles: Iterable[str]) -> None:
+        self._titles = []
+        self._index = set()
+        for title in titles:
+            self._append_in_memory(title)
+
+    @property
+    def titles(self) -> List[str]:
+        """Todos os títulos, na ordem em que foram adicionados."""
+        with self._lock:
+            return list(self._titles)
+
+    def __contains__(self, title: str) -> bool:
+        return title in self._index
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def add_many(self, titles: Iterable[str]) -> List[str]:
+        """
+        Adiciona os títulos que ainda não estão na lista.
+
+        :param titles: os títulos a adicionar.
+
+        :return:
+            os títulos que foram realmente adicionados.
+        """
+        with self._lock:
+            added = [t for t in titles if self._append_in_memory(t)]
+            if not added:
+                return added
+            self._append_to_log(
+                dumps(title, ensure_ascii=False) for title in added
+            )
+            if self._log_size >= self._compact_every:
+                self._compact()
+            return added
+
+    def replace(self, titles: Iterable[str]) -> None:
+        """
+        Substitui a lista inteira de títulos.
+
+        :param titles: a nova lista de títulos.
+
+        :return:
+            None
+        """
+        with self._lock:
+            self._reset(titles)
+            # a lista nova vai primeiro para o log, em uma linha só: se o
+            # processo morrer antes de ela estar inteira no disco, a linha
+            # cortada é descartada ao carregar e a lista antiga continua.
+            # Depois disso, o snapshot pode ser gravado com segurança.
+            self._append_to_log([
+                dumps({"replace": self._titles}, ensure_ascii=False)
+            ])
+            self._compact()
+
+    def _append_to_log(self, lines: Iterable[str]) -> None:
+        """Acrescenta linhas json ao log e as grava no disco."""
+        lines = list(lines)
+        with open(self._log_dir, "a", encoding="utf-8") as file:
+            file.write("".join(line + "\n" for line in lines))
+            file.flush()
+            os.fsync(file.fileno())
+        self._log_size += len(lines)
+
+    def _compact(self) -> None:
+        data = dumps(self._titles, ensure_ascii=False, indent=4)
+        atomic_write(self._snapshot_dir, data.encode("utf-8"))
+        # se o processo morrer antes de esvaziar o log, os títulos dele
+        # já estão no snapshot e são ignorados ao carregar, e um replace()
+        # no log leva de novo à mesma lista do snapshot.
+        self._truncate_log()
+
+    def _truncate_log(self) -> None:
+        with open(self._log_dir, "w", encoding="utf-8"):
+            pass
+        self._log_size = 0
+
+    def compact(self) -> None:
+        """
+        Grava a lista inteira em um novo snapshot e esvazia o log.
+
+        :return:
+            None
+        """
+        with self._lock:
+            self._compact()
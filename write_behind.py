@@ -0,0 +1,198 @@
+import threading
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+from instrumentation import METRICS
+from manga_codec import MangaCodec, fastest_codec
+from manga_model import MangaModel
+from storage_backend import StorageBackend
+
+
+class _Snapshot(NamedTuple):
+    """Um mangá como estava no momento do save_manga()."""
+    title: str
+    url: str
+    data: bytes
+
+
+class WriteBehindBackend(StorageBackend):
+    """
+    WriteBehindBackend guarda na memória os mangás salvos e os grava no
+    banco de dados de verdade em lotes, em uma thread separada.
+
+    Salvar o mesmo mangá várias vezes antes da gravação resulta em uma
+    única escrita, com a versão mais recente. O mangá é serializado na
+    hora do save_manga(), então o que é gravado é o mangá como estava
+    naquele momento, mesmo que outras threads continuem alterando ele
+    (ex: os scrapers dos capítulos).
+    """
+
+    def __init__(self,
+                 backend: StorageBackend,
+                 flush_interval: float = 5.0,
+                 batch_size: int = 50) -> None:
+        """
+        :param backend: o banco de dados onde os mangás são gravados.
+
+        :param flush_interval: tempo máximo em segundos que um mangá
+        fica só na memória.
+
+        :param batch_size: número de mangás pendentes que faz a
+        gravação começar antes de flush_interval.
+
+        :return:
+            None
+        """
+        self._backend: StorageBackend = backend
+        self._flush_interval: float = flush_interval
+        self._batch_size: int = batch_size
+        # codec das cópias dos mangás guardadas na memória.
+        self._codec: MangaCodec = fastest_codec()
+        # mangás que ainda não foram gravados, pela url (ou título).
+        self._pending: Dict[str, _Snapshot] = {}
+        self._lock = threading.Lock()
+        # impede duas gravações ao mesmo tempo (thread e flush()).
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed: bool = False
+        self._saves: int = 0
+        self._saves_coalesced: int = 0
+        self._mangas_written: int = 0
+        self._bytes_written: int = 0
+        self._flushes: int = 0
+        self._thread = threading.Thread(
+            target=self._run, name="write-behind", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Contadores da gravação.
+
+        :return:
+            um dicionário com o número de mangás salvos, de salvamentos
+            agrupados com um anterior, de mangás gravados, de bytes
+            gravados e de lotes gravados.
+        """
+        with self._lock:
+            return {
+                "saves": self._saves,
+                "saves_coalesced": self._saves_coalesced,
+                "mangas_written": self._mangas_written,
+                "bytes_written": self._bytes_written,
+                "flushes": self._flushes,
+            }
+
+    def _load(self, snapshot: _Snapshot) -> MangaModel:
+        return MangaModel.from_bytes(snapshot.data, self._codec)
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self._flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as error:  # noqa: BLE001
+                # os mangás voltaram para _pending e serão gravados na
+                # próxima vez.
+                print(f"Erro ao gravar os mangás! {error!r}")
+
+    def flush(self) -> None:
+        """
+        Grava imediatamente todos os mangás pendentes.
+
+        :return:
+            None
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = self._pending
+                self._pending = {}
+            if not batch:
+                return
+            try:
+                with METRICS.timer("storage_flush"):
+                    bytes_written = self._backend.save_mangas(
+                        self._load(snapshot) for snapshot in batch.values()
+                    )
+            except BaseException:
+                # devolve os mangás que não foram salvos de novo enquanto
+                # isso.
+                with self._lock:
+                    for key, snapshot in batch.items():
+                        self._pending.setdefault(key, snapshot)
+                raise
+            with self._lock:
+                self._mangas_written += len(batch)
+                self._bytes_written += bytes_written
+                self._flushes += 1
+
+    def save_mangas(self, mangas: Iterable[MangaModel]) -> int:
+        snapshots = [
+            _Snapshot(manga.title, manga.url, manga.to_bytes(self._codec))
+            for manga in mangas
+        ]
+        with self._lock:
+            for snapshot in snapshots:
+                key = snapshot.url or snapshot.title
+                self._saves += 1
+                if key in self._pending:
+                    self._saves_coalesced += 1
+                self._pending[key] = snapshot
+            pending = len(self._pending)
+        if pending >= self._batch_size:
+            self._wake.set()
+        # nada foi escrito ainda.
+        return 0
+
+    def _pending_snapshots(self) -> List[_Snapshot]:
+        with self._lock:
+            return list(self._pending.values())
+
+    def load_manga(self, title: str) -> Optional[MangaModel]:
+        for snapshot in self._pending_snapshots():
+            if snapshot.title == title:
+                return self._load(snapshot)
+        return self._backend.load_manga(title)
+
+    def find_by_url(self, url: str) -> Optional[MangaModel]:
+        for snapshot in self._pending_snapshots():
+            if snapshot.url == url:
+                return self._load(snapshot)
+        return self._backend.find_by_url(url)
+
+    def iter_mangas(self) -> Iterator[MangaModel]:
+        self.flush()
+        return self._backend.iter_mangas()
+
+    def delete_manga(self, title: str, url: str) -> None:
+        # grava antes, para que uma versão pendente não volte depois.
+        self.flush()
+        self._backend.delete_manga(title, url)
+
+    def create(self) -> None:
+        self._backend.create()
+
+    def save_list_titles(self, list_titles: List[str]) -> None:
+        self._backend.save_list_titles(list_titles)
+
+    def update_list_title(self, new_list_titles: List[str]) -> None:
+        self._backend.update_list_title(new_list_titles)
+
+    def load_list_titles(self) -> List[str]:
+        return self._backend.load_list_titles()
+
+    def close(self) -> None:
+        """
+        Para a thread de gravação, grava os mangás pendentes e fecha o
+        banco de dados.
+
+        :return:
+            None
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self._backend.close()